@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+
+"""
+Measures how the stages of a discrimination run scale with the layer size and
+the simulation time: network construction, phased simulation with weight
+snapshots, dumping to NIX and every analysis function of analyse.py. Layers
+of the profile are resized to N x N and stimulated by a generated movie of
+four orthogonal bars of the same size.
+
+Results are written as JSON and can be compared with the results of an
+earlier run (a baseline). Stages slower than the baseline by more than the
+tolerance are reported, and the script exits with status 1.
+
+Usage: ./scaling.py -c <profile> [-s <sizes>] [-t <times>] [-p <phase>]
+                    [-o <output>] [-b <baseline>] [--tolerance <ratio>]
+
+Arguments:
+'-c', type=str          path to the profile
+'-s', type=str          comma separated layer sizes, default 4,8,16,32,64
+'-t', type=str          comma separated simulation times (ms), default 2000
+'-p', type=int          phase (ms), default 500
+'-o', type=str          path to the JSON file with results
+'-b', type=str          path to the JSON file with baseline results
+'--tolerance', type=float   allowed slowdown relative to the baseline,
+                            default 0.2 (20%)
+
+Example:
+
+./scaling.py -c ../simulation/discrimination/profiles/01_4x4_orthogonal.json \\
+    -s 4,8,16 -t 2000,10000 -o scaling.json
+./scaling.py -c ../simulation/discrimination/profiles/01_4x4_orthogonal.json \\
+    -s 4,8,16 -t 2000,10000 -b scaling.json
+
+"""
+
+import os
+import sys
+import copy
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+import simplejson as json
+
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+
+from reduced.simulation.utils import from_file
+from reduced.simulation.dump import NixDumper
+from reduced.simulation.discrimination import analyse
+from reduced.simulation.discrimination.simulate import simulate
+
+
+# analysis functions, called as function(f, t1, t2)
+analyses = ['weights_before_and_after', 'weight_dynamics_for_single',
+            'raster', 'time_series', 'weight_sum_evolution',
+            'spike_triggered_averages']
+
+# stages of simulate() compared with a baseline (see Instrumentation)
+stages = ['build', 'snapshot', 'simulate', 'drain', 'dump']
+
+
+def write_movie(path, size, frames=4):
+    """
+    Writes a movie (.idlmov) of vertical bars, one after another, which
+    together cover a size x size image.
+
+    :param path:    path of the file
+    :param size:    width and height of the frames (int)
+    :param frames:  number of frames (int)
+    """
+    data = np.zeros((frames, size, size), dtype=np.float32)
+    for i, columns in enumerate(np.array_split(np.arange(size), frames)):
+        data[i, :, columns] = 1.0
+
+    header = np.array([0, 0, 1, 2, 2, 0, 0, size, size, 0, 0, 0, 0],
+                      dtype=np.int32)
+
+    with open(path, 'wb') as f:
+        f.write(' ' * 20)
+        f.write(header.tostring())
+        f.write(data.tostring())
+
+
+def resized(setup_dict, size, movie_path):
+    """
+    :return:    a copy of the profile with size x size layers
+    """
+    profile = copy.deepcopy(setup_dict)
+    for layer in ('INPUT_LAYER', 'MAP_LAYER'):
+        profile[layer] = {'x_dim': size, 'y_dim': size}
+    profile['STIMULI']['movie_path'] = movie_path
+
+    return profile
+
+
+def measure(setup_dict, size, simulation_time, phase, workdir, seed=42):
+    """
+    Simulates, dumps and analyses a network with size x size layers.
+
+    :param setup_dict:      profile dict
+    :param size:            size of the layers (int)
+    :param simulation_time: simulation time (ms)
+    :param phase:           phase (ms)
+    :param workdir:         directory for the movie and the results
+    :param seed:            seed (int)
+    :return:                dict with timings (s), counts and memory usage
+    """
+    movie_path = os.path.join(workdir, '%dx%d.idlmov' % (size, size))
+    if not os.path.exists(movie_path):
+        write_movie(movie_path, size)
+
+    output_path = os.path.join(workdir, 'scaling_%d_%d.h5' %
+                               (size, simulation_time))
+    profile = resized(setup_dict, size, movie_path)
+
+    simulate(simulation_time, phase, profile, output_path, seed=seed)
+
+    with open(output_path + '.stats.json') as f:
+        totals = json.loads(f.read())['totals']
+
+    result = {
+        'size': size,
+        'time': simulation_time,
+        'phase': phase,
+        'backend': totals['backend'],
+        'synapses': totals['synapses'],
+        'events': totals['events'],
+        'peak_rss': totals['peak_rss']
+    }
+    for stage in stages:
+        result[stage] = totals.get('%s_time' % stage, 0.0)
+
+    with NixDumper(output_path, NixDumper.mode['readonly']) as f:
+        for name in analyses:
+            started = time.time()
+            getattr(analyse, name)(f, 0, simulation_time)
+            result[name] = time.time() - started
+            plt.close('all')
+
+    return result
+
+
+def scaling(setup_dict, sizes, simulation_times, phase, workdir=None):
+    """
+    Measures all combinations of layer sizes and simulation times.
+
+    :return:    list of result dicts (see measure)
+    """
+    tmp = workdir is None
+    workdir = tempfile.mkdtemp() if tmp else workdir
+
+    try:
+        return [measure(setup_dict, size, t, phase, workdir)
+                for size in sizes for t in simulation_times]
+    finally:
+        if tmp:
+            shutil.rmtree(workdir)
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compares timings of measurements with the same layer size and simulation
+    time in a baseline.
+
+    :param results:     list of result dicts (see measure)
+    :param baseline:    list of baseline result dicts
+    :param tolerance:   allowed relative slowdown
+    :return:            list of (size, time, stage, ratio) for every stage
+                        slower than the baseline by more than the tolerance
+    """
+    key = lambda x: (x['size'], x['time'])
+    reference = dict((key(x), x) for x in baseline)
+
+    regressions = []
+    for result in results:
+        base = reference.get(key(result))
+        if base is None:
+            continue
+
+        for stage in stages + analyses:
+            if not base.get(stage):
+                continue
+
+            ratio = result[stage] / base[stage]
+            if ratio > 1 + tolerance:
+                regressions.append(key(result) + (stage, ratio))
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Size scaling benchmark')
+
+    parser.add_argument('-c, --conf', dest='conf', type=str)
+    parser.add_argument('-s, --sizes', dest='sizes', type=str, default='4,8,16,32,64')
+    parser.add_argument('-t, --times', dest='times', type=str, default='2000')
+    parser.add_argument('-p, --phase', dest='phase', type=int, default=500)
+    parser.add_argument('-o, --output', dest='output', type=str, default=None)
+    parser.add_argument('-b, --baseline', dest='baseline', type=str, default=None)
+    parser.add_argument('--tolerance', dest='tolerance', type=float, default=0.2)
+
+    args = parser.parse_args()
+
+    sizes = [int(x) for x in args.sizes.split(',')]
+    times = [int(x) for x in args.times.split(',')]
+    results = scaling(from_file(args.conf), sizes, times, args.phase)
+
+    row = "%6s %8s %10s %9s %12s %9s %9s %10s"
+    print(row % ('size', 'time', 'synapses', 'build, s', 'simulate, s',
+                 'dump, s', 'analyse, s', 'RSS, MB'))
+    for r in results:
+        print(row % (r['size'], r['time'], r['synapses'], '%.3f' % r['build'],
+                     '%.3f' % r['simulate'], '%.3f' % r['dump'],
+                     '%.3f' % sum(r[x] for x in analyses),
+                     '%.1f' % r['peak_rss']))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(json.dumps(results, indent=4))
+
+    if args.baseline:
+        regressions = compare(results, from_file(args.baseline), args.tolerance)
+        for size, t, stage, ratio in regressions:
+            print("%dx%d, %d ms: %s is %.2f times slower than the baseline" %
+                  (size, size, t, stage, ratio))
+
+        if regressions:
+            sys.exit(1)
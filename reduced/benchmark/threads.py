@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+
+"""
+Measures how network construction, phased simulation and weight readout of
+a discrimination profile scale with the number of NEST threads. The same
+seed is used for all thread counts, so the synapse tables (sources, targets
+and ports in the same order) and the weights at the end of the simulation
+must be equal; this is reported as a consistency check of the bulk readout.
+
+Usage: ./threads.py -c <profile> [-t <time>] [-p <phase>] [-n <threads>]
+                    [-o <output>]
+
+Arguments:
+'-c', type=str      path to the profile
+'-t', type=int      simulation time (ms)
+'-p', type=int      phase (ms)
+'-n', type=str      comma separated thread counts, default 1,2,4,8
+'-o', type=str      path to the JSON file with results
+
+Example:
+
+./threads.py -c ../simulation/discrimination/profiles/01_4x4_orthogonal.json \\
+    -t 5000 -p 500 -n 1,2,4
+
+"""
+
+import copy
+import time
+import argparse
+import numpy as np
+import simplejson as json
+
+from reduced.simulation.utils import from_file
+from reduced.network.backend import nest
+from reduced.network.monitors import WeightRecorder
+from reduced.simulation.discrimination.simulate import setup_kernel
+from reduced.simulation.discrimination.simulate import build_network
+
+
+def measure(setup_dict, threads, simulation_time, phase, seed=42):
+    """
+    Builds and simulates a network with a given number of threads.
+
+    :param setup_dict:      profile dict
+    :param threads:         number of local threads (int)
+    :param simulation_time: simulation time (ms)
+    :param phase:           phase (ms), weights are read out every phase
+    :param seed:            seed (int)
+    :return:                dict with timings (s), the final snapshot and
+                            the connections (source, target, port)
+    """
+    profile = copy.deepcopy(setup_dict)
+    profile.setdefault('KERNEL', {})['local_num_threads'] = threads
+
+    started = time.time()
+    setup_kernel(profile, seed)
+    input_layer, map_layer = build_network(profile)
+    build = time.time() - started
+
+    recorder = WeightRecorder(input_layer, map_layer.nodes)
+    simulation, readout = 0.0, 0.0
+
+    time_passed = 0
+    while time_passed < simulation_time:
+        started = time.time()
+        recorder.record(time_passed)
+        readout += time.time() - started
+
+        started = time.time()
+        nest.Simulate(phase)
+        simulation += time.time() - started
+
+        time_passed += phase
+
+    # weights after the last phase
+    started = time.time()
+    recorder.record(time_passed)
+    readout += time.time() - started
+
+    table = input_layer.synapse_table
+    return {
+        'threads': threads,
+        'build': build,
+        'simulation': simulation,
+        'readout': readout,
+        'synapses': len(table),
+        'snapshot': recorder.weights[:, :, -1],
+        'connections': table.data[['source', 'target', 'port']]
+    }
+
+
+def scaling(setup_dict, thread_counts, simulation_time, phase):
+    """
+    Measures all given thread counts.
+
+    :return:    list of result dicts (see measure), without snapshots and
+                connections but with a 'consistent' flag
+    """
+    results = [measure(setup_dict, n, simulation_time, phase)
+               for n in thread_counts]
+
+    snapshot, connections = results[0]['snapshot'], results[0]['connections']
+    for result in results:
+        same_weights = np.allclose(result.pop('snapshot'), snapshot)
+        same_connections = np.array_equal(result.pop('connections'), connections)
+        result['consistent'] = bool(same_weights and same_connections)
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Thread scaling benchmark')
+
+    parser.add_argument('-c, --conf', dest='conf', type=str)
+    parser.add_argument('-t, --time', dest='time', type=int, default=5000)
+    parser.add_argument('-p, --phase', dest='phase', type=int, default=500)
+    parser.add_argument('-n, --threads', dest='threads', type=str, default='1,2,4,8')
+    parser.add_argument('-o, --output', dest='output', type=str, default=None)
+
+    args = parser.parse_args()
+
+    thread_counts = [int(x) for x in args.threads.split(',')]
+    results = scaling(from_file(args.conf), thread_counts, args.time, args.phase)
+
+    row = "%8s %10s %12s %10s %10s %12s"
+    print(row % ('threads', 'build, s', 'simulate, s', 'readout, s',
+                 'synapses', 'consistent'))
+    for r in results:
+        print(row % (r['threads'], '%.3f' % r['build'], '%.3f' % r['simulation'],
+                     '%.3f' % r['readout'], r['synapses'], r['consistent']))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(json.dumps(results, indent=4))
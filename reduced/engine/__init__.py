@@ -0,0 +1,168 @@
+"""
+A pure NumPy simulation engine, which implements the part of the NEST API
+used by the network objects (reduced.network), so that small networks can
+be simulated without the nest-dev build. Select it for a profile with
+
+"KERNEL": {"backend": "numpy"}
+
+Supported models: iaf_psc_alpha, iaf_psc_exp and pixel_iaf_psc_exp neurons;
+spike_detector, multimeter, dc_generator and image_sequence_generator
+(straight player) devices; static_synapse, stdp_synapse_hom,
+stdp_pl_synapse_hom and stdp_pl_norm_synapse_hom synapses.
+
+Neurons are integrated exactly with the fixed kernel resolution and spikes
+are bound to the time grid. Threads are not used and dynamics have no
+random parts, so seeds are accepted but have no effect.
+"""
+
+import numpy as np
+
+from kernel import Kernel
+from models import NESTError
+
+_kernel = Kernel()
+
+
+def _is_connections(objs):
+    return len(objs) > 0 and hasattr(objs[0], '__len__')
+
+
+def _ports(connections):
+    return np.asarray(connections, dtype=np.int64).reshape(-1, 5)[:, 4]
+
+
+def ResetKernel():
+    _kernel.reset()
+
+
+def SetKernelStatus(params):
+    params = dict(params)
+    unknown = set(params) - set(_kernel.status)
+    read_only = set(params) & set(('time', 'total_num_virtual_procs'))
+    if unknown or read_only:
+        raise NESTError("Can't set kernel parameters %s" %
+                        ', '.join(sorted(unknown | read_only)))
+
+    if 'resolution' in params and _kernel.size > 0:
+        raise NESTError("Resolution can't be changed after nodes are created")
+
+    if 'local_num_threads' in params:
+        _kernel.status['total_num_virtual_procs'] = params['local_num_threads']
+
+    _kernel.status.update(params)
+
+
+def GetKernelStatus(keys=None):
+    if keys is None:
+        return dict(_kernel.status)
+    if isinstance(keys, basestring):
+        return _kernel.status[keys]
+
+    return tuple(_kernel.status[k] for k in keys)
+
+
+def CopyModel(existing, new, params=None):
+    _kernel.copy_model(existing, new, params)
+
+
+def Create(model, n=1, params=None):
+    return _kernel.create(model, n, params)
+
+
+def Connect(pre, post, conn_spec=None, syn_spec=None, model=None):
+    """
+    Supports 'all_to_all' (default) and 'one_to_one' rules. Weights and
+    delays may be scalars or arrays, (targets x sources) for all_to_all.
+    """
+    if isinstance(conn_spec, dict):
+        rule = conn_spec.get('rule', 'all_to_all')
+    else:
+        rule = conn_spec or 'all_to_all'
+
+    if isinstance(syn_spec, basestring) or syn_spec is None:
+        syn_spec = {'model': syn_spec or model or 'static_synapse'}
+
+    synapse_name = syn_spec.get('model', model or 'static_synapse')
+    weights = syn_spec.get('weight')
+    delays = syn_spec.get('delay')
+
+    pre = np.asarray(pre, dtype=np.int64)
+    post = np.asarray(post, dtype=np.int64)
+
+    if rule == 'one_to_one':
+        if len(pre) != len(post):
+            raise NESTError("one_to_one requires equally long sources and targets")
+        sources, targets = pre, post
+
+    elif rule == 'all_to_all':
+        sources = np.repeat(pre, len(post))
+        targets = np.tile(post, len(pre))
+
+        # (targets x sources) arrays to one value per connection
+        to_pairs = lambda x: np.asarray(x, dtype=float).T.ravel() \
+            if np.ndim(x) == 2 else x
+        weights, delays = to_pairs(weights), to_pairs(delays)
+
+    else:
+        raise NESTError("Connection rule %s is not supported" % rule)
+
+    _kernel.connect(sources, targets, synapse_name, weights, delays)
+
+
+def ConvergentConnect(pre, post, weight=None, delay=None, model='static_synapse'):
+    syn_spec = {'model': model, 'weight': weight, 'delay': delay}
+    Connect(pre, post, 'all_to_all', syn_spec)
+
+
+def DivergentConnect(pre, post, weight=None, delay=None, model='static_synapse'):
+    syn_spec = {'model': model, 'weight': weight, 'delay': delay}
+    Connect(pre, post, 'all_to_all', syn_spec)
+
+
+def GetConnections(source=None, target=None, synapse_model=None):
+    return list(_kernel.connections(source, target, synapse_model))
+
+
+def GetStatus(objs, keys=None):
+    if _is_connections(objs):
+        ports = _ports(objs)
+        if keys is None:
+            keys = ['source', 'target', 'weight', 'delay', 'synapse_model',
+                    'receptor', 'port']
+            columns = [_kernel.connection_values(ports, k) for k in keys]
+            return tuple(dict(zip(keys, row)) for row in zip(*columns))
+
+        if isinstance(keys, basestring):
+            return tuple(_kernel.connection_values(ports, keys))
+
+        columns = [_kernel.connection_values(ports, k) for k in keys]
+        return tuple(zip(*columns))
+
+    nodes = [_kernel.node(x) for x in objs]
+    if keys is None:
+        return tuple(m.status(i) for m, i in nodes)
+    if isinstance(keys, basestring):
+        return tuple(m.get(i, keys) for m, i in nodes)
+
+    return tuple(tuple(m.get(i, k) for k in keys) for m, i in nodes)
+
+
+def SetStatus(objs, params, val=None):
+    if val is not None:
+        params = {params: val}
+    if isinstance(params, dict):
+        params = [params] * len(objs)
+    if len(params) != len(objs):
+        raise NESTError("Number of parameter dicts should be %d" % len(objs))
+
+    if _is_connections(objs):
+        _kernel.set_connection_values(_ports(objs), params)
+        return
+
+    for node_id, node_params in zip(objs, params):
+        model, index = _kernel.node(node_id)
+        model.set(index, node_params)
+
+
+def Simulate(t):
+    _kernel.simulate(float(t))
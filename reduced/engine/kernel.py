@@ -0,0 +1,441 @@
+import numpy as np
+
+import models
+from models import NESTError
+
+
+class Kernel(object):
+    """
+    A time-stepped simulation kernel. Nodes are grouped by model, so that all
+    neurons of a model are updated with a few vectorized numpy operations per
+    time step. Connections are stored as columns (source, target, synapse
+    model, weight, delay), one row per connection; the row index serves as
+    the connection port.
+
+    Spikes are delivered through a ring buffer with one slot per time step of
+    the longest delay. Plastic synapses keep a presynaptic trace per synapse
+    model and a postsynaptic trace per neuron, and are updated on-line on
+    every pre- and postsynaptic spike.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.status = {
+            'resolution': 0.1,
+            'local_num_threads': 1,
+            'total_num_virtual_procs': 1,
+            'grng_seed': 0,
+            'rng_seeds': [1],
+            'time': 0.0
+        }
+
+        self.models = {}
+        for name, cls in models.neuron_models.items():
+            self.models[name] = cls(name)
+        for name, cls in models.device_models.items():
+            self.models[name] = cls(name)
+
+        self.synapse_names = []
+        self.synapse_models = {}
+        for name, cls in sorted(models.synapse_models.items()):
+            self._add_synapse_model(cls(name))
+
+        self._nodes = [None]  # NEST ID -> (model, index in the model)
+
+        self.source = np.zeros(0, dtype=np.int64)
+        self.target = np.zeros(0, dtype=np.int64)
+        self.synapse = np.zeros(0, dtype=np.int64)
+        self.weight = np.zeros(0)
+        self.delay = np.zeros(0)
+
+        self._step = 0
+        self._slot = 0
+        self._ring = np.zeros((2, 1, 0))  # (ex/in, slots, neurons)
+        self._k_minus = np.zeros(0)
+        self._k_plus = {}
+        self._reference = {}
+
+    # nodes
+
+    @property
+    def size(self):
+        return len(self._nodes) - 1
+
+    def node(self, node_id):
+        node_id = int(node_id)
+        if not 0 < node_id < len(self._nodes):
+            raise NESTError("Unknown node %d" % node_id)
+
+        return self._nodes[node_id]
+
+    def copy_model(self, old, new, params=None):
+        if new in self.models or new in self.synapse_models:
+            raise NESTError("Model %s already exists" % new)
+
+        if old in self.synapse_models:
+            self._add_synapse_model(self.synapse_models[old].copy(new, params))
+        elif old in self.models:
+            self.models[new] = self.models[old].copy(new, params)
+        else:
+            raise NESTError("Unknown model %s" % old)
+
+    def _add_synapse_model(self, synapse_model):
+        self.synapse_names.append(synapse_model.name)
+        self.synapse_models[synapse_model.name] = synapse_model
+
+    def create(self, model_name, n=1, params=None):
+        if model_name not in self.models:
+            raise NESTError("Unknown model %s" % model_name)
+
+        if params is None:
+            params = [{}] * n
+        elif isinstance(params, dict):
+            params = [params] * n
+        elif len(params) != n:
+            raise NESTError("Number of parameter dicts should be %d" % n)
+
+        model = self.models[model_name]
+        ids = np.arange(len(self._nodes), len(self._nodes) + n)
+        indexes = model.add(ids, params)
+        self._nodes.extend((model, int(i)) for i in indexes)
+
+        return tuple(int(x) for x in ids)
+
+    # connections
+
+    def connect(self, sources, targets, synapse_name, weights=None,
+                delays=None):
+        """
+        Creates connections between aligned arrays of sources and targets.
+
+        :param weights: array of weights, default weight of the model if None
+        :param delays:  array of delays, default delay of the model if None
+        """
+        if synapse_name not in self.synapse_models:
+            raise NESTError("Unknown synapse model %s" % synapse_name)
+
+        for node_id in set(sources) | set(targets):
+            self.node(node_id)
+
+        params = self.synapse_models[synapse_name].params
+        count = len(sources)
+
+        if weights is None:
+            weights = params['weight']
+        if delays is None:
+            delays = params['delay']
+
+        weights = np.broadcast_to(np.asarray(weights, dtype=float), (count,))
+        delays = np.broadcast_to(np.asarray(delays, dtype=float), (count,))
+        if np.any(delays < self.status['resolution']):
+            raise NESTError("Delays should not be less than the resolution")
+
+        synapse = self.synapse_names.index(synapse_name)
+        self.source = np.concatenate([self.source, sources]).astype(np.int64)
+        self.target = np.concatenate([self.target, targets]).astype(np.int64)
+        self.synapse = np.concatenate([self.synapse, [synapse] * count]).astype(np.int64)
+        self.weight = np.concatenate([self.weight, weights])
+        self.delay = np.concatenate([self.delay, delays])
+
+    def connections(self, sources=None, targets=None, synapse_name=None):
+        """
+        :return:    2D array of connection ids, one row per connection
+        """
+        mask = np.ones(len(self.source), dtype=bool)
+        if sources is not None:
+            mask &= np.in1d(self.source, np.asarray(sources, dtype=np.int64))
+        if targets is not None:
+            mask &= np.in1d(self.target, np.asarray(targets, dtype=np.int64))
+        if synapse_name is not None:
+            mask &= self.synapse == self.synapse_names.index(synapse_name)
+
+        ports = np.flatnonzero(mask)
+        ids = np.zeros((len(ports), 5), dtype=np.int64)
+        ids[:, 0] = self.source[ports]
+        ids[:, 1] = self.target[ports]
+        ids[:, 3] = self.synapse[ports]
+        ids[:, 4] = ports
+
+        return ids
+
+    def connection_values(self, ports, key):
+        """
+        :return:    list of values of a given key, one per connection
+        """
+        if key in ('weight', 'delay', 'source', 'target'):
+            return getattr(self, key)[ports].tolist()
+        if key == 'synapse_model':
+            return [self.synapse_names[x] for x in self.synapse[ports]]
+        if key in ('receptor', 'port'):
+            return [0] * len(ports) if key == 'receptor' else list(ports)
+
+        values = []
+        for synapse in self.synapse[ports]:
+            params = self.synapse_models[self.synapse_names[synapse]].params
+            if key not in params:
+                raise NESTError("Connection has no parameter %s" % key)
+            values.append(params[key])
+
+        return values
+
+    def set_connection_values(self, ports, params):
+        """
+        :param params:  list of dicts, one per connection
+        """
+        for port, conn_params in zip(ports, params):
+            for key, value in conn_params.items():
+                if key not in ('weight', 'delay'):
+                    raise NESTError("Connection parameter %s is read-only" % key)
+                getattr(self, key)[port] = value
+
+    # simulation
+
+    def _prepare(self):
+        h = self.status['resolution']
+        self._h = h
+
+        neuron_models = [m for m in self.models.values()
+                         if isinstance(m, models.NeuronModel) and len(m) > 0]
+        device_models = [m for m in self.models.values()
+                         if isinstance(m, models.DeviceModel) and len(m) > 0]
+
+        # dense indexes of neurons in the order of IDs, so that indexes of
+        # existing neurons do not change when new ones are created
+        is_neuron = np.zeros(len(self._nodes), dtype=bool)
+        for model in neuron_models:
+            is_neuron[model.ids] = True
+
+        self._neuron_ids = np.flatnonzero(is_neuron)
+        self._dense = np.cumsum(is_neuron) - 1
+        self._dense[~is_neuron] = -1
+
+        n = len(self._neuron_ids)
+        for model in neuron_models:
+            model.dense = self._dense[model.ids]
+            model.prepare(h)
+        self._neuron_models = neuron_models
+
+        # connections between neurons, indexed by source
+        src, tgt = self._dense[self.source], self._dense[self.target]
+        rows = np.flatnonzero((src >= 0) & (tgt >= 0))
+        rows = rows[np.argsort(src[rows], kind='mergesort')]
+
+        self._rows = rows
+        self._offsets = np.searchsorted(src[rows], np.arange(n + 1))
+        self._src = src
+        self._tgt = tgt
+        self._delay_steps = np.maximum(np.round(self.delay / h), 1).astype(np.int64)
+
+        max_delay = self._delay_steps[rows].max() if len(rows) else 1
+        self._resize_buffers(n, max_delay + 1)
+
+        # plastic connections by synapse model
+        self._plastic = []
+        for i, name in enumerate(self.synapse_names):
+            synapse_model = self.synapse_models[name]
+            plastic_rows = rows[self.synapse[rows] == i]
+            if not synapse_model.plastic or len(plastic_rows) == 0:
+                continue
+
+            k_plus = self._k_plus.get(name, np.zeros(0))
+            self._k_plus[name] = np.concatenate([k_plus, np.zeros(n - len(k_plus))])
+            self._plastic.append((synapse_model, plastic_rows))
+
+            if hasattr(synapse_model, 'normalize'):
+                totals = np.bincount(tgt[plastic_rows], self.weight[plastic_rows],
+                                     minlength=n)
+                reference = self._reference.get(name, np.zeros(0))
+                reference = np.concatenate([reference, np.zeros(n - len(reference))])
+                self._reference[name] = np.where(reference > 0, reference, totals)
+
+        self._tau_minus = np.ones(n)
+        for model in neuron_models:
+            self._tau_minus[model.dense] = model.values['tau_minus']
+
+        # devices with their targets or sources as dense indexes
+        self._devices = []
+        for model in device_models:
+            model.prepare(h)
+            for index, node_id in enumerate(model.ids):
+                out_rows = np.flatnonzero((self.source == node_id) & (tgt >= 0))
+                in_rows = np.flatnonzero((self.target == node_id) & (src >= 0))
+                targets, sources = tgt[out_rows], src[in_rows]
+                self._devices.append((model, index, targets, sources,
+                                      self._device_index(model, targets, sources)))
+
+    def _locate(self, dense):
+        # neuron models of given neurons with positions inside these models
+        located = []
+        for model in self._neuron_models:
+            lookup = -np.ones(len(self._neuron_ids), dtype=np.int64)
+            lookup[model.dense] = np.arange(len(model))
+            local = lookup[dense]
+            found = np.flatnonzero(local >= 0)
+            if len(found) > 0:
+                located.append((model, found, local[found]))
+
+        return located
+
+    def _device_index(self, model, targets, sources):
+        # what a device needs at every step, computed once per simulation
+        if isinstance(model, models.ImageSequenceGenerator):
+            x = np.zeros(len(targets), dtype=np.int64)
+            y = np.zeros(len(targets), dtype=np.int64)
+            for neuron_model, found, local in self._locate(targets):
+                if 'x' in neuron_model.values:
+                    x[found] = neuron_model.values['x'][local]
+                    y[found] = neuron_model.values['y'][local]
+            return x, y
+
+        if isinstance(model, models.SpikeDetector):
+            observed = np.zeros(len(self._neuron_ids), dtype=bool)
+            observed[sources] = True
+            return observed
+
+        if isinstance(model, models.Multimeter):
+            return self._locate(targets)
+
+    def _resize_buffers(self, n, slots):
+        ring = self._ring
+        old_slots, old_n = ring.shape[1], ring.shape[2]
+        slots = max(slots, old_slots)
+
+        if (slots, n) != (old_slots, old_n):
+            # keep spikes in flight at the same distance from the current slot
+            new = np.zeros((2, slots, n))
+            order = (self._slot + np.arange(old_slots)) % old_slots
+            new[:, :old_slots, :old_n] = ring[:, order]
+            self._ring = new
+            self._slot = 0
+
+        self._k_minus = np.concatenate([self._k_minus,
+                                        np.zeros(n - len(self._k_minus))])
+
+    def simulate(self, duration):
+        self._prepare()
+
+        h = self._h
+        n = len(self._neuron_ids)
+        steps = int(round(duration / h))
+        slots = self._ring.shape[1]
+
+        stimulators = [d for d in self._devices if d[0].node_type == 'stimulator']
+        recorders = [d for d in self._devices if d[0].node_type == 'recorder']
+        decay_minus = np.exp(-h / self._tau_minus)
+        decay_plus = [np.exp(-h / m.params['tau_plus']) for m, _ in self._plastic]
+        norm_steps = [max(int(round(1000.0 / m.params['norm_freq'] / h)), 1)
+                      if hasattr(m, 'normalize') else None
+                      for m, _ in self._plastic]
+
+        current = np.zeros(n)
+        stimulus = np.zeros(n)
+
+        for _ in range(steps):
+            time = self._step * h
+            ex = self._ring[0, self._slot].copy()
+            inh = self._ring[1, self._slot].copy()
+            self._ring[:, self._slot] = 0
+
+            current.fill(0)
+            stimulus.fill(0)
+            for model, index, targets, _, pixels in stimulators:
+                if isinstance(model, models.DCGenerator):
+                    current[targets] += model.current(index, time)
+                else:
+                    frame = model.frame(index, time)
+                    x, y = pixels
+                    inside = (x < frame.shape[0]) & (y < frame.shape[1])
+                    stimulus[targets[inside]] = frame[x[inside], y[inside]]
+
+            spikes = np.zeros(n, dtype=bool)
+            for model in self._neuron_models:
+                d = model.dense
+                spikes[d] = model.update(ex[d], inh[d], current[d], stimulus[d])
+
+            fired = np.flatnonzero(spikes)
+            if len(fired) > 0:
+                self._deliver(fired, slots)
+                self._learn(spikes)
+
+            self._k_minus *= decay_minus
+            self._k_minus[fired] += 1
+            for (synapse_model, _), decay in zip(self._plastic, decay_plus):
+                k_plus = self._k_plus[synapse_model.name]
+                k_plus *= decay
+                k_plus[fired] += 1
+
+            self._step += 1
+            self._slot = (self._slot + 1) % slots
+
+            for (synapse_model, rows), every in zip(self._plastic, norm_steps):
+                if every is not None and self._step % every == 0:
+                    self._normalize(synapse_model, rows)
+
+            stamp = self._step * h
+            for model, index, targets, sources, located in recorders:
+                observed = targets if isinstance(model, models.Multimeter) else sources
+                self._record(model, index, observed, located, fired, stamp)
+
+        self.status['time'] = self._step * h
+
+    def _deliver(self, fired, slots):
+        # all outgoing connections of fired neurons, as rows of the table
+        starts, ends = self._offsets[fired], self._offsets[fired + 1]
+        counts = ends - starts
+        total = counts.sum()
+        if total == 0:
+            return
+
+        shifts = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        rows = self._rows[np.arange(total) + shifts]
+
+        weights = self.weight[rows]
+        slot = (self._slot + self._delay_steps[rows]) % slots
+        channel = (weights < 0).astype(np.int64)
+        np.add.at(self._ring, (channel, slot, self._tgt[rows]), weights)
+
+    def _learn(self, spikes):
+        for synapse_model, rows in self._plastic:
+            k_plus = self._k_plus[synapse_model.name]
+            src, tgt = self._src[rows], self._tgt[rows]
+
+            pre = rows[spikes[src]]
+            if len(pre) > 0:
+                self.weight[pre] = synapse_model.depress(
+                    self.weight[pre], self._k_minus[self._tgt[pre]])
+
+            post = rows[spikes[tgt]]
+            if len(post) > 0:
+                self.weight[post] = synapse_model.facilitate(
+                    self.weight[post], k_plus[self._src[post]])
+
+    def _normalize(self, synapse_model, rows):
+        tgt = self._tgt[rows]
+        totals = np.bincount(tgt, self.weight[rows], minlength=len(self._k_minus))
+        reference = self._reference[synapse_model.name]
+        self.weight[rows] = synapse_model.normalize(self.weight[rows],
+                                                    totals[tgt], reference[tgt])
+
+    def _record(self, model, index, observed, located, fired, stamp):
+        if isinstance(model, models.SpikeDetector):
+            senders = fired[located[fired]]
+            if len(senders) > 0:
+                model.record(index, self._neuron_ids[senders],
+                             np.repeat(stamp, len(senders)))
+            return
+
+        node = model.nodes[index]
+        every = max(int(round(node['interval'] / self._h)), 1)
+        if self._step % every != 0 or len(observed) == 0:
+            return
+
+        values = {}
+        for key in node['record_from']:
+            values[key] = np.zeros(len(observed))
+            for neuron_model, found, local in located:
+                values[key][found] = neuron_model.values[key][local]
+
+        model.record(index, self._neuron_ids[observed],
+                     np.repeat(stamp, len(observed)), **values)
@@ -0,0 +1,584 @@
+import os
+import copy
+import numpy as np
+
+
+class NESTError(Exception):
+    pass
+
+
+#--------
+# Neurons
+#--------
+
+class NeuronModel(object):
+    """
+    An abstract neuron model. Parameters and states of all nodes of a model
+    are stored as numpy arrays, one element per node, so that all nodes of
+    the model are updated at once.
+    """
+
+    node_type = 'neuron'
+    defaults = {}
+
+    def __init__(self, name, defaults=None):
+        self.name = name
+        self.defaults = dict(type(self).defaults, **(defaults or {}))
+
+        self.ids = np.zeros(0, dtype=np.int64)
+        self.dense = np.zeros(0, dtype=np.int64)  # indexes in the kernel
+        self.values = dict((k, np.zeros(0)) for k in self.defaults)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def copy(self, name, defaults=None):
+        return type(self)(name, dict(self.defaults, **(defaults or {})))
+
+    def add(self, ids, params):
+        """
+        :param ids:     NEST IDs of new nodes
+        :param params:  list of parameter dicts, one per new node
+        :return:        indexes of new nodes in the model
+        """
+        start = len(self.ids)
+        self.ids = np.concatenate([self.ids, ids]).astype(np.int64)
+
+        for key, value in self.values.items():
+            new = np.empty(len(ids))
+            new.fill(self.defaults[key])
+            self.values[key] = np.concatenate([value, new])
+
+        self._grow(len(ids))
+
+        for i, node_params in enumerate(params):
+            self.set(start + i, node_params)
+
+        return np.arange(start, len(self.ids))
+
+    def _grow(self, count):
+        # a hook to extend internal state arrays for new nodes
+        pass
+
+    def get(self, index, key):
+        if key == 'model':
+            return self.name
+        if key == 'node_type':
+            return self.node_type
+        if key == 'global_id':
+            return int(self.ids[index])
+        if key not in self.values:
+            raise NESTError("%s has no parameter %s" % (self.name, key))
+
+        return float(self.values[key][index])
+
+    def status(self, index):
+        keys = ['model', 'node_type', 'global_id'] + sorted(self.values)
+        return dict((k, self.get(index, k)) for k in keys)
+
+    def set(self, index, params):
+        unknown = sorted(set(params) - set(self.values))
+        if unknown:
+            raise NESTError("%s has no parameters %s" %
+                            (self.name, ', '.join(unknown)))
+
+        for key, value in params.items():
+            self.values[key][index] = value
+
+    def prepare(self, h):
+        """
+        Is called before every simulation with a given resolution (ms).
+        """
+        pass
+
+    def update(self, ex, inh, current, stimulus):
+        """
+        Advances all nodes by one time step.
+
+        :param ex:          summed excitatory input arriving now (array)
+        :param inh:         summed inhibitory input arriving now (array)
+        :param current:     external current, e.g. from DC generators (array)
+        :param stimulus:    image intensity at the node position (array)
+        :return:            boolean array, True for nodes that spiked
+        """
+        raise NotImplementedError()
+
+
+def _current_propagators(tau_syn, tau_m, c_m, h):
+    # contributions of an alpha-shaped (P31) and an exponential (P32) current
+    # of unit initial value to the membrane potential after one time step
+    a = 1.0 / tau_syn - 1.0 / tau_m
+    equal = np.abs(a * h) < 1e-10
+    a = np.where(equal, 1.0, a)
+
+    decay = np.exp(-h / tau_m) / c_m
+    p31 = np.where(equal, h * h / 2, (1 - np.exp(-a * h) * (1 + a * h)) / a**2)
+    p32 = np.where(equal, h, (1 - np.exp(-a * h)) / a)
+
+    return p31 * decay, p32 * decay
+
+
+class IafModel(NeuronModel):
+    """
+    Leaky integrate-and-fire neurons with current based synapses, integrated
+    exactly for a fixed time step. Like in NEST, the membrane potential is
+    kept relative to E_L, so changing E_L moves V_m along.
+    """
+
+    defaults = {
+        'V_m': -70.0,
+        'E_L': -70.0,
+        'C_m': 250.0,
+        'tau_m': 10.0,
+        't_ref': 2.0,
+        'V_th': -55.0,
+        'V_reset': -70.0,
+        'tau_syn_ex': 2.0,
+        'tau_syn_in': 2.0,
+        'I_e': 0.0,
+        'V_min': -np.inf,
+        'tau_minus': 20.0
+    }
+
+    def _grow(self, count):
+        state = getattr(self, 'refractory', np.zeros(0, dtype=np.int64))
+        self.refractory = np.concatenate([state, np.zeros(count, dtype=np.int64)])
+
+    def set(self, index, params):
+        if 'E_L' in params and 'V_m' not in params:
+            params = dict(params)
+            shift = params['E_L'] - self.values['E_L'][index]
+            params['V_m'] = self.values['V_m'][index] + shift
+
+        super(IafModel, self).set(index, params)
+
+    def prepare(self, h):
+        v = self.values
+        self.p_mm = np.exp(-h / v['tau_m'])
+        self.p_m0 = v['tau_m'] / v['C_m'] * (1 - self.p_mm)
+        self.ref_steps = np.round(v['t_ref'] / h).astype(np.int64)
+
+    def _integrate(self, v, input_term, current):
+        # one step of the membrane potential (relative to E_L) of all
+        # non-refractory neurons, spike detection and reset
+        values = self.values
+        free = self.refractory == 0
+
+        v_new = self.p_mm * v + self.p_m0 * (values['I_e'] + current) + input_term
+        v_new = np.maximum(v_new, values['V_min'] - values['E_L'])
+        v = np.where(free, v_new, v)
+        self.refractory[~free] -= 1
+
+        spikes = v >= values['V_th'] - values['E_L']
+        v[spikes] = (values['V_reset'] - values['E_L'])[spikes]
+        self.refractory[spikes] = self.ref_steps[spikes]
+
+        values['V_m'] = v + values['E_L']
+        return spikes
+
+
+class IafPscAlpha(IafModel):
+    """
+    iaf_psc_alpha: alpha-shaped postsynaptic currents, with a peak equal to
+    the synaptic weight (pA).
+    """
+
+    def _grow(self, count):
+        super(IafPscAlpha, self)._grow(count)
+        for name in ('dI_ex', 'I_ex', 'dI_in', 'I_in'):
+            state = getattr(self, name, np.zeros(0))
+            setattr(self, name, np.concatenate([state, np.zeros(count)]))
+
+    def prepare(self, h):
+        super(IafPscAlpha, self).prepare(h)
+
+        v = self.values
+        self.p_ex = np.exp(-h / v['tau_syn_ex'])
+        self.p_in = np.exp(-h / v['tau_syn_in'])
+        self.p31_ex, self.p32_ex = _current_propagators(v['tau_syn_ex'],
+                                                        v['tau_m'], v['C_m'], h)
+        self.p31_in, self.p32_in = _current_propagators(v['tau_syn_in'],
+                                                        v['tau_m'], v['C_m'], h)
+        self.h = h
+
+    def update(self, ex, inh, current, stimulus):
+        values = self.values
+
+        input_term = self.p31_ex * self.dI_ex + self.p32_ex * self.I_ex + \
+            self.p31_in * self.dI_in + self.p32_in * self.I_in
+        spikes = self._integrate(values['V_m'] - values['E_L'], input_term,
+                                 current)
+
+        self.I_ex = self.h * self.p_ex * self.dI_ex + self.p_ex * self.I_ex
+        self.dI_ex = self.p_ex * self.dI_ex + np.e / values['tau_syn_ex'] * ex
+        self.I_in = self.h * self.p_in * self.dI_in + self.p_in * self.I_in
+        self.dI_in = self.p_in * self.dI_in + np.e / values['tau_syn_in'] * inh
+
+        return spikes
+
+
+class IafPscExp(IafModel):
+    """
+    iaf_psc_exp: exponentially decaying postsynaptic currents, starting with
+    the synaptic weight (pA).
+    """
+
+    def _grow(self, count):
+        super(IafPscExp, self)._grow(count)
+        for name in ('I_syn_ex', 'I_syn_in'):
+            state = getattr(self, name, np.zeros(0))
+            setattr(self, name, np.concatenate([state, np.zeros(count)]))
+
+    def prepare(self, h):
+        super(IafPscExp, self).prepare(h)
+
+        v = self.values
+        self.p_ex = np.exp(-h / v['tau_syn_ex'])
+        self.p_in = np.exp(-h / v['tau_syn_in'])
+        self.p21_ex = _current_propagators(v['tau_syn_ex'], v['tau_m'],
+                                           v['C_m'], h)[1]
+        self.p21_in = _current_propagators(v['tau_syn_in'], v['tau_m'],
+                                           v['C_m'], h)[1]
+
+    def _external(self, current, stimulus):
+        return current
+
+    def update(self, ex, inh, current, stimulus):
+        values = self.values
+
+        input_term = self.p21_ex * self.I_syn_ex + self.p21_in * self.I_syn_in
+        spikes = self._integrate(values['V_m'] - values['E_L'], input_term,
+                                 self._external(current, stimulus))
+
+        self.I_syn_ex = self.p_ex * self.I_syn_ex + ex
+        self.I_syn_in = self.p_in * self.I_syn_in + inh
+
+        return spikes
+
+
+class PixelIafPscExp(IafPscExp):
+    """
+    pixel_iaf_psc_exp: an iaf_psc_exp neuron that watches the pixel (x, y) of
+    an image sequence generator and gets a current of weight * intensity.
+    """
+
+    defaults = dict(IafPscExp.defaults, x=0.0, y=0.0, weight=1.0)
+
+    def _external(self, current, stimulus):
+        return current + self.values['weight'] * stimulus
+
+
+#--------
+# Devices
+#--------
+
+class DeviceModel(object):
+    """
+    An abstract device model. Devices are few, so every node just keeps a
+    dict of its parameters.
+    """
+
+    node_type = None
+    defaults = {}
+
+    def __init__(self, name, defaults=None):
+        self.name = name
+        self.defaults = dict(type(self).defaults, **(defaults or {}))
+
+        self.ids = []
+        self.nodes = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def copy(self, name, defaults=None):
+        return type(self)(name, dict(self.defaults, **(defaults or {})))
+
+    def add(self, ids, params):
+        start = len(self.ids)
+        for node_id, node_params in zip(ids, params):
+            self.ids.append(int(node_id))
+            self.nodes.append(copy.deepcopy(self.defaults))
+            self._grow()
+            self.set(len(self.ids) - 1, node_params)
+
+        return np.arange(start, len(self.ids))
+
+    def _grow(self):
+        pass
+
+    def get(self, index, key):
+        if key == 'model':
+            return self.name
+        if key == 'node_type':
+            return self.node_type
+        if key == 'global_id':
+            return self.ids[index]
+        if key not in self.nodes[index]:
+            raise NESTError("%s has no parameter %s" % (self.name, key))
+
+        return self.nodes[index][key]
+
+    def status(self, index):
+        keys = ['model', 'node_type', 'global_id'] + sorted(self.nodes[index])
+        return dict((k, self.get(index, k)) for k in keys)
+
+    def set(self, index, params):
+        unknown = sorted(set(params) - set(self.nodes[index]))
+        if unknown:
+            raise NESTError("%s has no parameters %s" %
+                            (self.name, ', '.join(unknown)))
+
+        self.nodes[index].update(params)
+
+    def prepare(self, h):
+        pass
+
+
+class Recorder(DeviceModel):
+    """
+    Keeps recorded events of every node as a list of chunks, which are
+    concatenated on request.
+    """
+
+    node_type = 'recorder'
+    event_keys = ('senders', 'times')
+
+    def _grow(self):
+        self.nodes[-1]['_chunks'] = []
+
+    def record(self, index, senders, times, **values):
+        chunk = dict(values, senders=senders, times=times)
+        self.nodes[index]['_chunks'].append(chunk)
+
+    def events(self, index):
+        chunks = self.nodes[index]['_chunks']
+        keys = list(self.event_keys) + list(self._observed(index))
+
+        events = {}
+        for key in keys:
+            arrays = [np.asarray(c[key]) for c in chunks]
+            dtype = np.int64 if key == 'senders' else float
+            events[key] = np.concatenate(arrays).astype(dtype) if arrays \
+                else np.zeros(0, dtype=dtype)
+
+        return events
+
+    def _observed(self, index):
+        return ()
+
+    def get(self, index, key):
+        if key == 'events':
+            return self.events(index)
+        if key == 'n_events':
+            return int(sum(len(c['senders']) for c in self.nodes[index]['_chunks']))
+
+        return super(Recorder, self).get(index, key)
+
+    def status(self, index):
+        status = super(Recorder, self).status(index)
+        del status['_chunks']
+        status.update(events=self.events(index),
+                      n_events=self.get(index, 'n_events'))
+        return status
+
+    def set(self, index, params):
+        params = dict(params)
+        if 'n_events' in params:
+            if params.pop('n_events') != 0:
+                raise NESTError("n_events can only be set to 0")
+            self.nodes[index]['_chunks'] = []
+
+        super(Recorder, self).set(index, params)
+
+
+class SpikeDetector(Recorder):
+
+    defaults = {'withtime': True, 'withgid': True}
+
+
+class Multimeter(Recorder):
+
+    defaults = {'record_from': [], 'withtime': True, 'interval': 1.0}
+
+    def _observed(self, index):
+        return self.nodes[index]['record_from']
+
+
+class DCGenerator(DeviceModel):
+
+    node_type = 'stimulator'
+    defaults = {'amplitude': 0.0, 'start': 0.0, 'stop': np.inf}
+
+    def current(self, index, time):
+        node = self.nodes[index]
+        return node['amplitude'] if node['start'] <= time < node['stop'] else 0.0
+
+
+class ImageSequenceGenerator(DeviceModel):
+    """
+    Plays frames of an .idlmov movie one after another ('straight' player):
+    every frame is shown for stimulus_interval ms, followed by a blank
+    inter_stimulus_interval. The sequence starts at the origin (ms), as
+    stimulating devices of NEST do.
+    """
+
+    node_type = 'stimulator'
+    defaults = {'filename': '', 'player': {}, 'origin': 0.0}
+
+    def _grow(self):
+        self.nodes[-1]['_frames'] = None
+
+    def status(self, index):
+        status = super(ImageSequenceGenerator, self).status(index)
+        del status['_frames']
+        return status
+
+    def set(self, index, params):
+        super(ImageSequenceGenerator, self).set(index, params)
+        self.nodes[index]['_frames'] = None
+
+    @staticmethod
+    def read_movie(path):
+        """
+        :param path:    path to the .idlmov file
+        :return:        3D array of frames (frame, x, y)
+        """
+        if not os.path.exists(path):
+            raise NESTError("Movie file %s not found" % path)
+
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        header = np.frombuffer(data[20:72], dtype=np.int32)
+        width, height = header[7], header[8]
+
+        frames = np.frombuffer(data[72:], dtype=np.float32)
+        frames = frames.reshape(-1, height, width)
+        return frames.transpose(0, 2, 1).astype(float)
+
+    def frame(self, index, time):
+        """
+        :return:    2D array (x, y) of intensities shown at a given time
+        """
+        node = self.nodes[index]
+        if node['_frames'] is None:
+            node['_frames'] = self.read_movie(node['filename'])
+
+        player = node['player']
+        if player.get('type', 'straight') != 'straight':
+            raise NESTError("Only the straight player is supported")
+
+        params = player.get('parameter', {})
+        shown = params['stimulus_interval']
+        period = shown + params['inter_stimulus_interval']
+
+        frames = node['_frames']
+        time = time - node['origin']
+        k = int(time // period)
+        if time < 0 or time - k * period >= shown:
+            return np.zeros(frames.shape[1:])
+
+        return frames[k % len(frames)]
+
+
+#---------
+# Synapses
+#---------
+
+class StaticSynapse(object):
+
+    plastic = False
+    defaults = {'weight': 1.0, 'delay': 1.0}
+
+    def __init__(self, name, defaults=None):
+        self.name = name
+        self.params = dict(type(self).defaults, **(defaults or {}))
+
+    def copy(self, name, defaults=None):
+        return type(self)(name, dict(self.params, **(defaults or {})))
+
+
+class STDPSynapseHom(StaticSynapse):
+    """
+    stdp_synapse_hom: weights are normalized by Wmax and kept in [0, Wmax].
+    """
+
+    plastic = True
+    defaults = dict(StaticSynapse.defaults, tau_plus=20.0, alpha=1.0,
+                    mu_plus=1.0, mu_minus=1.0, Wmax=100.0, **{'lambda': 0.01})
+
+    def facilitate(self, w, k_plus):
+        p = self.params
+        norm = w / p['Wmax']
+        norm = norm + p['lambda'] * (1 - norm)**p['mu_plus'] * k_plus
+        return np.minimum(norm, 1.0) * p['Wmax']
+
+    def depress(self, w, k_minus):
+        p = self.params
+        norm = w / p['Wmax']
+        norm = norm - p['alpha'] * p['lambda'] * norm**p['mu_minus'] * k_minus
+        return np.maximum(norm, 0.0) * p['Wmax']
+
+
+class STDPPLSynapseHom(StaticSynapse):
+    """
+    stdp_pl_synapse_hom: power-law facilitation and multiplicative depression.
+    """
+
+    plastic = True
+    defaults = dict(StaticSynapse.defaults, tau_plus=20.0, alpha=1.0, mu=0.4,
+                    **{'lambda': 0.1})
+
+    def facilitate(self, w, k_plus):
+        p = self.params
+        return w + p['lambda'] * np.abs(w)**p['mu'] * k_plus
+
+    def depress(self, w, k_minus):
+        p = self.params
+        return np.maximum(w - p['lambda'] * p['alpha'] * w * k_minus, 0.0)
+
+
+class STDPPLNormSynapseHom(STDPPLSynapseHom):
+    """
+    stdp_pl_norm_synapse_hom: stdp_pl_synapse_hom with regular normalization.
+    Every 1000 / norm_freq ms the weights of this model onto every target are
+    scaled by (norm_fac0 + norm_fac1 * W0 / W), where W is their sum and W0
+    the sum at the beginning of the simulation. It approximates the nest-dev
+    model, which is not reproduced exactly.
+    """
+
+    defaults = dict(STDPPLSynapseHom.defaults, norm_freq=1.0, norm_fac0=0.0,
+                    norm_fac1=1.0)
+
+    def normalize(self, w, totals, reference):
+        """
+        :param w:           weights of connections to every target (array)
+        :param totals:      sum of weights onto the target of each connection
+        :param reference:   initial sum onto the target of each connection
+        :return:            normalized weights
+        """
+        p = self.params
+        ratio = np.where(totals > 0, reference / np.where(totals > 0, totals, 1), 1)
+        return w * (p['norm_fac0'] + p['norm_fac1'] * ratio)
+
+
+neuron_models = {
+    'iaf_psc_alpha': IafPscAlpha,
+    'iaf_psc_exp': IafPscExp,
+    'pixel_iaf_psc_exp': PixelIafPscExp
+}
+
+device_models = {
+    'spike_detector': SpikeDetector,
+    'multimeter': Multimeter,
+    'dc_generator': DCGenerator,
+    'image_sequence_generator': ImageSequenceGenerator
+}
+
+synapse_models = {
+    'static_synapse': StaticSynapse,
+    'stdp_synapse_hom': STDPSynapseHom,
+    'stdp_pl_synapse_hom': STDPPLSynapseHom,
+    'stdp_pl_norm_synapse_hom': STDPPLNormSynapseHom
+}
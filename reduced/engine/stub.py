@@ -0,0 +1,126 @@
+"""
+A stand-in for the nest module in tests and benchmarks of the Python side
+(layers, synapses, monitors, dumping). Select it with
+
+"KERNEL": {"backend": "stub"}
+
+or use_backend('stub') (see reduced.network.backend).
+
+Nodes and connections are kept exactly as by the NumPy engine, with its own
+kernel, but dynamics are dummy and cheap: every neuron fires regularly with
+a given rate (staggered by NEST ID), membrane potentials stay where they are
+and weights don't change. Stimuli are ignored.
+
+Calls of the API functions are counted in the calls dict.
+"""
+
+import types
+import numpy as np
+
+import reduced.engine as engine
+from kernel import Kernel
+from models import NESTError, SpikeDetector, Multimeter
+
+
+class StubKernel(Kernel):
+
+    # firing rate of every neuron (Hz)
+    rate = 10.0
+
+    def simulate(self, duration):
+        self._prepare()
+
+        h = self._h
+        n = len(self._neuron_ids)
+        steps = int(round(duration / h))
+
+        # spikes are stamped (step + 1) * h, as by the engine
+        first, last = self._step + 1, self._step + steps
+        every = max(int(round(1000.0 / self.rate / h)), 1)
+
+        # neuron i fires at stamps s with (s + i) % every == 0
+        starts = first + (-(first + np.arange(n))) % every
+        counts = np.maximum((last - starts) // every + 1, 0)
+
+        fired = np.repeat(np.arange(n), counts)
+        shifts = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts,
+                                                     counts)
+        stamps = np.repeat(starts, counts) + shifts * every
+
+        order = np.lexsort((fired, stamps))
+        fired, stamps = fired[order], stamps[order]
+
+        for model, index, targets, sources, located in self._devices:
+            if isinstance(model, SpikeDetector):
+                observed = located[fired]
+                model.record(index, self._neuron_ids[fired[observed]],
+                             stamps[observed] * h)
+
+            elif isinstance(model, Multimeter) and len(targets) > 0:
+                self._record_samples(model, index, targets, located,
+                                     first, last)
+
+        self._step += steps
+        self.status['time'] = self._step * h
+
+    def _record_samples(self, model, index, observed, located, first, last):
+        node = model.nodes[index]
+        every = max(int(round(node['interval'] / self._h)), 1)
+
+        samples = np.arange(first + (-first) % every, last + 1, every)
+        if len(samples) == 0:
+            return
+
+        values = {}
+        for key in node['record_from']:
+            current = np.zeros(len(observed))
+            for neuron_model, found, local in located:
+                current[found] = neuron_model.values[key][local]
+            values[key] = np.tile(current, len(samples))
+
+        model.record(index, np.tile(self._neuron_ids[observed], len(samples)),
+                     np.repeat(samples * self._h, len(observed)), **values)
+
+
+_kernel = StubKernel()
+
+# number of calls per API function
+calls = {}
+
+# globals of the stand-ins: those of the engine with the kernel of the stub,
+# so the kernel of the engine is never swapped (e.g. by another thread)
+_globals = dict(vars(engine), _kernel=_kernel)
+
+
+def _stand_in(function):
+    # the engine function, counted and applied to the kernel of the stub
+    name = function.__name__
+    function = types.FunctionType(function.__code__, _globals, name,
+                                  function.__defaults__)
+    _globals[name] = function
+
+    def call(*args, **kwargs):
+        calls[name] = calls.get(name, 0) + 1
+        return function(*args, **kwargs)
+
+    call.__name__ = name
+    call.__doc__ = function.__doc__
+    return call
+
+
+def reset_calls():
+    calls.clear()
+
+
+ResetKernel = _stand_in(engine.ResetKernel)
+SetKernelStatus = _stand_in(engine.SetKernelStatus)
+GetKernelStatus = _stand_in(engine.GetKernelStatus)
+CopyModel = _stand_in(engine.CopyModel)
+Create = _stand_in(engine.Create)
+Connect = _stand_in(engine.Connect)
+ConvergentConnect = _stand_in(engine.ConvergentConnect)
+DivergentConnect = _stand_in(engine.DivergentConnect)
+GetConnections = _stand_in(engine.GetConnections)
+GetStatus = _stand_in(engine.GetStatus)
+SetStatus = _stand_in(engine.SetStatus)
+Simulate = _stand_in(engine.Simulate)
@@ -0,0 +1,103 @@
+import importlib
+from tracer import traced_functions
+
+
+# simulation backends and modules implementing them
+backends = {
+    'nest': 'nest',
+    'numpy': 'reduced.engine',
+    'stub': 'reduced.engine.stub'
+}
+
+# functions creating connections, which invalidate cached connection indexes
+connecting_functions = ('Connect', 'ConvergentConnect', 'DivergentConnect')
+
+
+class Backend(object):
+    """
+    Stands for the nest module in the network objects and forwards every call
+    to the module of the selected backend: NEST itself, the NumPy engine
+    (reduced.engine), which implements the part of the NEST API used here, or
+    its stand-in with dummy dynamics for tests (reduced.engine.stub).
+
+    NEST is selected (and imported) on first use, unless another backend was
+    selected before, e.g. from the KERNEL section of a profile.
+    """
+
+    def __init__(self):
+        self._name = None
+        self._module = None
+        self._tracer = None
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def module(self):
+        if self._module is None:
+            self.use('nest')
+
+        return self._module
+
+    def use(self, name):
+        """
+        :param name:    name of the backend, 'nest', 'numpy' or 'stub' (string)
+        """
+        if name not in backends:
+            raise ValueError("Unknown backend %s" % str(name))
+
+        self._module = importlib.import_module(backends[name])
+        self._name = name
+
+    @property
+    def tracer(self):
+        return self._tracer
+
+    def trace(self, tracer):
+        """
+        Records calls of traced functions (Create, Connect, GetStatus etc.)
+        made through this object.
+
+        :param tracer:  Tracer object, None to stop tracing
+        """
+        self._tracer = tracer
+
+    def __getattr__(self, key):
+        attr = getattr(self.module, key)
+        if key in connecting_functions:
+            attr = _connecting(attr)
+
+        if self._tracer is not None and key in traced_functions:
+            return self._tracer.wrap(key, attr)
+
+        return attr
+
+    def ResetKernel(self):
+        # node IDs are reused by the new kernel, so the registry is cleared
+        from registry import registry
+
+        registry.clear()
+        return self.module.ResetKernel()
+
+
+def _connecting(function):
+    # the function, increasing the connectivity version of the registry
+    def call(*args, **kwargs):
+        from registry import registry
+
+        try:
+            return function(*args, **kwargs)
+        finally:
+            registry.connections_changed()
+
+    call.__name__ = function.__name__
+    call.__doc__ = function.__doc__
+    return call
+
+
+nest = Backend()
+
+
+def use_backend(name):
+    nest.use(name)
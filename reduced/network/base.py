@@ -4,6 +4,8 @@ class NestObject(object):
     An abstract class that represents any Nest object.
     """
 
+    __slots__ = ('_nest_id',)
+
     def __init__(self, id):
         self._nest_id = id
 
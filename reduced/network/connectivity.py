@@ -0,0 +1,103 @@
+"""
+Connectivity rules between two layers. Every rule returns a pair of aligned
+index arrays (source indexes, target indexes) into the layers' neuron lists,
+so that a whole projection can be created with a single nest.Connect call.
+"""
+
+import numpy as np
+
+
+def _sample_rows(n_rows, n_choices, k):
+    # k distinct random choices out of n_choices for every row
+    if not 0 < k <= n_choices:
+        raise ValueError("Can't choose %d out of %d neurons" % (k, n_choices))
+
+    noise = np.random.rand(n_rows, n_choices)
+    return np.argpartition(noise, k - 1, axis=1)[:, :k]
+
+
+def fixed_indegree(n_sources, n_targets, indegree):
+    """
+    Every target neuron receives connections from indegree randomly chosen
+    distinct source neurons.
+
+    :param n_sources:   number of neurons in the source layer
+    :param n_targets:   number of neurons in the target layer
+    :param indegree:    number of incoming connections per target (int)
+    :return:            source indexes, target indexes
+    """
+    sources = _sample_rows(n_targets, n_sources, indegree)
+    targets = np.repeat(np.arange(n_targets), indegree)
+    return sources.ravel(), targets
+
+
+def fixed_outdegree(n_sources, n_targets, outdegree):
+    """
+    Every source neuron connects to outdegree randomly chosen distinct target
+    neurons.
+
+    :param n_sources:   number of neurons in the source layer
+    :param n_targets:   number of neurons in the target layer
+    :param outdegree:   number of outgoing connections per source (int)
+    :return:            source indexes, target indexes
+    """
+    targets = _sample_rows(n_sources, n_targets, outdegree)
+    sources = np.repeat(np.arange(n_sources), outdegree)
+    return sources, targets.ravel()
+
+
+def neighbourhood_mask(radius=1):
+    """
+    Square neighbourhood mask of a given radius, excluding the centre.
+
+    :param radius:  neighbourhood radius (int)
+    :return:        2D boolean numpy array of shape (2*radius+1, 2*radius+1)
+    """
+    mask = np.ones((2 * radius + 1, 2 * radius + 1), dtype=bool)
+    mask[radius, radius] = False
+    return mask
+
+
+def neighbourhood(x_dim, y_dim, radius=1, mask=None, periodic=False):
+    """
+    Every neuron of a 2D layer connects to all neurons of the same-sized
+    layer that are selected by a mask centred on it. Neurons are indexed row
+    by row, i.e. index = x * y_dim + y.
+
+    :param x_dim:       number of neurons in X-dimension
+    :param y_dim:       number of neurons in Y-dimension
+    :param radius:      radius of a square neighbourhood (int), if no mask
+    :param mask:        2D boolean array with odd sides, True for neighbours
+                        relative to the centre element
+    :param periodic:    wrap the layer around its borders (torus) if True
+    :return:            source indexes, target indexes
+    """
+    if mask is None:
+        mask = neighbourhood_mask(radius)
+
+    mask = np.asarray(mask, dtype=bool)
+    if mask.ndim != 2 or not all(side % 2 for side in mask.shape):
+        raise ValueError("Neighbourhood mask must be 2D with odd sides")
+
+    dx, dy = np.nonzero(mask)
+    dx = dx - mask.shape[0] // 2
+    dy = dy - mask.shape[1] // 2
+
+    size = x_dim * y_dim
+    xs, ys = np.divmod(np.arange(size), y_dim)
+
+    nx = xs[:, None] + dx[None, :]
+    ny = ys[:, None] + dy[None, :]
+    sources = np.repeat(np.arange(size), len(dx)).reshape(nx.shape)
+
+    if not periodic:
+        inside = (nx >= 0) & (nx < x_dim) & (ny >= 0) & (ny < y_dim)
+        return sources[inside], (nx * y_dim + ny)[inside]
+
+    targets = (nx % x_dim) * y_dim + (ny % y_dim)
+
+    # on small layers different offsets may wrap to the same neuron
+    codes = np.unique(sources.ravel() * size + targets.ravel())
+    sources, targets = np.divmod(codes, size)
+    not_self = sources != targets
+    return sources[not_self], targets[not_self]
@@ -1,10 +1,11 @@
-import itertools
-import nest
-import nest.topology as tp
+from backend import nest
 import numpy as np
 
+import connectivity
 from base import NestObject
 from neuron import Neuron
+from registry import registry
+from synapse import SynapseTable, ConnectionStore
 
 
 class Layer(NestObject):
@@ -22,15 +23,27 @@ class Layer(NestObject):
         self._x_dim = x_dim
         self._y_dim = y_dim
 
-        self._neurons = [Neuron(neuron_setup) for i in range(x_dim*y_dim)]
+        model = neuron_setup.model
+        params = neuron_setup.para_dict
+        self._ids = np.array(nest.Create(model, x_dim*y_dim, params=params))
+        registry.register(self._ids, model, 'neuron')
 
-    # methods to access neurons as a list
+        self._matrix = None
+        self._neighbourhoods = {}
+        self._store = None
+        self._store_version = None
+
+    # methods to access neurons as a list. Neuron objects are created on
+    # access as lightweight views on the array of NEST IDs
 
     def __len__(self):
-        return len(self._neurons)
+        return len(self._ids)
 
     def __getitem__(self, key):
-        return self._neurons[key]
+        if isinstance(key, slice):
+            return [Neuron.view(x) for x in self._ids[key]]
+
+        return Neuron.view(self._ids[key])
 
     def __iter__(self):
         for i in range(0, len(self)):
@@ -55,6 +68,14 @@ class Layer(NestObject):
     def y_dim(self):
         return self._y_dim
 
+    @property
+    def grid(self):
+        """
+        Returns a 2D array of NEST IDs, so that grid[x, y] is the ID of the
+        neuron with (x, y) coordinates.
+        """
+        return self._ids.reshape(self._x_dim, self._y_dim)
+
     @property
     def as_matrix(self):
         """
@@ -65,8 +86,111 @@ class Layer(NestObject):
 
         :return:    2D list of related Neuron objects
         """
-        start_indices = [self._y_dim*i for i in range(self._x_dim)]
-        return [self[i:i + self._y_dim] for i in start_indices]
+        if self._matrix is None:
+            self._matrix = [[Neuron.view(x) for x in row] for row in self.grid]
+
+        return self._matrix
+
+    def neighbourhood_index(self, radius=1, mask=None, periodic=False):
+        """
+        Returns indexes of all (neuron, neighbour) pairs in the layer at once.
+        The index is computed once per set of parameters and cached.
+
+        :param radius:      radius of a square neighbourhood (int), if no mask
+        :param mask:        2D boolean array with odd sides, True for
+                            neighbours relative to the centre element
+        :param periodic:    wrap the layer around its borders if True
+        :return:            neuron indexes, neighbour indexes (numpy arrays)
+        """
+        if mask is None:
+            mask = connectivity.neighbourhood_mask(radius)
+
+        mask = np.asarray(mask, dtype=bool)
+        key = (mask.shape, mask.tostring(), bool(periodic))
+
+        if key not in self._neighbourhoods:
+            self._neighbourhoods[key] = connectivity.neighbourhood(
+                self._x_dim, self._y_dim, mask=mask, periodic=periodic
+            )
+
+        return self._neighbourhoods[key]
+
+    def neighbours(self, radius=1, mask=None, periodic=False):
+        """
+        Returns NEST IDs of neighbours for all neurons of the layer at once.
+
+        :param radius:      radius of a square neighbourhood (int), if no mask
+        :param mask:        2D boolean array with odd sides, True for
+                            neighbours relative to the centre element
+        :param periodic:    wrap the layer around its borders if True
+        :return:            neuron IDs, neighbour IDs (aligned numpy arrays)
+        """
+        centres, neighbours = self.neighbourhood_index(radius, mask, periodic)
+        return self._ids[centres], self._ids[neighbours]
+
+    # connections
+
+    def connect_to(self, other, rule='all_to_all', weights=1.0, delay=1.0,
+                   model='static_synapse', **rule_params):
+        """
+        Connects neurons of this layer to the neurons of another (or the same)
+        layer according to a given connectivity rule, with a single
+        nest.Connect call.
+
+        :param other:       target Layer object
+        :param rule:        'all_to_all', 'fixed_indegree', 'fixed_outdegree'
+                            or 'neighbourhood' (string)
+        :param weights:     2D array of weights (1D - source, 2D - target
+                            neurons) or a single weight for all synapses
+        :param delay:       delay (float)
+        :param model:       model of the synapse (string)
+        :param rule_params: parameters of the rule, like indegree=8,
+                            outdegree=8 or radius=1, mask=.., periodic=True
+                            (see Layer.neighbourhood_index)
+        """
+        weights = np.asarray(weights, dtype=float)
+        if weights.ndim == 2 and weights.shape != (len(self), len(other)):
+            raise ValueError("Weights should be of shape %s" %
+                             str((len(self), len(other))))
+
+        sources = np.array(self.nodes)
+        targets = np.array(other.nodes)
+        syn_spec = {'model': model, 'delay': delay}
+
+        if rule == 'all_to_all':
+            # NEST expects weights as (targets x sources)
+            syn_spec['weight'] = weights.T if weights.ndim == 2 else float(weights)
+            nest.Connect(sources.tolist(), targets.tolist(),
+                         {'rule': 'all_to_all'}, syn_spec)
+            return
+
+        pre, post = self._connection_pairs(other, rule, **rule_params)
+        if len(pre) == 0:
+            return
+
+        if weights.ndim == 2:
+            syn_spec['weight'] = weights[pre, post]
+        else:
+            syn_spec['weight'] = float(weights) * np.ones(len(pre))
+
+        nest.Connect(sources[pre].tolist(), targets[post].tolist(),
+                     {'rule': 'one_to_one'}, syn_spec)
+
+    def _connection_pairs(self, other, rule, **rule_params):
+        # source and target indexes of all connections for a given rule
+        if rule == 'fixed_indegree':
+            return connectivity.fixed_indegree(len(self), len(other),
+                                               rule_params['indegree'])
+        if rule == 'fixed_outdegree':
+            return connectivity.fixed_outdegree(len(self), len(other),
+                                                rule_params['outdegree'])
+        if rule == 'neighbourhood':
+            if (self.x_dim, self.y_dim) != (other.x_dim, other.y_dim):
+                raise ValueError("Neighbourhood requires layers of equal size")
+
+            return self.neighbourhood_index(**rule_params)
+
+        raise ValueError("Unknown connectivity rule %s" % str(rule))
 
     # weights access
 
@@ -75,21 +199,61 @@ class Layer(NestObject):
         """
         returns 2D array of actual weights (1D - source, 2D - target nodes)
         """
-        weights = [[x['weight'] for x in neuron.synapses] for neuron in self]
-        return np.array(weights)
+        return self.synapse_table.as_matrix('weight')
+
+    def set_weights(self, weights, target_ids=None):
+        """
+        Writes a full matrix of weights back into NEST with a single call,
+        e.g. for random initialization or to restore weights of a previous
+        run. Only existing connections are changed.
+
+        :param weights:     2D array of weights (1D - source, 2D - target
+                            nodes), same layout as returned by Layer.weights
+        :param target_ids:  NEST IDs of the target nodes for the matrix
+                            columns, all existing targets if not given
+        """
+        self.connection_store.assign(weights, self.nodes, target_ids, 'weight')
 
     # helper methods
 
     @property
     def nodes(self):
-        return [x.id for x in self._neurons]
+        return self._ids.tolist()
+
+    @property
+    def connection_store(self):
+        """
+        Returns all local existing synaptic connections in ACTUAL state,
+        indexed by source and by target.
+
+        The index is built once and reused until new connections are created
+        (by any Connect call made through the backend); until then only
+        synaptic states are re-fetched, with a single GetStatus call.
+        """
+        version = registry.connections_version
+
+        if self._store is None or self._store_version != version:
+            self._store = ConnectionStore(SynapseTable.for_sources(self.nodes))
+            self._store_version = version
+        else:
+            self._store = self._store.refreshed()
+
+        return self._store
+
+    @property
+    def synapse_table(self):
+        """
+        Returns all local existing synaptic connections in ACTUAL state as a
+        single table, fetched from NEST in bulk.
+        """
+        return self.connection_store.table
 
     @property
     def synapses(self):
         """
         Returns all local existing synaptic connections in ACTUAL state.
         """
-        return reduce(lambda x, y: x + y.synapses, self, [])
+        return self.synapse_table.synapses
 
     def synapses_for(self, ext_neuron):
         """
@@ -99,7 +263,7 @@ class Layer(NestObject):
         :param ext_neuron:  external Neuron object
         :return:            list of Synapse objects
         """
-        return filter(lambda syn: syn['target'] == ext_neuron.id, self.synapses)
+        return self.connection_store.for_target(ext_neuron.id).synapses
 
 
 class InputLayer(Layer):
@@ -123,12 +287,24 @@ class InputLayer(Layer):
         self._movie = nest.Create(
             'image_sequence_generator', 1, input_setup.as_nest_dict
         )[0]
+        registry.register([self._movie], 'image_sequence_generator', 'stimulator')
 
-        nodes = iter(self.nodes)
-        for x, y in itertools.product(range(x_dim), range(y_dim)):
-            node = nodes.next()
-            nest.SetStatus([node], {'x': x, 'y': y, 'weight': input_setup.weight})
-            nest.Connect([self._movie], [node])
+        xs, ys = np.divmod(np.arange(len(self)), y_dim)
+        weight = input_setup.weight
+        params = [{'x': int(x), 'y': int(y), 'weight': weight}
+                  for x, y in zip(xs, ys)]
+
+        nest.SetStatus(self.nodes, params)
+        nest.Connect([self._movie], self.nodes)
+
+    def shift_stimulus(self, time):
+        """
+        Continues the image sequence as if a given time had passed already,
+        e.g. to resume a simulation in a fresh kernel, which starts from zero.
+
+        :param time:    time passed (ms)
+        """
+        nest.SetStatus([self._movie], {'origin': -float(time)})
 
 
 class MapLayer(Layer):
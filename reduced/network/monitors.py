@@ -1,5 +1,8 @@
-import nest
+from backend import nest
+import numpy as np
 from base import NestObject
+from registry import registry
+from sinks import concatenate_events
 
 
 class MonitorPool(object):
@@ -27,19 +30,84 @@ class MonitorPool(object):
         return str(self)
 
 
-class VoltageMonitor(NestObject):
+class Recorder(NestObject):
+    """
+    An abstract recording device. By default all events are kept in NEST
+    memory until the end of the simulation.
 
-    def __init__(self, nest_node_id):
-        self.observable = nest_node_id
+    In drain mode (a sink is given) events should be drained regularly (e.g.
+    once per simulation phase): they are read from NEST once, removed from
+    NEST memory and handed over to the sink, so NEST holds at most one chunk
+    of events at a time.
 
-        rec_params = {'record_from': ['V_m'], 'withtime': True}
+    Times of events are shifted by time_offset, e.g. to continue a previous
+    simulation in a fresh kernel, which starts from zero.
+    """
 
-        self._nest_id = nest.Create('multimeter', params=rec_params)[0]
-        nest.Connect([self._nest_id], [nest_node_id])
+    def __init__(self, sink=None):
+        self._sink = sink
+        self.time_offset = 0.0
+
+    @property
+    def sink(self):
+        return self._sink
+
+    @property
+    def is_draining(self):
+        return self._sink is not None
+
+    def drain(self):
+        """
+        Moves all events collected so far from NEST to the sink.
+
+        :return:    events dict of the drained chunk
+        """
+        if not self.is_draining:
+            raise ValueError("Recorder has no sink to drain events to")
+
+        events = self._kernel_events()
+        nest.SetStatus([self.id], 'n_events', 0)
+
+        chunk = self._on_drain(events)
+        self._sink.append(chunk)
+
+        return chunk
+
+    def _on_drain(self, events):
+        # a hook to process a chunk of events before it goes to the sink
+        return events
+
+    def _kernel_events(self):
+        # events currently stored in NEST
+        events = nest.GetStatus([self.id], 'events')[0]
+        if self.time_offset and 'times' in events:
+            events = dict(events)
+            events['times'] = np.asarray(events['times']) + self.time_offset
+
+        return events
 
     @property
     def _get_data(self):
-        return nest.GetStatus([self.id], 'events')[0]
+        events = self._kernel_events()
+        if not self.is_draining:
+            return events
+
+        # events retained by the sink and not yet drained ones
+        return concatenate_events([self._sink.events, events])
+
+
+class VoltageMonitor(Recorder):
+
+    def __init__(self, nest_node_id, sink=None, interval=1.0):
+        super(VoltageMonitor, self).__init__(sink)
+        self.observable = nest_node_id
+
+        rec_params = {'record_from': ['V_m'], 'withtime': True,
+                      'interval': interval}
+
+        self._nest_id = nest.Create('multimeter', params=rec_params)[0]
+        registry.register([self._nest_id], 'multimeter', 'recorder')
+        nest.Connect([self._nest_id], [nest_node_id])
 
     @property
     def V_m(self):
@@ -54,17 +122,154 @@ class VoltageMonitor(NestObject):
         return self._get_data['times']
 
 
-class SpikeDetector(NestObject):
+class LayerVoltageMonitor(Recorder):
+    """
+    Records membrane potentials of many neurons (e.g. a whole layer) with a
+    single multimeter. Events are returned as a 2D array (neurons x samples)
+    with a single time vector shared by all neurons.
+
+    With decimation, every bucket of a given number of samples is reduced to
+    its minimum and maximum (see decimate_min_max). In drain mode this is done
+    on-line for every drained chunk; samples that do not fill a bucket are
+    carried over to the next chunk.
+    """
+
+    def __init__(self, nest_node_ids, sink=None, interval=1.0, decimation=None):
+        super(LayerVoltageMonitor, self).__init__(sink)
+        self.observables = list(nest_node_ids)
+        self.decimation = decimation
+        self._carry = None  # samples left over from the last drained chunk
 
-    def __init__(self, nest_node_ids):
+        rec_params = {'record_from': ['V_m'], 'withtime': True,
+                      'interval': interval}
+
+        self._nest_id = nest.Create('multimeter', params=rec_params)[0]
+        registry.register([self._nest_id], 'multimeter', 'recorder')
+        nest.Connect([self._nest_id], self.observables)
+
+    def read(self, events=None):
+        """
+        Fetches recorded events with a single GetStatus call and sorts them
+        into a preallocated (neurons x samples) array. Rows follow the order
+        of observables, samples that were not recorded are NaN.
+
+        With decimation, samples not drained yet (and the ones carried over
+        from the last drain) are decimated as by the next drain, so that all
+        samples have the same rate; samples of an incomplete bucket are
+        returned as they are.
+
+        :param events:  events dict to sort instead (e.g. a drained chunk)
+        :return:        times (1D numpy array), V_m (2D numpy array)
+        """
+        if events is not None:
+            return self._sort(events)
+
+        if self.decimation is None:
+            return self._sort(self._get_data)
+
+        if not self.is_draining:
+            times, values = self._sort(self._kernel_events())
+            return self._decimate(times, values, keep_rest=True)
+
+        # drained chunks are decimated already
+        times, values = self._sort(self._sink.events)
+        pending = self._decimate(*self._pending(self._kernel_events()),
+                                 keep_rest=True)
+
+        return (np.concatenate([times, pending[0]]),
+                np.concatenate([values, pending[1]], axis=1))
+
+    def _sort(self, events):
+        # events dict to a shared time vector and a (neurons x samples) array
+        if not events:
+            return np.array([]), np.zeros((len(self.observables), 0))
+
+        senders = np.asarray(events['senders'], dtype=np.int64)
+        event_times = np.asarray(events['times'], dtype=float)
+
+        observables = np.array(self.observables, dtype=np.int64)
+        order = np.argsort(observables)
+        rows = order[np.searchsorted(observables, senders, sorter=order)]
+
+        times = np.unique(event_times)
+        cols = np.searchsorted(times, event_times)
+
+        values = np.empty((len(observables), len(times)))
+        values.fill(np.nan)
+        values[rows, cols] = events['V_m']
+
+        return times, values
+
+    def _decimate(self, times, values, keep_rest):
+        full = len(times) - len(times) % self.decimation
+        d_times, d_values = decimate_min_max(times[:full], values[:, :full],
+                                             self.decimation)
+        rest = times[full:], values[:, full:]
+
+        if keep_rest:
+            d_times = np.concatenate([d_times, rest[0]])
+            d_values = np.concatenate([d_values, rest[1]], axis=1)
+            return d_times, d_values
+
+        self._carry = rest
+        return d_times, d_values
+
+    def _pending(self, events):
+        # samples of a chunk, after the ones carried over from the last one
+        times, values = self._sort(events)
+        if self._carry is not None:
+            times = np.concatenate([self._carry[0], times])
+            values = np.concatenate([self._carry[1], values], axis=1)
+
+        return times, values
+
+    def _on_drain(self, events):
+        if self.decimation is None:
+            return events
+
+        times, values = self._decimate(*self._pending(events), keep_rest=False)
+
+        n_neurons = len(self.observables)
+        return {
+            'senders': np.repeat(self.observables, len(times)),
+            'times': np.tile(times, n_neurons),
+            'V_m': values.ravel()
+        }
+
+    @property
+    def V_m(self):
+        return self.read()[1]
+
+    @property
+    def times(self):
+        return self.read()[0]
+
+
+class SpikeDetector(Recorder):
+
+    def __init__(self, nest_node_ids, sink=None):
+        super(SpikeDetector, self).__init__(sink)
         self.observables = nest_node_ids
 
         self._nest_id = nest.Create('spike_detector')[0]
+        registry.register([self._nest_id], 'spike_detector', 'recorder')
         nest.ConvergentConnect(nest_node_ids, [self._nest_id])
 
+    @staticmethod
+    def _sorted(events):
+        # with several threads, events come in chunks per thread
+        if not events or len(events['times']) == 0:
+            return events
+
+        order = np.lexsort((events['senders'], events['times']))
+        return dict((k, np.asarray(v)[order]) for k, v in events.items())
+
+    def _on_drain(self, events):
+        return self._sorted(events)
+
     @property
     def _get_data(self):
-        return nest.GetStatus([self.id], 'events')[0]
+        return self._sorted(super(SpikeDetector, self)._get_data)
 
     @property
     def senders(self):
@@ -72,4 +277,161 @@ class SpikeDetector(NestObject):
 
     @property
     def times(self):
-        return self._get_data['times']
\ No newline at end of file
+        return self._get_data['times']
+
+
+class WeightRecorder(object):
+    """
+    Records snapshots of synaptic weights from a layer to given targets into
+    a (sources x targets x time) float32 array. The order of sources and
+    targets is fixed once, and every snapshot is written as a single slice
+    into a preallocated array, which grows if more snapshots are recorded
+    than expected.
+
+    If a sink is given, every snapshot is also handed over to it (e.g. a
+    FileSink to flush snapshots to disk as they come); with keep=False
+    snapshots are not kept in memory at all.
+    """
+
+    def __init__(self, layer, target_ids=None, capacity=None, sink=None,
+                 keep=True):
+        """
+        :param layer:       source Layer object
+        :param target_ids:  NEST IDs of target neurons, all targets of the
+                            layer at the first snapshot if not given
+        :param capacity:    expected number of snapshots (int)
+        :param sink:        Sink object to pass every snapshot to
+        :param keep:        keep snapshots in memory (bool)
+        """
+        self._layer = layer
+        self._sources = np.array(layer.nodes)
+        self._targets = None if target_ids is None else np.array(target_ids)
+
+        self._capacity = capacity or 16
+        self._sink = sink
+        self._keep = keep
+
+        self._count = 0
+        self._times = np.zeros(self._capacity)
+        self._data = None
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def sink(self):
+        return self._sink
+
+    @property
+    def sources(self):
+        return self._sources
+
+    @property
+    def targets(self):
+        return self._targets
+
+    @property
+    def times(self):
+        return self._times[:self._count]
+
+    @property
+    def weights(self):
+        """
+        :return:    3D float32 array (sources x targets x time) of kept
+                    snapshots
+        """
+        if self._data is None:
+            return np.zeros((len(self._sources), 0, 0), dtype=np.float32)
+
+        return self._data[:, :, :self._count]
+
+    def _grow(self):
+        self._capacity *= 2
+        self._times = np.resize(self._times, self._capacity)
+
+        if self._data is not None:
+            data = np.zeros(self._data.shape[:2] + (self._capacity,),
+                            dtype=np.float32)
+            data[:, :, :self._count] = self._data[:, :, :self._count]
+            self._data = data
+
+    def restore(self, times, weights, targets):
+        """
+        Restores snapshots recorded before (e.g. from a checkpoint), so that
+        new snapshots are appended to them. Restored snapshots are not passed
+        to the sink.
+
+        :param times:   1D array of snapshot times
+        :param weights: 3D array (sources x targets x time), ignored if
+                        snapshots are not kept
+        :param targets: NEST IDs of target neurons of the snapshots
+        """
+        self._targets = np.array(targets)
+        self._count = 0
+
+        while self._capacity < len(times):
+            self._grow()
+
+        self._times[:len(times)] = times
+        if self._keep:
+            shape = (len(self._sources), len(self._targets), self._capacity)
+            self._data = np.zeros(shape, dtype=np.float32)
+            self._data[:, :, :len(times)] = weights
+
+        self._count = len(times)
+
+    def record(self, time):
+        """
+        Takes a snapshot of ACTUAL weights (one GetStatus call).
+
+        :param time:    time of the snapshot (ms)
+        :return:        2D float32 array (sources x targets)
+        """
+        store = self._layer.connection_store
+        if self._targets is None:
+            self._targets = store.targets
+
+        snapshot = store.as_matrix(self._sources, self._targets)
+        snapshot = snapshot.astype(np.float32)
+
+        if self._count == self._capacity:
+            self._grow()
+
+        if self._keep:
+            if self._data is None:
+                shape = (len(self._sources), len(self._targets), self._capacity)
+                self._data = np.zeros(shape, dtype=np.float32)
+
+            self._data[:, :, self._count] = snapshot
+
+        self._times[self._count] = time
+        self._count += 1
+
+        if self._sink is not None:
+            self._sink.append({
+                'times': np.array([time], dtype=float),
+                'weights': snapshot[np.newaxis]
+            })
+
+        return snapshot
+
+
+def decimate_min_max(times, values, factor):
+    """
+    Reduces every bucket of factor consecutive samples to two samples: the
+    minimum, stamped with the time of the first sample of the bucket, and the
+    maximum, stamped with the time of the last one. Keeps the envelope of the
+    signal while reducing its size factor / 2 times.
+
+    :param times:   1D array of sample times, length divisible by factor
+    :param values:  2D array (signals x samples)
+    :param factor:  number of samples in a bucket (int)
+    :return:        decimated times (1D array), values (2D array)
+    """
+    buckets = values.reshape(len(values), -1, factor)
+    t_buckets = times.reshape(-1, factor)
+
+    d_times = np.column_stack((t_buckets[:, 0], t_buckets[:, -1])).ravel()
+    d_values = np.dstack((buckets.min(axis=2), buckets.max(axis=2)))
+
+    return d_times, d_values.reshape(len(values), -1)
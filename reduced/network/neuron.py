@@ -1,16 +1,44 @@
-import nest
+from backend import nest
+import numpy as np
 
 from base import NestObject
-from synapse import Synapse
+from registry import registry
+from synapse import SynapseTable
 
 
 class Neuron(NestObject):
 
+    __slots__ = ()
+
     def __init__(self, neuron_setup):
         nest_id = nest.Create(neuron_setup.model, params=neuron_setup.para_dict)[0]
+        registry.register([nest_id], neuron_setup.model, 'neuron')
 
         super(Neuron, self).__init__(nest_id)
 
+    @classmethod
+    def view(cls, nest_id):
+        """
+        Returns a Neuron object for an already existing NEST node. Views are
+        cheap and hold nothing but the NEST ID.
+
+        :param nest_id: NEST ID of the neuron (int)
+        """
+        neuron = cls.__new__(cls)
+        NestObject.__init__(neuron, int(nest_id))
+        return neuron
+
+    # views of the same NEST node are equal
+
+    def __eq__(self, other):
+        return isinstance(other, Neuron) and self.id == other.id
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.id)
+
     def __repr__(self):
         return "NEST Neuron (%d) with %d connections" % \
                (self.id, len(self.synapses))
@@ -24,11 +52,26 @@ class Neuron(NestObject):
         :param delay:       delay (float)
         :param model:       model of the synapse (string)
         """
-        syn_spec = lambda w: {'weight': w, 'model': model, 'delay': delay}
-
         target_ids = [x.id for x in neurons]
-        for neuron_id, weight in zip(target_ids, weights):
-            nest.Connect([self.id], [neuron_id], syn_spec=syn_spec(weight))
+        if not target_ids:
+            return
+
+        syn_spec = {
+            'weight': np.array(weights, dtype=float)[:len(target_ids)],
+            'model': model,
+            'delay': delay
+        }
+        sources = [self.id] * len(target_ids)
+        nest.Connect(sources, target_ids, {'rule': 'one_to_one'}, syn_spec)
+
+    @property
+    def synapse_table(self):
+        """
+        Actual states of all outgoing synaptic connections, fetched in bulk.
+
+        :return:    SynapseTable object
+        """
+        return SynapseTable.for_sources([self.id])
 
     @property
     def synapses(self):
@@ -38,11 +81,4 @@ class Neuron(NestObject):
 
         :return:    list of Synapse objects (includes synapse with Layer)
         """
-        connections = nest.GetConnections([self.id])
-
-        # define a filter for non-neuron connections (spike detectors etc.)
-        get_conn_type = lambda conn: nest.GetStatus([conn[1]], 'node_type')[0]
-        is_synapse = lambda conn: get_conn_type(conn).name == 'neuron'
-
-        synaptic_connections = filter(is_synapse, connections)
-        return [Synapse(*list(node)) for node in synaptic_connections]
+        return self.synapse_table.synapses
@@ -0,0 +1,90 @@
+from backend import nest
+import numpy as np
+
+
+class NodeRegistry(object):
+    """
+    A process-wide record of NEST nodes (ID, model, node type) created by the
+    network objects. Allows to classify nodes (e.g. drop spike detectors and
+    multimeters from connections) without asking the kernel every time.
+
+    The registry also keeps a version of the connectivity, which is increased
+    on every Connect, ConvergentConnect or DivergentConnect call made through
+    the backend (see Backend), so that cached connection indexes can be
+    invalidated.
+
+    The registry is cleared on every nest.ResetKernel() call made through the
+    backend (see Backend.ResetKernel), as node IDs are reused by the new
+    kernel.
+    """
+
+    def __init__(self):
+        self._models = {}
+        self._types = {}
+        self._connections_version = 0
+
+    def __len__(self):
+        return len(self._types)
+
+    def __contains__(self, node_id):
+        return int(node_id) in self._types
+
+    def register(self, node_ids, model, node_type):
+        """
+        Records newly created nodes.
+
+        :param node_ids:    list of NEST IDs (int)
+        :param model:       name of the model (string)
+        :param node_type:   'neuron', 'recorder' or 'stimulator' (string)
+        """
+        for node_id in node_ids:
+            self._models[int(node_id)] = str(model)
+            self._types[int(node_id)] = str(node_type)
+
+    def clear(self):
+        self._models.clear()
+        self._types.clear()
+        self.connections_changed()
+
+    @property
+    def connections_version(self):
+        return self._connections_version
+
+    def connections_changed(self):
+        self._connections_version += 1
+
+    def model(self, node_id):
+        return self._models[int(node_id)]
+
+    def node_type(self, node_id):
+        return self._types[int(node_id)]
+
+    def resolve(self, node_ids):
+        """
+        Makes sure given nodes are known to the registry. Nodes created outside
+        of the network objects are fetched from NEST with a single call.
+
+        :param node_ids:    list of NEST IDs (int)
+        """
+        unknown = sorted(set(int(x) for x in node_ids) - set(self._types))
+        if not unknown:
+            return
+
+        name = lambda x: getattr(x, 'name', x)
+        for node_id, (model, node_type) in \
+                zip(unknown, nest.GetStatus(unknown, ('model', 'node_type'))):
+            self.register([node_id], name(model), name(node_type))
+
+    def is_neuron(self, node_ids):
+        """
+        :param node_ids:    list of NEST IDs (int)
+        :return:            boolean numpy array, True for neuron nodes
+        """
+        self.resolve(node_ids)
+
+        types = self._types
+        return np.array([types[int(x)] == 'neuron' for x in node_ids], dtype=bool)
+
+
+registry = NodeRegistry()
+
@@ -0,0 +1,132 @@
+import os
+import collections
+import numpy as np
+
+
+def concatenate_events(chunks):
+    """
+    Concatenates chunks of recorder events (dicts of equally long arrays,
+    like NEST 'events') into a single events dict.
+
+    :param chunks:  list of events dicts
+    :return:        events dict
+    """
+    chunks = [chunk for chunk in chunks if chunk]
+    if not chunks:
+        return {}
+
+    keys = chunks[0].keys()
+    return dict((k, np.concatenate([np.asarray(c[k]) for c in chunks])) for k in keys)
+
+
+class Sink(object):
+    """
+    An abstract receiver of recorder events, drained from NEST in chunks
+    (e.g. once per simulation phase).
+    """
+
+    def append(self, events):
+        """
+        :param events:  events dict of a single chunk
+        """
+        raise NotImplementedError()
+
+    @property
+    def events(self):
+        """
+        :return:    all retained events as a single events dict
+        """
+        raise NotImplementedError()
+
+
+class RingBufferSink(Sink):
+    """
+    Keeps the last capacity chunks in memory, or all of them if capacity is
+    None.
+    """
+
+    def __init__(self, capacity=None):
+        self._chunks = collections.deque(maxlen=capacity)
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def append(self, events):
+        self._chunks.append(dict((k, np.array(v)) for k, v in events.items()))
+
+    @property
+    def events(self):
+        return concatenate_events(self._chunks)
+
+
+class FileSink(Sink):
+    """
+    Appends every chunk to a file as a numpy record array, so that only one
+    chunk at a time is held in memory while recording.
+    """
+
+    def __init__(self, path, size=0):
+        """
+        :param path:    path of the file
+        :param size:    bytes of the file to keep, e.g. to go on with a file
+                        written by an interrupted run (see size), 0 for an
+                        empty one
+        """
+        self._path = path
+        open(self._path, 'ab').close()
+        with open(self._path, 'r+b') as f:
+            f.truncate(size)
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def size(self):
+        """
+        :return:    size of the file (bytes), chunks end on it
+        """
+        return os.path.getsize(self._path)
+
+    def append(self, events):
+        keys = sorted(events.keys())
+        if not keys:
+            return
+
+        # multidimensional values (e.g. weight snapshots) become subarrays
+        arrays = [np.asarray(events[k]) for k in keys]
+        dtype = [(str(k), a.dtype, a.shape[1:]) for k, a in zip(keys, arrays)]
+
+        record = np.zeros(len(arrays[0]), dtype=dtype)
+        for k, a in zip(keys, arrays):
+            record[k] = a
+
+        with open(self._path, 'ab') as f:
+            np.save(f, record)
+
+    @property
+    def events(self):
+        chunks = []
+        with open(self._path, 'rb') as f:
+            while f.read(1):
+                f.seek(-1, 1)
+                record = np.load(f)
+                chunks.append(dict((k, record[k]) for k in record.dtype.names))
+
+        return concatenate_events(chunks)
+
+
+class CallbackSink(Sink):
+    """
+    Passes every chunk to a given function and retains nothing.
+    """
+
+    def __init__(self, callback):
+        self._callback = callback
+
+    def append(self, events):
+        self._callback(events)
+
+    @property
+    def events(self):
+        return {}
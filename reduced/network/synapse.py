@@ -1,6 +1,9 @@
-import nest
+import copy
+from backend import nest
 import numpy as np
 
+from registry import registry
+
 
 class Synapse(object):
     """
@@ -43,7 +46,8 @@ class Synapse(object):
                     'source', 'receptor')
 
     def values(self):
-        return (self[key] for key in self.keys())
+        # a single request for all keys instead of one per key
+        return tuple(nest.GetStatus([self._connection_id], self.keys())[0])
 
     def items(self):
         return zip(self.keys(), self.values())
@@ -51,3 +55,357 @@ class Synapse(object):
     def as_dict(self):
         return dict([x for x in self.items()])
 
+
+class SynapseTable(object):
+    """
+    A bulk snapshot of synaptic connections stored as a structured numpy array,
+    one row per connection. The whole table is fetched from NEST with a single
+    GetStatus call, so reading weights of thousands of synapses costs one
+    kernel round trip instead of one per synapse and key.
+
+    Rows are always sorted by (source, target, synapse model, port), so the
+    order does not depend on how connections are distributed over threads
+    and in which order NEST returns them.
+    """
+
+    id_fields = ('source', 'target', 'thread', 'synapse', 'port')
+    state_fields = ('weight', 'delay')
+
+    dtype = np.dtype([
+        ('source', np.int64),
+        ('target', np.int64),
+        ('thread', np.int64),
+        ('synapse', np.int64),
+        ('port', np.int64),
+        ('weight', np.float64),
+        ('delay', np.float64)
+    ])
+
+    def __init__(self, data):
+        """
+        :param data:    structured numpy array of SynapseTable.dtype
+        """
+        keys = (data['port'], data['synapse'], data['target'], data['source'])
+        order = np.lexsort(keys)
+        self._data = data[order]
+
+    @classmethod
+    def from_connections(cls, connections):
+        """
+        Builds a table from NEST connection ids, as returned by
+        nest.GetConnections, fetching all synaptic states at once.
+
+        :param connections: list of 5-element connection ids
+        :return:            SynapseTable object
+        """
+        data = np.zeros(len(connections), dtype=cls.dtype)
+        if len(connections) == 0:
+            return cls(data)
+
+        ids = np.array([list(conn) for conn in connections], dtype=np.int64)
+        for i, name in enumerate(cls.id_fields):
+            data[name] = ids[:, i]
+
+        states = np.array(nest.GetStatus(connections, cls.state_fields))
+        for i, name in enumerate(cls.state_fields):
+            data[name] = states[:, i]
+
+        return cls(data)
+
+    @classmethod
+    def from_synapses(cls, synapses):
+        """
+        Builds a table from a list of Synapse objects.
+
+        :param synapses:    list of Synapse objects
+        :return:            SynapseTable object
+        """
+        return cls.from_connections([x._connection_id for x in synapses])
+
+    @classmethod
+    def for_sources(cls, source_ids):
+        """
+        Fetches all outgoing synaptic connections of given nodes. Connections
+        to non-neuron nodes (spike detectors etc.) are dropped.
+
+        :param source_ids:  list of NEST IDs (int)
+        :return:            SynapseTable object
+        """
+        connections = nest.GetConnections(list(source_ids))
+        if len(connections) == 0:
+            return cls.from_connections([])
+
+        targets = [conn[1] for conn in connections]
+        mask = registry.is_neuron(targets)
+        return cls.from_connections([c for c, m in zip(connections, mask) if m])
+
+    def refreshed(self):
+        """
+        Returns a new table for the same connections with ACTUAL states,
+        fetched with a single GetStatus call.
+        """
+        data = self._data.copy()
+        if len(data) > 0:
+            states = np.array(nest.GetStatus(self.connections, self.state_fields))
+            for i, name in enumerate(self.state_fields):
+                data[name] = states[:, i]
+
+        return SynapseTable(data)
+
+    def apply(self, fields=('weight',)):
+        """
+        Writes given state fields of all connections in the table back to
+        NEST with a single SetStatus call.
+
+        :param fields:  names of the fields to write, 'weight' and/or 'delay'
+        """
+        if len(self) == 0:
+            return
+
+        fields = [fields] if isinstance(fields, basestring) else list(fields)
+        columns = [self._data[name].tolist() for name in fields]
+        params = [dict(zip(fields, values)) for values in zip(*columns)]
+
+        nest.SetStatus(self.connections, params)
+
+    # table access
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getitem__(self, key):
+        """
+        Returns a column for a field name, or a sub-table for any other numpy
+        index (slice, boolean mask, index array).
+        """
+        if isinstance(key, basestring):
+            return self._data[key]
+
+        return SynapseTable(np.atleast_1d(self._data[key]))
+
+    def __setitem__(self, key, values):
+        """
+        Changes values of a state field ('weight' or 'delay') in the table
+        only. Use apply() to write them back to NEST.
+        """
+        if key not in self.state_fields:
+            raise KeyError("Only %s can be changed" % str(self.state_fields))
+
+        self._data[key] = values
+
+    def __iter__(self):
+        for synapse in self.synapses:
+            yield synapse
+
+    def __repr__(self):
+        return "SynapseTable with %d connections" % len(self)
+
+    @property
+    def data(self):
+        return self._data
+
+    @property
+    def sources(self):
+        return np.unique(self._data['source'])
+
+    @property
+    def targets(self):
+        return np.unique(self._data['target'])
+
+    @property
+    def connections(self):
+        """
+        :return:    list of 5-element connection ids as accepted by NEST
+        """
+        ids = np.array([self._data[name] for name in self.id_fields]).T
+        return list(ids)
+
+    @property
+    def synapses(self):
+        """
+        :return:    list of Synapse objects, one per row
+        """
+        return [Synapse(*list(conn)) for conn in self.connections]
+
+    def as_matrix(self, field='weight'):
+        """
+        Returns values of a given field as a 2D array (1D - source, 2D - target
+        nodes, both in ascending order of NEST IDs). Missing connections are
+        zeros.
+
+        :param field:   name of the field, 'weight' or 'delay'
+        :return:        2D numpy array
+        """
+        sources, rows = np.unique(self._data['source'], return_inverse=True)
+        targets, cols = np.unique(self._data['target'], return_inverse=True)
+
+        matrix = np.zeros((len(sources), len(targets)))
+        matrix[rows, cols] = self._data[field]
+
+        return matrix
+
+
+def _offsets(sorted_ids):
+    # unique IDs and CSR offsets of their rows in a sorted array of IDs
+    keys, starts = np.unique(sorted_ids, return_index=True)
+    return keys, np.append(starts, len(sorted_ids))
+
+
+class ConnectionStore(object):
+    """
+    An indexed store of synaptic connections. Rows of a SynapseTable are
+    indexed CSR-style by source and by target, so that all connections of a
+    given node are found with a binary search and an array slice, i.e. in
+    O(log(N) + degree) instead of scanning all connections.
+    """
+
+    def __init__(self, table):
+        """
+        :param table:   SynapseTable object (sorted by source, target)
+        """
+        self._table = table
+
+        self._sources, self._source_offsets = _offsets(table['source'])
+
+        self._by_target = np.argsort(table['target'], kind='mergesort')
+        sorted_targets = table['target'][self._by_target]
+        self._targets, self._target_offsets = _offsets(sorted_targets)
+
+    def __len__(self):
+        return len(self._table)
+
+    def __repr__(self):
+        return "ConnectionStore with %d connections" % len(self)
+
+    @property
+    def table(self):
+        return self._table
+
+    @property
+    def sources(self):
+        return self._sources
+
+    @property
+    def targets(self):
+        return self._targets
+
+    def refreshed(self):
+        """
+        Returns a store with the same index and ACTUAL synaptic states.
+        """
+        store = copy.copy(self)
+        store._table = self._table.refreshed()
+        return store
+
+    @staticmethod
+    def _rows(keys, offsets, node_ids):
+        # concatenated CSR row ranges for given node IDs
+        node_ids = np.atleast_1d(np.asarray(node_ids, dtype=np.int64))
+        positions = np.searchsorted(keys, node_ids)
+
+        found = positions < len(keys)
+        found[found] = keys[positions[found]] == node_ids[found]
+        positions = positions[found]
+
+        ranges = [np.arange(offsets[i], offsets[i + 1]) for i in positions]
+        return np.concatenate(ranges) if ranges else np.array([], dtype=int)
+
+    def source_rows(self, source_ids):
+        """
+        :param source_ids:  NEST ID or a list of IDs of source nodes
+        :return:            indexes of related rows in the table
+        """
+        return self._rows(self._sources, self._source_offsets, source_ids)
+
+    def target_rows(self, target_ids):
+        """
+        :param target_ids:  NEST ID or a list of IDs of target nodes
+        :return:            indexes of related rows in the table
+        """
+        rows = self._rows(self._targets, self._target_offsets, target_ids)
+        return self._by_target[rows]
+
+    def for_source(self, source_ids):
+        """
+        :param source_ids:  NEST ID or a list of IDs of source nodes
+        :return:            SynapseTable with outgoing connections
+        """
+        return self._table[self.source_rows(source_ids)]
+
+    def for_target(self, target_ids):
+        """
+        :param target_ids:  NEST ID or a list of IDs of target nodes
+        :return:            SynapseTable with incoming connections
+        """
+        return self._table[self.target_rows(target_ids)]
+
+    def as_matrix(self, source_ids=None, target_ids=None, field='weight'):
+        """
+        Returns a 2D sub-matrix of a given field for given sources and targets
+        (all if not given), in the order of given IDs. Missing connections
+        are zeros.
+
+        :param source_ids:  list of NEST IDs of source nodes
+        :param target_ids:  list of NEST IDs of target nodes
+        :param field:       name of the field, 'weight' or 'delay'
+        :return:            2D numpy array (1D - source, 2D - target)
+        """
+        source_ids = self._sources if source_ids is None else \
+            np.asarray(source_ids, dtype=np.int64)
+        target_ids = self._targets if target_ids is None else \
+            np.asarray(target_ids, dtype=np.int64)
+
+        # pick the smaller side to slice the table from
+        if len(source_ids) <= len(target_ids):
+            rows = self.source_rows(source_ids)
+        else:
+            rows = self.target_rows(target_ids)
+
+        data = self._table.data[rows]
+        data = data[np.in1d(data['source'], source_ids) &
+                    np.in1d(data['target'], target_ids)]
+
+        s_order = np.argsort(source_ids)
+        t_order = np.argsort(target_ids)
+        rows = s_order[np.searchsorted(source_ids, data['source'], sorter=s_order)]
+        cols = t_order[np.searchsorted(target_ids, data['target'], sorter=t_order)]
+
+        matrix = np.zeros((len(source_ids), len(target_ids)))
+        matrix[rows, cols] = data[field]
+
+        return matrix
+
+    def assign(self, matrix, source_ids=None, target_ids=None, field='weight'):
+        """
+        Counterpart of as_matrix: takes values of a field from a 2D matrix
+        for all existing connections between given sources and targets (all if
+        not given) and writes them back to NEST with a single SetStatus call.
+
+        :param matrix:      2D array (1D - source, 2D - target)
+        :param source_ids:  list of NEST IDs of source nodes (matrix rows)
+        :param target_ids:  list of NEST IDs of target nodes (matrix columns)
+        :param field:       name of the field, 'weight' or 'delay'
+        :return:            SynapseTable with updated connections
+        """
+        source_ids = self._sources if source_ids is None else \
+            np.asarray(source_ids, dtype=np.int64)
+        target_ids = self._targets if target_ids is None else \
+            np.asarray(target_ids, dtype=np.int64)
+
+        matrix = np.asarray(matrix, dtype=float)
+        if matrix.shape != (len(source_ids), len(target_ids)):
+            raise ValueError("Matrix should be of shape %s" %
+                             str((len(source_ids), len(target_ids))))
+
+        table = self._table[self.source_rows(source_ids)]
+        table = table[np.in1d(table['target'], target_ids)]
+
+        s_order = np.argsort(source_ids)
+        t_order = np.argsort(target_ids)
+        rows = s_order[np.searchsorted(source_ids, table['source'], sorter=s_order)]
+        cols = t_order[np.searchsorted(target_ids, table['target'], sorter=t_order)]
+
+        table[field] = matrix[rows, cols]
+        table.apply(field)
+
+        return table
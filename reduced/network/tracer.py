@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+
+
+# NEST functions wrapped by the tracer
+traced_functions = ('Create', 'Connect', 'GetStatus', 'SetStatus',
+                    'GetConnections')
+
+
+class CallStats(object):
+
+    def __init__(self):
+        self.calls = 0
+        self.elements = 0
+        self.time = 0.0
+
+    def add(self, elements, elapsed):
+        self.calls += 1
+        self.elements += elements
+        self.time += elapsed
+
+
+class Tracer(object):
+    """
+    Counts round trips to NEST: calls, elements (nodes or connections) and
+    time spent in every traced function, per call site, i.e. the line of code
+    which called it (see traced_functions).
+
+    Tracing is enabled with nest.trace(tracer) (see backend) and costs a
+    frame lookup per call, so it is off by default.
+    """
+
+    def __init__(self):
+        self._stats = {}    # (function, call site) -> CallStats
+
+    def wrap(self, name, function):
+        """
+        :param name:        name of the NEST function
+        :param function:    the function itself
+        :return:            function recording its calls
+        """
+        def call(*args, **kwargs):
+            frame = sys._getframe(1)
+            site = '%s:%d %s()' % (_short_path(frame.f_code.co_filename),
+                                   frame.f_lineno, frame.f_code.co_name)
+
+            started = time.time()
+            result = function(*args, **kwargs)
+            elapsed = time.time() - started
+
+            key = (name, site)
+            if key not in self._stats:
+                self._stats[key] = CallStats()
+            self._stats[key].add(_elements(name, args, kwargs, result), elapsed)
+
+            return result
+
+        return call
+
+    def clear(self):
+        self._stats.clear()
+
+    @property
+    def stats(self):
+        """
+        :return:    list of (function, call site, CallStats), most time
+                    consuming first
+        """
+        items = [(f, s, x) for (f, s), x in self._stats.items()]
+        return sorted(items, key=lambda x: x[2].time, reverse=True)
+
+    def report(self, top=20, stream=None):
+        """
+        Writes a table of the most time consuming call sites.
+
+        :param top:     number of call sites, None for all of them
+        :param stream:  file-like object, stdout by default
+        """
+        stream = stream or sys.stdout
+        stats = self.stats
+
+        total = sum(x.time for _, _, x in stats)
+        calls = sum(x.calls for _, _, x in stats)
+        stream.write('NEST round trips: %d calls, %.3f s\n' % (calls, total))
+
+        line = '%8s %10s %9s %9s  %-15s %s\n'
+        stream.write(line % ('calls', 'elements', 'time (s)', 'mean (ms)',
+                             'function', 'call site'))
+        for function, site, x in stats[:top]:
+            stream.write(line % (x.calls, x.elements, '%.3f' % x.time,
+                                 '%.3f' % (1000.0 * x.time / x.calls),
+                                 function, site))
+
+    def save(self, path, top=None):
+        """
+        Writes the report to a file.
+
+        :param path:    path of the file
+        :param top:     number of call sites, None for all of them
+        """
+        with open(path, 'w') as f:
+            self.report(top, f)
+
+
+def _short_path(filename):
+    # path within the package (e.g. reduced/network/synapse.py)
+    parts = os.path.abspath(filename).split(os.sep)
+    if 'reduced' not in parts:
+        return '/'.join(parts[-2:])
+    return '/'.join(parts[len(parts) - parts[::-1].index('reduced') - 1:])
+
+
+def _elements(name, args, kwargs, result):
+    # number of nodes or connections handled by a call
+    if name == 'Create':
+        return args[1] if len(args) > 1 else kwargs.get('n', 1)
+    if name == 'GetConnections':
+        return len(result)
+
+    first = args[0] if args else kwargs.get('pre', kwargs.get('nodes'))
+    return len(first) if hasattr(first, '__len__') else 1
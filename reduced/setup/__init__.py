@@ -3,6 +3,10 @@ from reduced.setup.inputs import ISGStraightSetup
 from reduced.setup.neurons import NeuronSetup
 from reduced.setup.synapses import SynapseHomSetup, SynapseHomNormSetup
 from reduced.setup.connections import ConnectionSetup
+from reduced.setup.recording import RecordingSetup
+from reduced.setup.kernel import KernelSetup
+from reduced.setup.convergence import ConvergenceSetup
 
 __all__ = ['ISGStraightSetup', 'NeuronSetup', 'SynapseHomSetup',
-           'SynapseHomNormSetup', 'ConnectionSetup']
\ No newline at end of file
+           'SynapseHomNormSetup', 'ConnectionSetup', 'RecordingSetup',
+           'KernelSetup', 'ConvergenceSetup']
\ No newline at end of file
@@ -7,6 +7,8 @@ class ConnectionSetup(SetupBase):
     model = None
     weight_coeff = None
     quantity = None
+    radius = 1
+    periodic = False
 
     @property
     def is_valid(self):
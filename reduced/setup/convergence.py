@@ -0,0 +1,47 @@
+from __future__ import absolute_import
+from reduced.setup.base import SetupBase
+
+
+class ConvergenceSetup(SetupBase):
+
+    # relative change of weights per phase to stop below, if any
+    weight_epsilon = None
+
+    # number of consecutive phases the weight change should stay below it
+    window = 3
+
+    # discriminability of map responses (0..1) to stop above, if any
+    discriminability = None
+
+    # number of distinct stimuli, shown one after another in a loop
+    stimuli = 4
+
+    # time before the criteria are checked (ms)
+    min_time = 0
+
+    # stop if 'any' or if 'all' of the criteria are met
+    mode = 'any'
+
+    @property
+    def is_valid(self):
+        epsilon_ok = self.weight_epsilon is None or self.weight_epsilon > 0
+        threshold_ok = self.discriminability is None or \
+            0 < self.discriminability <= 1
+        return epsilon_ok and threshold_ok and self.window >= 1 and \
+            self.stimuli >= 2 and self.mode in ('any', 'all')
+
+    @property
+    def is_enabled(self):
+        return self.weight_epsilon is not None or \
+            self.discriminability is not None
+
+    @property
+    def as_dict(self):
+        return {
+            'weight_epsilon': self.weight_epsilon,
+            'window': self.window,
+            'discriminability': self.discriminability,
+            'stimuli': self.stimuli,
+            'min_time': self.min_time,
+            'mode': self.mode
+        }
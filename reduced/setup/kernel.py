@@ -0,0 +1,24 @@
+from __future__ import absolute_import
+from reduced.setup.base import SetupBase
+
+
+class KernelSetup(SetupBase):
+
+    # 'nest', 'numpy' (see reduced.engine) or 'stub' (see reduced.engine.stub)
+    backend = 'nest'
+
+    local_num_threads = 1
+    resolution = 0.1  # ms
+    seed = None
+
+    @property
+    def is_valid(self):
+        backend_ok = self.backend in ('nest', 'numpy', 'stub')
+        return backend_ok and self.local_num_threads >= 1 and self.resolution > 0
+
+    @property
+    def as_nest_dict(self):
+        return {
+            'local_num_threads': self.local_num_threads,
+            'resolution': self.resolution
+        }
@@ -0,0 +1,66 @@
+from __future__ import absolute_import
+import numpy as np
+from reduced.setup.base import SetupBase
+
+
+class RecordingSetup(SetupBase):
+
+    # layers to record voltage traces from
+    layers = ('input_layer', 'map_layer')
+
+    # fraction of neurons in these layers to record voltage traces from
+    fraction = 1.0
+
+    # sampling interval of voltage traces (ms)
+    interval = 1.0
+
+    # number of samples reduced to their min and max on-line, if any
+    decimation = None
+
+    @property
+    def is_valid(self):
+        decimation_ok = self.decimation is None or self.decimation >= 2
+        return 0.0 < self.fraction <= 1.0 and self.interval > 0 and decimation_ok
+
+    @property
+    def as_nest_dict(self):
+        return {
+            'record_from': ['V_m'],
+            'withtime': True,
+            'interval': self.interval
+        }
+
+    @property
+    def effective_interval(self):
+        """
+        Average time between recorded samples after decimation (ms).
+        """
+        if self.decimation is None:
+            return self.interval
+
+        return self.interval * self.decimation / 2.0
+
+    def select(self, nodes):
+        """
+        Selects neurons to record voltage traces from, evenly spread over a
+        given list of nodes.
+
+        :param nodes:   list of NEST IDs (int)
+        :return:        list of selected NEST IDs (int)
+        """
+        count = int(round(len(nodes) * self.fraction))
+        if count == 0:
+            return []
+
+        indexes = np.unique(np.linspace(0, len(nodes) - 1, count).round())
+        return [nodes[int(i)] for i in indexes]
+
+    @property
+    def as_dict(self):
+        return {
+            'layers': list(self.layers),
+            'fraction': self.fraction,
+            'interval': self.interval,
+            'decimation': self.decimation,
+            'effective_interval': self.effective_interval
+        }
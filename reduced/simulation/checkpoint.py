@@ -0,0 +1,106 @@
+import os
+import random
+import numpy as np
+import simplejson as json
+
+
+class Checkpoint(object):
+    """
+    A checkpoint of a phased simulation, stored as a single .npz file: named
+    numpy arrays (weights, membrane potentials, how far results are written
+    etc.) plus a dict of scalar values (time passed, elapsed time etc.).
+    Recorded data itself is not part of a checkpoint, it is in the results
+    (or spool files) already. Checkpoints are written to a temporary file
+    first and then renamed, so a crash during saving never leaves a broken
+    checkpoint behind.
+    """
+
+    def __init__(self, path):
+        self._path = path
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def exists(self):
+        return os.path.exists(self._path)
+
+    def save(self, values, arrays):
+        """
+        :param values:  dict of JSON-serializable scalar values
+        :param arrays:  dict of numpy arrays, keys are array names
+        """
+        arrays = dict(arrays)
+        arrays['__values__'] = np.array(json.dumps(values))
+
+        temp_path = self._path + '.tmp.npz'
+        np.savez(temp_path, **arrays)
+        os.rename(temp_path, self._path)
+
+    def load(self):
+        """
+        :return:    dict of scalar values, dict of numpy arrays
+        """
+        with np.load(self._path) as f:
+            arrays = dict((k, f[k]) for k in f.files)
+
+        values = json.loads(str(arrays.pop('__values__')))
+        return values, arrays
+
+    def remove(self):
+        if self.exists:
+            os.remove(self._path)
+
+
+def flatten_events(name, events):
+    """
+    Converts recorder events to named arrays, like 'name/times'.
+    """
+    return dict(('%s/%s' % (name, k), np.asarray(v)) for k, v in events.items())
+
+
+def unflatten_events(name, arrays):
+    """
+    Extracts recorder events with a given name from named arrays.
+    """
+    prefix = '%s/' % name
+    return dict((k[len(prefix):], v) for k, v in arrays.items()
+                if k.startswith(prefix))
+
+
+def rng_state():
+    """
+    Returns states of python and numpy random number generators as named
+    arrays. NEST random number generators can't be saved.
+    """
+    version, internal, gauss = random.getstate()
+    name, keys, pos, has_gauss, cached_gaussian = np.random.get_state()
+
+    return {
+        'rng/python': np.array(internal),
+        'rng/python_version': np.array(version),
+        'rng/python_gauss': np.array(np.nan if gauss is None else gauss),
+        'rng/numpy_keys': keys,
+        'rng/numpy_pos': np.array(pos),
+        'rng/numpy_gauss': np.array([has_gauss, cached_gaussian])
+    }
+
+
+def set_rng_state(arrays):
+    """
+    Restores python and numpy random number generators from named arrays
+    created by rng_state.
+    """
+    gauss = float(arrays['rng/python_gauss'])
+    random.setstate((
+        int(arrays['rng/python_version']),
+        tuple(int(x) for x in arrays['rng/python']),
+        None if np.isnan(gauss) else gauss
+    ))
+
+    has_gauss, cached_gaussian = arrays['rng/numpy_gauss']
+    np.random.set_state((
+        'MT19937', arrays['rng/numpy_keys'], int(arrays['rng/numpy_pos']),
+        int(has_gauss), float(cached_gaussian)
+    ))
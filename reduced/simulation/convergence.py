@@ -0,0 +1,194 @@
+import numpy as np
+
+from reduced.network.sinks import concatenate_events
+
+
+class Criterion(object):
+    """
+    An abstract stopping criterion, evaluated after every simulation phase.
+    """
+
+    name = None
+
+    def __init__(self):
+        self.value = None  # the last evaluated measure
+
+    def update(self, time, weights, responses):
+        """
+        :param time:        time passed (ms)
+        :param weights:     list of 2D arrays of actual weights, one per
+                            replica of the network
+        :param responses:   list of (events, NEST IDs) of map layer spikes
+                            during the last phase, one per replica (times
+                            of events are absolute)
+        :return:            True if the criterion is met
+        """
+        raise NotImplementedError()
+
+
+class WeightChange(Criterion):
+    """
+    Met when the relative change of weights from phase to phase stays below
+    epsilon for a window of consecutive phases.
+    """
+
+    name = 'weight_change'
+
+    def __init__(self, epsilon, window=3):
+        super(WeightChange, self).__init__()
+        self.epsilon = epsilon
+        self.window = window
+
+        self._last = None
+        self._changes = []
+
+    def update(self, time, weights, responses):
+        current = np.concatenate([np.ravel(x) for x in weights])
+
+        if self._last is not None:
+            scale = max(np.linalg.norm(self._last), np.finfo(float).tiny)
+            self.value = np.linalg.norm(current - self._last) / scale
+            self._changes = (self._changes + [self.value])[-self.window:]
+
+        self._last = current
+        return len(self._changes) == self.window and \
+            max(self._changes) < self.epsilon
+
+
+class Discriminability(Criterion):
+    """
+    Met when map layer responses to different stimuli are distinct enough.
+    Spikes of every map neuron are counted per stimulus (stimuli are shown
+    one after another, each for one period); discriminability is one minus
+    the mean cosine similarity of response vectors of all stimulus pairs,
+    averaged over replicas.
+
+    Spikes are counted over the last stimulus cycle (stimuli x period), which
+    may span several phases, so that every stimulus is seen even if phases
+    are shorter than the cycle.
+    """
+
+    name = 'discriminability'
+
+    def __init__(self, threshold, period, stimuli=4):
+        super(Discriminability, self).__init__()
+        self.threshold = threshold
+        self.period = period
+        self.stimuli = stimuli
+
+        self._recent = []   # spikes of the last cycle, one dict per replica
+
+    @property
+    def cycle(self):
+        return self.stimuli * self.period
+
+    def score(self, events, node_ids):
+        """
+        :param events:      spike events dict (senders, times)
+        :param node_ids:    NEST IDs of map neurons
+        :return:            discriminability (0..1)
+        """
+        node_ids = np.asarray(node_ids)
+        counts = np.zeros((self.stimuli, len(node_ids)))
+
+        if events and len(events['times']) > 0:
+            stimulus = (np.asarray(events['times']) // self.period).astype(int)
+            order = np.argsort(node_ids)
+            neuron = order[np.searchsorted(node_ids, events['senders'],
+                                           sorter=order)]
+            np.add.at(counts, (stimulus % self.stimuli, neuron), 1)
+
+        norms = np.linalg.norm(counts, axis=1)
+        if np.any(norms == 0):
+            return 0.0  # no response to some stimulus
+
+        unit = counts / norms[:, np.newaxis]
+        similarity = np.dot(unit, unit.T)
+        pairs = np.triu_indices(self.stimuli, 1)
+        return 1.0 - similarity[pairs].mean()
+
+    def update(self, time, weights, responses):
+        recent = []
+        for i, (events, node_ids) in enumerate(responses):
+            kept = self._recent[i] if i < len(self._recent) else {}
+            events = concatenate_events([kept, events])
+
+            if events:
+                inside = np.asarray(events['times']) > time - self.cycle
+                events = dict((k, np.asarray(v)[inside])
+                              for k, v in events.items())
+            recent.append(events)
+
+        self._recent = recent
+        self.value = np.mean([self.score(events, node_ids) for events,
+                              (_, node_ids) in zip(recent, responses)])
+        return self.value >= self.threshold
+
+
+class Convergence(object):
+    """
+    Combines stopping criteria: the simulation may stop if any (or all) of
+    them are met, but not before a minimal time.
+    """
+
+    def __init__(self, criteria, mode='any', min_time=0):
+        """
+        :param criteria:    list of Criterion objects
+        :param mode:        'any' or 'all'
+        :param min_time:    time before the criteria are checked (ms)
+        """
+        self.criteria = criteria
+        self.mode = mode
+        self.min_time = min_time
+
+        self.stop_time = None
+
+    @classmethod
+    def from_setup(cls, convergence_setup, input_setup):
+        """
+        Creates criteria enabled in a ConvergenceSetup, for stimuli of a
+        given ISGStraightSetup.
+        """
+        s = convergence_setup
+
+        criteria = []
+        if s.weight_epsilon is not None:
+            criteria.append(WeightChange(s.weight_epsilon, s.window))
+        if s.discriminability is not None:
+            period = input_setup.stimuli_duration + input_setup.i_s_i
+            criteria.append(Discriminability(s.discriminability, period,
+                                             s.stimuli))
+
+        return cls(criteria, s.mode, s.min_time)
+
+    @property
+    def converged(self):
+        return self.stop_time is not None
+
+    def check(self, time, weights, responses):
+        """
+        Updates all criteria with the results of a phase.
+
+        :return:    True if the simulation should stop
+        """
+        met = [c.update(time, weights, responses) for c in self.criteria]
+        if not met or time < self.min_time:
+            return False
+
+        if (all if self.mode == 'all' else any)(met):
+            self.stop_time = time
+
+        return self.converged
+
+    @property
+    def as_dict(self):
+        properties = {
+            'converged': self.converged,
+            'stop_time': self.stop_time,
+            'mode': self.mode,
+            'criteria': [c.name for c in self.criteria] or None
+        }
+        for c in self.criteria:
+            properties[c.name] = c.value
+
+        return properties
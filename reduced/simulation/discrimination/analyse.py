@@ -55,6 +55,42 @@ def with_data(func):
     return func_with_data
 
 
+def replica_weights(weights, replica=0):
+    """
+    Returns recorded weights of a single replica, as (sources x targets x
+    time) array, also for an ensemble stored with a leading replica axis.
+
+    :param weights: weight matrix as DataArray object
+    :param replica: index of the replica (int)
+    """
+    if len(weights.data.shape) == 4:
+        return weights.data[replica]
+
+    return weights.data
+
+
+def layer_voltages(f, layer_name, t1, t2, replica=0):
+    """
+    Reads voltage traces of a layer in a time window, of a single replica
+    for an ensemble (signals of replicas are prefixed by 'r<replica>_').
+
+    :param f:           NixDumper instance with recorded voltage data
+    :param layer_name:  'input_layer' or 'map_layer'
+    :param t1:          start time (int)
+    :param t2:          end time (int)
+    :param replica:     index of the replica (int)
+    :return:            times, NEST IDs, values (neurons x samples)
+    """
+    block = f.blocks[0]
+
+    name = 'v_%s' % layer_name
+    names = [x.name for x in f.get_data_arrays(block.name, 'analogsignals')]
+    if name not in names:
+        name = 'r%d_%s' % (replica, name)
+
+    return f.get_analogsignals(block.name, name, t1, t2)
+
+
 # ------------------
 # Analysis functions
 # ------------------
@@ -69,15 +105,15 @@ def weights_before_and_after(f, t1, t2):
     """
     block = f.blocks[0]
 
-    weights = filter(lambda x: x.type == 'synapses', block.data_arrays)[0]
+    weights = f.get_weights(block.name)
 
     time_d = filter(lambda x: x.label == 'time', weights.dimensions)[0]
     times = np.array(time_d.ticks)
 
     li, ri = find_nearest(times, t1, t2)
 
-    weights_before = weights.data[:,:,li]
-    weights_after = weights.data[:,:,ri]
+    weights_before = replica_weights(weights)[:,:,li]
+    weights_after = replica_weights(weights)[:,:,ri]
 
     return weights_multiple([weights_before, weights_after])
 
@@ -93,14 +129,14 @@ def weight_dynamics_for_single(f, t1, t2, target_index=0):
     """
     block = f.blocks[0]
 
-    weights = filter(lambda x: x.type == 'synapses', block.data_arrays)[0]
+    weights = f.get_weights(block.name)
 
     target_d = filter(lambda x: x.label == 'targets', weights.dimensions)[0]
     time_d = filter(lambda x: x.label == 'time', weights.dimensions)[0]
     times = np.array(time_d.ticks)
 
     li, ri = find_nearest(times, t1, t2)
-    weights = weights.data[:,target_index,li:ri]
+    weights = replica_weights(weights)[:,target_index,li:ri]
 
     return single_weight_evolution(weights, str(target_d.ticks[target_index]))
 
@@ -115,22 +151,9 @@ def raster(f, t1, t2):
     """
     block = f.blocks[0]
 
-    is_spiketrain = lambda x: x.type == 'spiketrain'
-    spiketrains = filter(is_spiketrain, block.data_arrays)
-
-    times = np.array(reduce(lambda x, y: x + list(y.data[:]), spiketrains, []))
-
-    senders = []
-    for st in spiketrains:
-        name = st.sources[0].name
-        senders += [int(name) for i in range(len(st.data))]
+    times, senders = f.get_spikes(block.name, t1, t2)
 
-    compiled = np.array(zip(times, senders))
-    compiled = compiled[compiled[:,0].argsort()]
-
-    li, ri = find_nearest(compiled[:,0], t1, t2)
-
-    return raster_plot(compiled[:,0][li:ri], compiled[:,1][li:ri])
+    return raster_plot(times, senders)
 
 
 def time_series(f, t1, t2):
@@ -141,26 +164,11 @@ def time_series(f, t1, t2):
     :param t1:  start time (int)
     :param t2:  end time (int)
     """
-    block = f.blocks[0]
-
-    input_sources = f.get_neurons_for_layer(block.name, 'input_layer')
-    map_sources = f.get_neurons_for_layer(block.name, 'map_layer')
-
-    sort_key = lambda x: int(x.sources[0].name)
-
-    filt = lambda x: x.type == 'analogsignal' and x.sources[0] in input_sources
-    i_signals = sorted(filter(filt, block.data_arrays), key=sort_key)
+    # traces of the whole layers, in a window, with a single read each
+    times, _, i_events = layer_voltages(f, 'input_layer', t1, t2)
+    _, _, m_events = layer_voltages(f, 'map_layer', t1, t2)
 
-    filt = lambda x: x.type == 'analogsignal' and x.sources[0] in map_sources
-    m_signals = sorted(filter(filt, block.data_arrays), key=sort_key)
-
-    times = np.array(i_signals[0].dimensions[0].ticks)
-
-    li, ri = find_nearest(times, t1, t2)
-    i_events = np.array([signal.data[li:ri] for signal in i_signals])
-    m_events = np.array([signal.data[li:ri] for signal in m_signals])
-
-    return layer_co_dynamics(i_events, m_events, times[li:ri])
+    return layer_co_dynamics(i_events, m_events, times)
 
 
 def weight_sum_evolution(f, t1, t2):
@@ -173,13 +181,14 @@ def weight_sum_evolution(f, t1, t2):
     """
     block = f.blocks[0]
 
-    weights = filter(lambda x: x.type == 'synapses', block.data_arrays)[0]
+    weights = f.get_weights(block.name)
 
     time_d = filter(lambda x: x.label == 'time', weights.dimensions)[0]
     times = np.array(time_d.ticks)
 
     li, ri = find_nearest(times, t1, t2)
-    weight_sums = [np.array(weights.data[:,:,x]).sum() for x in range(li, ri)]
+    data = replica_weights(weights)
+    weight_sums = [np.array(data[:,:,x]).sum() for x in range(li, ri)]
 
     return single_line(times[li:ri], np.array(weight_sums))
 
@@ -199,29 +208,30 @@ def spike_triggered_averages(f, t1, t2, kernel=25, offset=-2):
     input_sources = f.get_neurons_for_layer(block.name, 'input_layer')
     map_sources = f.get_neurons_for_layer(block.name, 'map_layer')
 
-    filt = lambda x: x.type == 'spiketrain' and x.sources[0] in input_sources
-    sort_key = lambda x: int(x.sources[0].name)
-    input_spiketrains = sorted(filter(filt, block.data_arrays), key=sort_key)
+    # all spikes in the window with a single read, split by neuron once
+    # (a stable sort keeps every train sorted by time)
+    times, senders = f.get_spikes(block.name, t1, t2)
+    order = np.argsort(senders, kind='mergesort')
+    ids, starts = np.unique(senders[order], return_index=True)
+    trains = dict(zip(ids, np.split(times[order], starts[1:])))
 
-    x_indexes = [int(st.sources[0].name) for st in input_spiketrains]
+    spikes_of = lambda source: trains.get(int(source.name), np.array([]))
 
-    values = []
-    for nn, neuron in enumerate(map_sources):
-        filt = lambda x: x.type == 'spiketrain' and neuron in x.sources
-        spiketrain = np.array(filter(filt, block.data_arrays)[0].data[:])
+    # silent input neurons keep their (empty) rows
+    input_spiketrains = map(spikes_of, input_sources)
+    x_indexes = [int(x.name) for x in input_sources]
 
-        li, ri = find_nearest(spiketrain, t1, t2)
-        spiketrain = spiketrain[li:ri]
+    values = []
+    for neuron in map_sources:
+        spiketrain = spikes_of(neuron)
 
         bins = np.array([spiketrain - kernel + offset, spiketrain + offset])
 
+        # input spikes within [bins[0], bins[1]] of every map spike
         sta_matrix = np.zeros([len(input_spiketrains), len(spiketrain)])
-        for i, st in enumerate(input_spiketrains):
-            li, ri = find_nearest(st.data[:], t1, t2)
-            data = st.data[li:ri]
-
-            for j in range(bins.shape[-1]):
-                sta_matrix[i][j] = ((data >= bins[0][j]) & (data <= bins[1][j])).sum()
+        for i, data in enumerate(input_spiketrains):
+            sta_matrix[i] = np.searchsorted(data, bins[1], 'right') - \
+                np.searchsorted(data, bins[0], 'left')
 
         values.append(np.mean(sta_matrix, axis=1))
 
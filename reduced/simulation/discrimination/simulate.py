@@ -10,145 +10,677 @@ Example:
 
 ./simulate.py -t 20000 -p 1000 -c "config/01_4x4_orthogonal.json"
 
+Recorded events and weights are moved out of NEST after every phase and
+appended to the results right away, so memory use does not grow with the
+simulation time. To write all results at once at the end instead, keeping
+recorded data on disk until then, give a spool directory (every run spools
+to a directory of its own in it, removed when the results are written):
+
+./simulate.py -t 20000 -p 1000 -c "config/01_4x4_orthogonal.json" -s /tmp
+
+To save a checkpoint every 5 phases (next to the output file) and to
+continue an interrupted run from its last checkpoint:
+
+./simulate.py -t 20000 -p 1000 -c "config/01_4x4_orthogonal.json" -k 5
+./simulate.py -t 20000 -p 1000 -c "config/01_4x4_orthogonal.json" --resume
+
+A checkpoint holds no recorded data, only how far the results (or spool
+files) are written; a resumed run goes on writing them from there, and cuts
+off anything written after the checkpoint. It restores weights, membrane
+potentials, the position in the stimulus sequence and python/numpy random
+states. Other
+kernel states (synaptic currents, plasticity traces, spikes in flight) and
+NEST random generators can't be restored, and NEST is reseeded, so a resumed
+run is close to, but not identical with an uninterrupted one.
+
+Small profiles can be simulated without NEST, by the NumPy engine, with
+"backend": "numpy" in the KERNEL section of the profile (see reduced.engine).
+
+To simulate an ensemble of 10 independent replicas of the network (with
+their own initial weights) in a single kernel:
+
+./simulate.py -t 20000 -p 1000 -c "config/01_4x4_orthogonal.json" -r 10
+
+Weights of an ensemble are stored with an extra leading replica axis.
+
+The simulation stops before the given time if the network converges
+according to the CONVERGENCE section of the profile, e.g.
+
+"CONVERGENCE": {"weight_epsilon": 0.001, "window": 3, "discriminability": 0.5}
+
+stops when weights change less than 0.1% per phase for 3 phases, or when
+map responses to different stimuli are distinct enough. The actual stop time
+is saved in the 'convergence' metadata section.
+
+To start from the final weights of a previous run:
+
+./simulate.py -t 20000 -p 1000 -c "config/01_4x4_orthogonal.json" -w sim.h5
+
+Time spent in every stage (network build, Simulate, weight snapshots, dump
+etc.), recorded events per second, synapse count and memory usage are saved
+per phase in a JSON file next to the output (sim.h5.stats.json), and as
+totals in the 'performance' metadata section. To print a progress line after
+every phase:
+
+./simulate.py -t 20000 -p 1000 -c "config/01_4x4_orthogonal.json" --progress
+
+To write results of every phase while the next one is simulated (by a
+background thread, which queues at most a few phases and 64 MB of recorded
+data):
+
+./simulate.py -t 20000 -p 1000 -c "config/01_4x4_orthogonal.json" -a
+
+To find where the time goes in Python<->NEST calls, the 20 most expensive
+call sites of Create, Connect, GetStatus, SetStatus and GetConnections are
+reported at the end with (or written to a file with --trace-output):
+
+./simulate.py -t 20000 -p 1000 -c "config/01_4x4_orthogonal.json" --trace 20
+
 """
 
-import nest
-import argparse
+import os
+import sys
+import time
 import random
+import shutil
+import argparse
+import tempfile
 import numpy as np
-import itertools as it
 
 from reduced.simulation.utils import *
 from reduced.setup import *
+from reduced.network.backend import nest, use_backend
+from reduced.network.tracer import Tracer
 from reduced.network.layer import InputLayer, MapLayer
-from reduced.network.monitors import SpikeDetector, VoltageMonitor, MonitorPool
+from reduced.network.monitors import SpikeDetector, LayerVoltageMonitor
+from reduced.network.monitors import WeightRecorder
+from reduced.network.sinks import FileSink, CallbackSink, concatenate_events
 from reduced.simulation.dump import NixDumper
+from reduced.simulation.checkpoint import Checkpoint, rng_state, set_rng_state
+from reduced.simulation.checkpoint import flatten_events, unflatten_events
+from reduced.simulation.convergence import Convergence
+from reduced.simulation.instrumentation import Instrumentation
+from reduced.simulation.writer import BackgroundWriter
+
+
+def set_seed(seed):
+    """
+    Seeds python, numpy and NEST random number generators. NEST gets a
+    global seed and one seed per virtual process, all derived from the
+    given one.
+
+    :param seed:    seed (int)
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+
+    n_vp = nest.GetKernelStatus('total_num_virtual_procs')
+    nest.SetKernelStatus({
+        'grng_seed': seed,
+        'rng_seeds': range(seed + 1, seed + 1 + n_vp)
+    })
+
+
+def setup_kernel(setup_dict, seed=None):
+    """
+    Selects the backend, resets the kernel and configures it (threads,
+    resolution, seeds) according to the KERNEL section of a profile.
+
+    :param setup_dict:  profile dict
+    :param seed:        seed (int), overrides the seed of the profile
+    """
+    kernel_setup = KernelSetup(**setup_dict.get('KERNEL', {}))
+    if not kernel_setup.is_valid:
+        raise ValueError("Invalid KERNEL section in the profile")
+
+    use_backend(kernel_setup.backend)
+    nest.ResetKernel()
+    nest.SetKernelStatus(kernel_setup.as_nest_dict)
 
+    seed = kernel_setup.seed if seed is None else seed
+    if seed is not None:
+        set_seed(seed)
 
-def simulate(simulation_time, phase, config_path, output_path):
-    nest.ResetKernel()
-    setup_dict = from_file(config_path)  # network configuration
 
-    #--------------
-    # Network setup
-    #--------------
+def build_network(setup_dict):
+    """
+    Builds input and map layers with all connections according to a given
+    profile.
+
+    :param setup_dict:  profile dict
+    :return:            InputLayer, MapLayer
+    """
+    return build_ensemble(setup_dict, 1)[0]
 
+
+def build_ensemble(setup_dict, replicas):
+    """
+    Builds a given number of independent (disconnected) replicas of the
+    network in the same kernel. Initial weights of every replica are drawn
+    independently.
+
+    :param setup_dict:  profile dict
+    :param replicas:    number of replicas (int)
+    :return:            list of (InputLayer, MapLayer), one per replica
+    """
+    synapse_setup = SynapseHomNormSetup(**setup_dict['SYNAPSE'])
+    conn_setup = ConnectionSetup(**setup_dict['FWD_CONN'])
+    nest.CopyModel(conn_setup.model, 'plastic', synapse_setup.as_nest_dict)
+
+    return [_build_replica(setup_dict) for i in range(replicas)]
+
+
+def _build_replica(setup_dict):
     # input layer
     input_setup = ISGStraightSetup(**setup_dict['STIMULI'])
     neuron_setup = NeuronSetup(**setup_dict['INPUT_NEURON'])
     dimensions = setup_dict['INPUT_LAYER']
     input_layer = InputLayer(input_setup, neuron_setup, **dimensions)
-    
+
     # output layer
     neuron_setup = NeuronSetup(**setup_dict['MAP_NEURON'])
     dimensions = setup_dict['MAP_LAYER']
     map_layer = MapLayer(neuron_setup, **dimensions)
 
     # connections from input to map layer
-    synapse_setup = SynapseHomNormSetup(**setup_dict['SYNAPSE'])
     conn_setup = ConnectionSetup(**setup_dict['FWD_CONN'])
-    nest.CopyModel(conn_setup.model, 'plastic', synapse_setup.as_nest_dict)
 
     wc = conn_setup.weight_coeff
-    for neuron in input_layer:
-        weights = list(wc * np.random.rand(len(map_layer)))
-        neuron.synapse_with(map_layer, weights, model='plastic')
+    weights = wc * np.random.rand(len(input_layer), len(map_layer))
+    input_layer.connect_to(map_layer, 'all_to_all', weights, model='plastic')
 
     # inhibitory connections inside the map layer
     if 'INH_CONN' in setup_dict:
         conn_setup = ConnectionSetup(**setup_dict['INH_CONN'])
-        for neuron in map_layer:
-            # may include itself
-            some = random.sample(map_layer, conn_setup.quantity)
-            weights = conn_setup.weight_coeff * np.ones(len(some))
-            neuron.synapse_with(some, weights, model=conn_setup.model)
+        # may include itself
+        map_layer.connect_to(map_layer, 'fixed_outdegree',
+                             conn_setup.weight_coeff, model=conn_setup.model,
+                             outdegree=conn_setup.quantity)
 
     # excitatory connections to neighboring neurons
     if 'EXC_CONN' in setup_dict:
         conn_setup = ConnectionSetup(**setup_dict['EXC_CONN'])
-        for x, row in enumerate(map_layer.as_matrix):
-            for y, neuron in enumerate(row):
-                horizontal = (x-1, x, x+1 if x+1 < map_layer.x_dim else -1)
-                vertical = (y-1, y, y+1 if y+1 < map_layer.y_dim else -1)
-                coords = it.product(horizontal, vertical)
-                coords = filter(lambda q: not q == (x, y), coords)
-
-                neighbors = [map_layer.as_matrix[i][j] for i, j in coords]
-                weights = conn_setup.weight_coeff * np.ones(len(neighbors))
-                neuron.synapse_with(neighbors, weights, model=conn_setup.model)
+        map_layer.connect_to(map_layer, 'neighbourhood',
+                             conn_setup.weight_coeff, model=conn_setup.model,
+                             radius=conn_setup.radius,
+                             periodic=conn_setup.periodic)
+
+    return input_layer, map_layer
+
+
+class Recorders(object):
+    """
+    Recording devices of an ensemble: spike detectors of both layers and
+    voltage monitors (according to the recording policy) by name, drained
+    every phase, and recorders of weights from input to map layer, one per
+    replica. Names of devices of all replicas but a single one get a prefix.
+    Weight snapshots are not kept by the recorders, but passed to sinks too.
+    """
+
+    def __init__(self, ensemble, recording, new_sink, capacity):
+        """
+        :param ensemble:    list of (InputLayer, MapLayer), one per replica
+        :param recording:   RecordingSetup object
+        :param new_sink:    function returning a Sink for a device name
+        :param capacity:    expected number of weight snapshots (int)
+        """
+        self.replicas = len(ensemble)
+
+        self.devices = {}       # name -> SpikeDetector or LayerVoltageMonitor
+        self.detectors = []
+        self.monitors = []      # (name, LayerVoltageMonitor)
+        self.weights = []       # WeightRecorder, one per replica
+        self.sinks = {}         # name -> Sink of a device or weight recorder
+
+        def sink(name):
+            self.sinks[name] = new_sink(name)
+            return self.sinks[name]
+
+        for i, (input_layer, map_layer) in enumerate(ensemble):
+            for name, layer in (('spikes_i', input_layer), ('spikes_m', map_layer)):
+                name = self.name(name, i)
+                detector = SpikeDetector(layer.nodes, sink(name))
+                self.detectors.append(detector)
+                self.devices[name] = detector
+
+            for name, layer in (('input_layer', input_layer), ('map_layer', map_layer)):
+                observed = recording.select(layer.nodes)
+                if name not in recording.layers or not observed:
+                    continue
+
+                name = self.name('v_%s' % name, i)
+                monitor = LayerVoltageMonitor(observed, sink(name),
+                                              recording.interval,
+                                              recording.decimation)
+                self.monitors.append((name, monitor))
+                self.devices[name] = monitor
+
+            self.weights.append(WeightRecorder(input_layer, map_layer.nodes,
+                                               capacity,
+                                               sink(self.name('weights', i)),
+                                               keep=False))
+
+    def name(self, name, i):
+        return name if self.replicas == 1 else 'r%d_%s' % (i, name)
+
+    def snapshot(self, time):
+        """
+        :return:    list of weight snapshots, one per replica
+        """
+        return [x.record(time) for x in self.weights]
+
+    def drain(self):
+        """
+        :return:    drained chunks of events by device name
+        """
+        return dict((name, x.drain()) for name, x in self.devices.items())
+
+    def spikes(self, events):
+        """
+        :param events:  events dicts by device name (e.g. drained chunks)
+        :return:        spikes of all detectors as a single events dict
+        """
+        return concatenate_events([events[name] for name, x in
+                                   self.devices.items()
+                                   if isinstance(x, SpikeDetector)])
+
+
+#-------------
+# Checkpoints
+#-------------
+
+def save_checkpoint(checkpoint, values, ensemble, neuron_ids, recorders,
+                    output_state=None):
+    """
+    Saves weights, membrane potentials, python/numpy random states and how
+    far results are written. Recorded data is not saved, it is in the
+    results (or spool files) already.
+
+    :param checkpoint:      Checkpoint object
+    :param values:          dict of scalar values (time passed, phases etc.)
+    :param ensemble:        list of (InputLayer, MapLayer), one per replica
+    :param neuron_ids:      NEST IDs of all neurons
+    :param recorders:       Recorders object
+    :param output_state:    what is appended to the results (see
+                            NixDumper.appended_state), None if they are
+                            spooled
+    """
+    weights = [i.connection_store.as_matrix(i.nodes, m.nodes)
+               for i, m in ensemble]
+    arrays = {
+        'weights': np.array(weights),
+        'V_m': np.array(nest.GetStatus(neuron_ids, 'V_m')),
+        'weight_targets': np.array([x.targets for x in recorders.weights])
+    }
+    arrays.update(rng_state())
+    if output_state is not None:
+        arrays.update(flatten_events('output', output_state))
+
+    checkpoint.save(values, arrays)
+
+
+def restore_checkpoint(state, ensemble, neuron_ids, recorders):
+    """
+    Restores the state of an interrupted run saved by save_checkpoint in a
+    freshly built network.
+
+    :param state:       scalar values and arrays of the checkpoint
+    """
+    values, arrays = state
+    time_passed = values['time_passed']
+
+    for (input_layer, map_layer), weights in zip(ensemble, arrays['weights']):
+        input_layer.set_weights(weights, map_layer.nodes)
+        input_layer.shift_stimulus(time_passed)
+    nest.SetStatus(neuron_ids, [{'V_m': v} for v in arrays['V_m']])
+    set_rng_state(arrays)
+
+    # the new kernel starts from zero
+    for device in recorders.devices.values():
+        device.time_offset = time_passed
+
+    # snapshots go on with the same targets
+    for weight_recorder, targets in zip(recorders.weights,
+                                        arrays['weight_targets']):
+        weight_recorder.restore([], None, targets)
+
+
+#--------
+# Results
+#--------
+
+# results are written with write(method, *args), which calls a NixDumper
+# method directly or queues the call to a BackgroundWriter
+
+def direct_writer(dumper):
+    return lambda method, *args: getattr(dumper, method)(*args)
+
+
+def create_block(write, block_name, sim_time, ensemble):
+    if len(ensemble) == 1:
+        write('create_block', block_name, sim_time, *ensemble[0])
+    else:
+        write('create_ensemble_block', block_name, sim_time, ensemble)
+
+
+def append_events(write, block_name, recorders, events):
+    """
+    Appends events of all devices (e.g. drained chunks) to the results.
+
+    :param events:  events dicts by device name
+    """
+    spikes = recorders.spikes(events)
+    write('append_spikes', block_name, spikes.get('times', []),
+          spikes.get('senders', []))
+
+    for name, monitor in recorders.monitors:
+        times, values = monitor.read(events[name])
+        write('append_analogsignals', block_name, name, monitor.observables,
+              times, values)
+
+
+def append_weights(write, block_name, recorders, time, snapshots):
+    """
+    Appends weight snapshots of all replicas, with a leading replica axis for
+    many of them.
+    """
+    first = recorders.weights[0]
+    snapshot = snapshots[0] if len(snapshots) == 1 else np.array(snapshots)
+    write('append_weights', block_name, first.sources, first.targets, time,
+          snapshot)
+
+
+def dump_recorded(write, block_name, recorders):
+    """
+    Writes everything retained by the sinks of the recorders at once.
+    """
+    # spike events of all layers as a single spike table
+    events = concatenate_events([x.sink.events for x in recorders.detectors])
+    write('dump_spikes', block_name, events.get('times', []),
+          events.get('senders', []))
+
+    # voltage traces
+    for name, monitor in recorders.monitors:
+        times, values = monitor.read(monitor.sink.events)
+        write('dump_analogsignals', block_name, name, monitor.observables,
+              times, values)
+
+    # synapses (snapshots as sources x targets x time), with a leading
+    # replica axis for an ensemble
+    snapshots = [x.sink.events for x in recorders.weights]
+    weights = [x['weights'].transpose(1, 2, 0) for x in snapshots]
+    weights = weights[0] if len(weights) == 1 else np.array(weights)
+
+    first = recorders.weights[0]
+    write('dump_weights', block_name, first.sources, first.targets,
+          snapshots[0]['times'], weights)
+
+
+def dump_stimulus(write, block_name, time_passed, phase, stimuli_duration):
+    positions = [phase * i for i in range(int(time_passed / phase))]
+    extents = [stimuli_duration for i in range(len(positions))]
+    stimulus = [float(i % 4) + 1 for i in range(len(positions))]
+
+    write('dump_stimulus', block_name, positions, extents, stimulus)
+
+
+def simulate(simulation_time, phase, config_path, output_path,
+             warm_start=None, spool=None, seed=None, checkpoint_every=None,
+             resume=False, replicas=1, convergence=None, progress=False,
+             async_dump=False):
+    stats = Instrumentation(sys.stderr if progress else None)
+
+    # network configuration, from a file or an already parsed profile
+    if isinstance(config_path, dict):
+        setup_dict = config_path
+    else:
+        setup_dict = from_file(config_path)
+
+    # state of an interrupted run to continue from, if any
+    checkpoint = Checkpoint(output_path + '.ckpt.npz')
+    state = checkpoint.load() if resume and checkpoint.exists else None
+
+    with stats.stage('build'):
+        if state is None:
+            setup_kernel(setup_dict, seed)
+        else:
+            # NEST random generators can't be restored, so NEST is reseeded
+            # differently for every resumed phase
+            if seed is None:
+                seed = KernelSetup(**setup_dict.get('KERNEL', {})).seed or 0
+            setup_kernel(setup_dict, seed + state[0]['phases'])
+
+        #--------------
+        # Network setup
+        #--------------
+
+        input_setup = ISGStraightSetup(**setup_dict['STIMULI'])
+        ensemble = build_ensemble(setup_dict, replicas)
+        neuron_ids = sum([i.nodes + m.nodes for i, m in ensemble], [])
+
+        # continue from the final weights of a previous run (of a single
+        # network or of an ensemble, replicas are reused if there are less
+        # of them)
+        if warm_start is not None and state is None:
+            with NixDumper(warm_start, NixDumper.mode['readonly']) as nd:
+                final = nd.get_final_weights('simulation')
+
+            final = [final] if final.ndim == 2 else final
+            for i, (input_layer, _) in enumerate(ensemble):
+                input_layer.set_weights(final[i % len(final)])
+
+    stats.values.update({
+        'backend': nest.name,
+        'replicas': replicas,
+        'neurons': len(neuron_ids),
+        'synapses': sum(len(i.connection_store) for i, _ in ensemble)
+    })
 
     #--------------
     # Devices setup
     #--------------
 
+    recording = RecordingSetup(**setup_dict.get('RECORDING', {}))
+    if not recording.is_valid:
+        raise ValueError("Invalid RECORDING section in the profile")
+
+    # stopping criteria, from the profile unless given
+    if convergence is None:
+        convergence_setup = ConvergenceSetup(**setup_dict.get('CONVERGENCE', {}))
+        if not convergence_setup.is_valid:
+            raise ValueError("Invalid CONVERGENCE section in the profile")
+
+        convergence = Convergence.from_setup(convergence_setup, input_setup)
+
+    if spool is not None and async_dump:
+        raise ValueError("Spooled results can't be written asynchronously")
+
+    if state is not None and ('spool' in state[0]) != (spool is not None):
+        raise ValueError("A run is resumed with spooling only if it was "
+                         "started with it")
+
+    # recorders are drained every phase; drained chunks are appended to the
+    # results right away and nothing is retained, or spooled to files in a
+    # directory of this run (concurrent runs may share the spool directory)
+    # and written at the end. A resumed run goes on with its spool files.
+    streaming = spool is None
+    run_spool, spool_sizes = None, {}
+    if state is not None and not streaming:
+        run_spool = state[0]['spool']
+        spool_sizes = state[0]['spool_sizes']
+    elif not streaming:
+        run_spool = tempfile.mkdtemp(prefix=os.path.basename(output_path) + '.',
+                                     dir=spool)
+
+    def new_sink(name):
+        if streaming:
+            return CallbackSink(lambda events: None)
+        return FileSink(os.path.join(run_spool, '%s.npy' % name),
+                        spool_sizes.get(name, 0))
+
+    # weight snapshots, one per phase and the final one
+    n_phases = int(np.ceil(float(simulation_time) / phase))
+    recorders = Recorders(ensemble, recording, new_sink, n_phases + 1)
+
+    #-------------------------------------
+    # Restore the state of an earlier run
+    #-------------------------------------
+
+    started = time.time()
     time_passed = 0
+    phases_done = 0
 
-    spike_detector_i = SpikeDetector(input_layer.nodes)
-    spike_detector_m = SpikeDetector(map_layer.nodes)
-    input_monitors = MonitorPool(VoltageMonitor, input_layer.nodes)
-    map_monitors = MonitorPool(VoltageMonitor, map_layer.nodes)
-    spider = []  # collector for actual synaptic states (weights)
-    syn_times = []   # records times when states were collected
-
-    get_as_dict = lambda synapses: [x.as_dict() for x in synapses]
+    if state is not None:
+        restore_checkpoint(state, ensemble, neuron_ids, recorders)
 
-    #------------------------------
-    # Simulate with cycles == phase
-    #------------------------------
+        time_passed = state[0]['time_passed']
+        phases_done = state[0]['phases']
+        started -= state[0]['elapsed']
 
-    while time_passed < simulation_time:
-        spider.append(get_as_dict(input_layer.synapses))
-        syn_times.append(time_passed)
-
-        nest.Simulate(phase)
-        time_passed += phase
-
-    #-------------------
-    # Dump synaptic data
-    #-------------------
+    #-----------------------------------------
+    # Results written during the simulation
+    #-----------------------------------------
 
     block_name = 'simulation'
-    stimuli_duration = input_setup.stimuli_duration
-
-    with NixDumper(output_path, NixDumper.mode['overwrite']) as nd:
-        nd.create_block(block_name, time_passed, input_layer, map_layer)
-
-        # create stimulus
-        positions = [phase * i for i in range(int(time_passed / phase))]
-        extents = [stimuli_duration for i in range(len(positions))]
-        stimulus = [float(i % 4) + 1 for i in range(len(positions))]
-
-        nd.dump_stimulus(block_name, positions, extents, stimulus)
-
-        # dump spike events
-        def dump_spikes(events, senders):
-            neuron_ids = set(senders)
-            for nest_id in neuron_ids:
-                indexes = np.where(senders == nest_id)
-                nd.dump_spiketrain(block_name, nest_id, events[indexes])
-
-        dump_spikes(spike_detector_i.times, spike_detector_i.senders)
-        dump_spikes(spike_detector_m.times, spike_detector_m.senders)
 
-        # dump voltage traces
-        for m in list(input_monitors) + list(map_monitors):
-            nd.dump_analogsignal(block_name, m.observable, m.times, m.V_m)
-
-        # dump synapses
-        synapse_sample = spider[0]
-
-        sources = np.array(sorted(set([int(x['source']) for x in synapse_sample])))
-        targets = np.array(sorted(set([int(x['target']) for x in synapse_sample])))
-        times = np.array(syn_times)
-
-        weight_matrix = np.zeros((len(sources), len(targets), len(times)))
-        for t, snapshot in enumerate(spider):
-            for synapse in snapshot:
-                i = np.where(sources == int(synapse['source']))[0][0]
-                j = np.where(targets == int(synapse['target']))[0][0]
-                weight_matrix[i][j][t] = synapse['weight']
-
-        nd.dump_weights(block_name, sources, targets, times, weight_matrix)
+    # every phase is written directly, or queued to a writer thread with
+    # asynchronous dumping; the output is closed also if the run fails
+    output = None
+    try:
+        if streaming and state is None:
+            output = NixDumper(output_path, NixDumper.mode['overwrite'])
+            create_block(direct_writer(output), block_name, simulation_time,
+                         ensemble)
+
+        elif streaming:
+            # results of the interrupted run go on from the checkpoint
+            output = NixDumper(output_path, NixDumper.mode['readwrite'])
+            output.resume_appending(block_name,
+                                    unflatten_events('output', state[1]))
+
+        # read() waits until everything submitted is written
+        if streaming and async_dump:
+            output = BackgroundWriter(output)
+            write, read = output.submit, output.call
+        elif streaming:
+            write = read = direct_writer(output)
+
+        #------------------------------
+        # Simulate with cycles == phase
+        #------------------------------
+
+        while time_passed < simulation_time:
+            stats.start_phase(time_passed)
+
+            with stats.stage('snapshot'):
+                snapshots = recorders.snapshot(time_passed)
+
+            with stats.stage('simulate'):
+                nest.Simulate(phase)
+            time_passed += phase
+            phases_done += 1
+
+            with stats.stage('drain'):
+                chunks = recorders.drain()
+
+            # drained chunks are all the events NEST buffered during the phase
+            buffers = [len(x.get('senders', ())) for x in chunks.values()]
+
+            if streaming:
+                with stats.stage('dump'):
+                    append_weights(write, block_name, recorders,
+                                   time_passed - phase, snapshots)
+                    append_events(write, block_name, recorders, chunks)
+
+            if checkpoint_every and phases_done % checkpoint_every == 0:
+                with stats.stage('checkpoint'):
+                    values = {
+                        'time_passed': time_passed,
+                        'phases': phases_done,
+                        'elapsed': time.time() - started
+                    }
+                    output_state = None
+                    if streaming:
+                        output_state = read('appended_state', block_name)
+                    else:
+                        values['spool'] = run_spool
+                        values['spool_sizes'] = dict(
+                            (name, x.size) for name, x in recorders.sinks.items())
+
+                    save_checkpoint(checkpoint, values, ensemble, neuron_ids,
+                                    recorders, output_state)
+
+            # stop early if the network has converged
+            converged = False
+            if convergence.criteria:
+                with stats.stage('convergence'):
+                    weights = [i.connection_store.as_matrix(i.nodes, m.nodes)
+                               for i, m in ensemble]
+                    responses = [(chunks[recorders.name('spikes_m', i)],
+                                  m.nodes) for i, (_, m) in enumerate(ensemble)]
+
+                    converged = convergence.check(time_passed, weights,
+                                                  responses)
+
+            stats.end_phase(sum(buffers), max_buffer=max(buffers or [0]))
+            if converged:
+                break
+
+        stats.finish()
+
+        # weights after the last phase, e.g. to warm start another run from
+        with stats.stage('snapshot'):
+            snapshots = recorders.snapshot(time_passed)
+
+        if streaming:
+            with stats.stage('dump'):
+                append_weights(write, block_name, recorders, time_passed,
+                               snapshots)
+
+        #-------------------
+        # Dump synaptic data
+        #-------------------
+
+        with stats.stage('dump'):
+            if streaming:
+                # everything else is written already
+                write('set_simulation_time', time_passed)
+                write('finish', block_name)
+            else:
+                output = NixDumper(output_path, NixDumper.mode['overwrite'])
+                write = direct_writer(output)
+                create_block(write, block_name, time_passed, ensemble)
+                dump_recorded(write, block_name, recorders)
+
+            write('dump_metadata', 'recording', recording.as_dict)
+            write('dump_metadata', 'run', {
+                'elapsed': time.time() - started,
+                'resumed_at': state[0]['time_passed'] if state else None,
+                'replicas': replicas,
+                'async_dump': async_dump
+            })
+            write('dump_metadata', 'convergence', convergence.as_dict)
+            # the dump itself is timed in the sidecar file only
+            write('dump_metadata', 'performance', stats.as_dict)
+
+            dump_stimulus(write, block_name, time_passed, phase,
+                          input_setup.stimuli_duration)
+
+            # queued calls are written within the stage too
+            if async_dump:
+                output.flush()
+    finally:
+        # results written so far are kept, e.g. to resume from a checkpoint
+        if output is not None:
+            output.close()
+
+    stats.save(output_path + '.stats.json')
+
+    if run_spool is not None:
+        shutil.rmtree(run_spool)
+
+    # results are complete, the checkpoint is not needed anymore
+    checkpoint.remove()
 
 
 if __name__ == '__main__':
@@ -158,8 +690,30 @@ if __name__ == '__main__':
     parser.add_argument('-p, --phase', dest='phase', type=int)
     parser.add_argument('-c, --conf', dest='conf', type=str, default='config/01_3x3_orthogonal.json')
     parser.add_argument('-o, --output', dest='output', type=str, default='sim.h5')
+    parser.add_argument('-w, --warm', dest='warm', type=str, default=None)
+    parser.add_argument('-s, --spool', dest='spool', type=str, default=None)
+    parser.add_argument('--seed', dest='seed', type=int, default=None)
+    parser.add_argument('-k, --checkpoint', dest='checkpoint', type=int, default=None)
+    parser.add_argument('--resume', dest='resume', action='store_true')
+    parser.add_argument('-r, --replicas', dest='replicas', type=int, default=1)
+    parser.add_argument('--progress', dest='progress', action='store_true')
+    parser.add_argument('-a, --async', dest='async_dump', action='store_true')
+    parser.add_argument('--trace', dest='trace', type=int, default=None)
+    parser.add_argument('--trace-output', dest='trace_output', type=str, default=None)
 
     args = parser.parse_args()
     assert(args.time >= args.phase)
 
-    simulate(args.time, args.phase, args.conf, args.output)
+    if args.trace or args.trace_output:
+        nest.trace(Tracer())
+
+    simulate(args.time, args.phase, args.conf, args.output, args.warm,
+             args.spool, args.seed, args.checkpoint, args.resume,
+             args.replicas, progress=args.progress,
+             async_dump=args.async_dump)
+
+    if nest.tracer is not None:
+        if args.trace_output:
+            nest.tracer.save(args.trace_output, args.trace)
+        else:
+            nest.tracer.report(args.trace)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+
+"""
+Runs simulate.py for many variants of a base profile in parallel. Every
+parameter range is given as a dotted path into the profile and a list of
+values; all combinations of ranges are simulated. Several paths joined with
+'+' get the same value (e.g. both dimensions of a layer).
+
+Every run is executed in a fresh worker process (one NEST kernel per run)
+with its own seed, and writes its own NIX file. An index of all runs with
+their parameters, seeds and outputs is written as index.json into the output
+directory.
+
+Usage: ./sweep.py -t <time> -p <phase> -c <profile> -r <range> [-r <range>]
+                  [-o <directory>] [-n <processes>] [--seed <seed>]
+
+Example:
+
+./sweep.py -t 20000 -p 1000 -c profiles/01_4x4_orthogonal.json \\
+    -r SYNAPSE.alpha=0.05,0.1,0.2 \\
+    -r FWD_CONN.weight_coeff=100,200 \\
+    -r MAP_LAYER.x_dim+MAP_LAYER.y_dim=4,8 \\
+    -o sweep -n 8
+
+"""
+
+import os
+import copy
+import time
+import argparse
+import itertools
+import multiprocessing
+import simplejson as json
+
+from reduced.simulation.utils import from_file
+
+
+def parse_range(text):
+    """
+    Parses a parameter range like 'SYNAPSE.alpha=0.05,0.1' or
+    'MAP_LAYER.x_dim+MAP_LAYER.y_dim=4,8'.
+
+    :param text:    range definition (string)
+    :return:        tuple of dotted paths, list of values
+    """
+    paths, values = text.split('=', 1)
+    paths = tuple(paths.split('+'))
+    values = [json.loads(x) for x in values.split(',')]
+    return paths, values
+
+
+def set_by_path(profile, path, value):
+    """
+    Sets a value in a nested profile dict by a dotted path, like
+    'SYNAPSE.alpha'. Sections on the path must exist.
+    """
+    keys = path.split('.')
+
+    section = profile
+    for key in keys[:-1]:
+        section = section[key]
+
+    section[keys[-1]] = value
+
+
+def expand(base_profile, ranges):
+    """
+    Expands a base profile into variants, one for every combination of
+    given parameter ranges.
+
+    :param base_profile:    profile dict
+    :param ranges:          list of (paths, values) as returned by parse_range
+    :return:                list of (parameters dict, profile dict)
+    """
+    runs = []
+    for values in itertools.product(*[r[1] for r in ranges]):
+        profile = copy.deepcopy(base_profile)
+        params = {}
+
+        for (paths, _), value in zip(ranges, values):
+            for path in paths:
+                set_by_path(profile, path, value)
+                params[path] = value
+
+        runs.append((params, profile))
+
+    return runs
+
+
+def run(task):
+    """
+    Executes a single simulation. Is called in a worker process, so NEST is
+    imported (and its kernel created) there and not in the main process.
+
+    :param task:    dict with simulation arguments
+    :return:        task dict updated with status and elapsed time
+    """
+    from reduced.simulation.discrimination.simulate import simulate
+
+    started = time.time()
+    try:
+        simulate(task['time'], task['phase'], task['profile'], task['output'],
+                 seed=task['seed'])
+        status = 'done'
+    except Exception as e:
+        status = 'failed: %s' % repr(e)
+
+    result = dict((k, v) for k, v in task.items() if k != 'profile')
+    result['status'] = status
+    result['elapsed'] = time.time() - started
+
+    return result
+
+
+def sweep(simulation_time, phase, config_path, ranges, output_dir,
+          processes=None, seed=0):
+    """
+    Runs all variants of a profile in a process pool and writes an index.
+
+    :param simulation_time: simulation time of every run (ms)
+    :param phase:           phase of every run (ms)
+    :param config_path:     path to the base profile
+    :param ranges:          list of range definitions (string)
+    :param output_dir:      directory for NIX files and the index
+    :param processes:       number of worker processes, all cores if None
+    :param seed:            seed of the first run, incremented for others
+    :return:                list of run descriptions (as in the index)
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    base_profile = from_file(config_path)
+    variants = expand(base_profile, [parse_range(x) for x in ranges])
+
+    tasks = []
+    for i, (params, profile) in enumerate(variants):
+        tasks.append({
+            'name': 'run_%03d' % i,
+            'output': os.path.join(output_dir, 'run_%03d.h5' % i),
+            'params': params,
+            'profile': profile,
+            'seed': seed + i,
+            'time': simulation_time,
+            'phase': phase
+        })
+
+    # a fresh process for every run to get a fresh NEST kernel
+    pool = multiprocessing.Pool(processes, maxtasksperchild=1)
+    try:
+        results = []
+        for result in pool.imap_unordered(run, tasks):
+            results.append(result)
+            print("%s %s (%.1f s)" % (result['name'], result['status'],
+                                      result['elapsed']))
+    finally:
+        pool.close()
+        pool.join()
+
+    results = sorted(results, key=lambda x: x['name'])
+    index = {
+        'profile': os.path.abspath(config_path),
+        'time': simulation_time,
+        'phase': phase,
+        'ranges': ranges,
+        'runs': results
+    }
+    with open(os.path.join(output_dir, 'index.json'), 'w') as f:
+        f.write(json.dumps(index, indent=4))
+
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Parameter sweep')
+
+    parser.add_argument('-t, --time', dest='time', type=int)
+    parser.add_argument('-p, --phase', dest='phase', type=int)
+    parser.add_argument('-c, --conf', dest='conf', type=str)
+    parser.add_argument('-r, --range', dest='ranges', action='append', default=[])
+    parser.add_argument('-o, --output', dest='output', type=str, default='sweep')
+    parser.add_argument('-n, --processes', dest='processes', type=int, default=None)
+    parser.add_argument('--seed', dest='seed', type=int, default=0)
+
+    args = parser.parse_args()
+    assert(args.time >= args.phase)
+
+    sweep(args.time, args.phase, args.conf, args.ranges, args.output,
+          args.processes, args.seed)
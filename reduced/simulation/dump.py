@@ -2,6 +2,52 @@ import nix
 import numpy as np
 
 
+class BlockIndex(object):
+    """
+    In-memory indexes of a block: sources by name, data arrays by name, by
+    type and by source name, and sorted neurons of layers. Sources and data
+    arrays are walked once, when the index is built.
+    """
+
+    def __init__(self, block):
+        self.sources = {}       # name -> source (the first one found)
+        self.arrays = {}        # name -> data array
+        self.by_type = {}       # type -> list of data arrays
+        self.by_source = {}     # source name -> list of data arrays
+        self._layers = {}       # layer name -> sorted neuron sources
+
+        # breadth first, as find_sources, so that e.g. layers of the first
+        # replica of an ensemble are found by name
+        level = list(block.sources)
+        while level:
+            for source in level:
+                self.sources.setdefault(source.name, source)
+            level = sum([list(x.sources) for x in level], [])
+
+        for array in block.data_arrays:
+            self.add(array)
+
+    def add(self, array):
+        """
+        Adds a data array to the indexes, e.g. a newly created one.
+        """
+        self.arrays[array.name] = array
+        self.by_type.setdefault(array.type, []).append(array)
+        for source in array.sources:
+            self.by_source.setdefault(source.name, []).append(array)
+
+    def neurons(self, layer_name):
+        """
+        :return:    neuron sources of a layer, sorted by NEST ID
+        """
+        if layer_name not in self._layers:
+            layer = self.sources[layer_name]
+            sources = layer.find_sources(lambda x: x.type == 'neuron')
+            self._layers[layer_name] = sorted(sources, key=lambda x: int(x.name))
+
+        return self._layers[layer_name]
+
+
 class NixDumper(object):
 
     mode = {
@@ -14,22 +60,65 @@ class NixDumper(object):
         self._path = filepath
         self._nf = nix.File.open(self._path, mode)
 
+        # lookup indexes, built on first use
+        self._blocks = None
+        self._indexes = {}
+
+        # axes of data appended chunk by chunk (see finish)
+        self._signals = {}      # name -> (NEST IDs, list of time chunks)
+        self._weight_axes = None
+
     def __enter__(self):
         return self
 
     def __exit__(self, ex_type, ex_value, traceback):
-        self._nf.close()
+        self.close()
         if ex_type:
             return False
 
+    def close(self):
+        self._nf.close()
+
     def create_block(self, name, sim_time, input_layer, map_layer):
+        block = self._create_simulation(name, sim_time)
+        self._create_layers(block, input_layer, map_layer)
+
+    def create_ensemble_block(self, name, sim_time, replicas):
+        """
+        Creates a block for an ensemble of network replicas. Layers of every
+        replica belong to a source of type 'replica', so that layers of the
+        first replica are found first by name.
+
+        :param name:        name of the block
+        :param sim_time:    simulation time
+        :param replicas:    list of (InputLayer, MapLayer), one per replica
+        """
+        block = self._create_simulation(name, sim_time)
+
+        for i, (input_layer, map_layer) in enumerate(replicas):
+            replica = block.create_source('replica_%d' % i, 'replica')
+            self._create_layers(replica, input_layer, map_layer)
+
+    def set_simulation_time(self, sim_time):
+        """
+        Updates the simulation time, e.g. of a block created before the
+        simulation has (possibly early) finished.
+        """
+        metadata = self._nf.sections[0]
+        sim_time_p = metadata.get_property_by_name('simulation_time')
+        sim_time_p.values = [nix.Value(sim_time)]
+
+    def _create_simulation(self, name, sim_time):
         metadata = self._nf.create_section("simulation", "simulation")
         metadata.create_property('simulation_time', nix.Value(sim_time))
 
-        block = self._nf.create_block(name, 'simulation')
+        self._blocks = None
+        return self._nf.create_block(name, 'simulation')
 
-        layer_i = block.create_source('input_layer', 'layer')
-        layer_m = block.create_source('map_layer', 'layer')
+    @staticmethod
+    def _create_layers(parent, input_layer, map_layer):
+        layer_i = parent.create_source('input_layer', 'layer')
+        layer_m = parent.create_source('map_layer', 'layer')
 
         new_neuron = lambda id: layer_i.create_source(str(id), 'neuron')
         map(new_neuron, input_layer.nodes)
@@ -37,6 +126,46 @@ class NixDumper(object):
         new_neuron = lambda id: layer_m.create_source(str(id), 'neuron')
         map(new_neuron, map_layer.nodes)
 
+    def dump_metadata(self, section_name, properties):
+        """
+        Saves given properties as a subsection of the simulation metadata.
+
+        :param section_name:    name of the new section
+        :param properties:      dict with property names and values (single
+                                values or lists, None values are skipped)
+        :return:                created section
+        """
+        metadata = self._nf.sections[0]
+        section = metadata.create_section(section_name, section_name)
+
+        as_value = lambda x: nix.Value(x.item() if hasattr(x, 'item') else x)
+        for name, value in properties.items():
+            if value is None:
+                continue
+
+            values = value if isinstance(value, (list, tuple)) else [value]
+            section.create_property(name, [as_value(x) for x in values])
+
+        return section
+
+    def get_metadata(self, section_name):
+        """
+        Returns properties of a simulation metadata subsection as dict.
+
+        :param section_name:    name of the section
+        :return:                dict with property names and values (lists
+                                for multiple values)
+        """
+        metadata = self._nf.sections[0]
+        section = filter(lambda x: x.name == section_name, metadata.sections)[0]
+
+        properties = {}
+        for prop in section.props:
+            values = [x.value for x in prop.values]
+            properties[prop.name] = values[0] if len(values) == 1 else values
+
+        return properties
+
     @property
     def blocks(self):
         return self._nf.blocks
@@ -48,18 +177,79 @@ class NixDumper(object):
         return int(sim_time.values[0].value)
 
     def get_block_by_name(self, name):
-        return filter(lambda x: x.name == str(name), self.blocks)[0]
+        if self._blocks is None:
+            self._blocks = dict((x.name, x) for x in self.blocks)
+
+        return self._blocks[str(name)]
+
+    def index(self, block_name):
+        """
+        Returns lookup indexes of a block with a given name, built on first
+        use (see BlockIndex).
+        """
+        block_name = str(block_name)
+        if block_name not in self._indexes:
+            block = self.get_block_by_name(block_name)
+            self._indexes[block_name] = BlockIndex(block)
+
+        return self._indexes[block_name]
+
+    def _added(self, block_name, array):
+        # keeps the index of a block, if already built, up to date
+        index = self._indexes.get(str(block_name))
+        if index is not None:
+            index.add(array)
 
     def get_neuron_by_name(self, block_name, neuron_name):
-        block = self.get_block_by_name(block_name)
-        return block.find_sources(lambda x: x.name == str(neuron_name))[0]
+        return self.index(block_name).sources[str(neuron_name)]
 
     def get_neurons_for_layer(self, block_name, layer_name):
-        block = self.get_block_by_name(block_name)
+        return self.index(block_name).neurons(layer_name)
+
+    def get_data_arrays(self, block_name, array_type=None, source_name=None):
+        """
+        Returns data arrays of a block of a given type and/or linked to a
+        source with a given name (e.g. a neuron).
+
+        :param block_name:  name of the block
+        :param array_type:  type of data arrays (e.g. 'synapses'), any if None
+        :param source_name: name of the source, any if None
+        :return:            list of DataArray objects
+        """
+        index = self.index(block_name)
+        if source_name is not None:
+            arrays = index.by_source.get(str(source_name), [])
+            if array_type is None:
+                return list(arrays)
+            return [x for x in arrays if x.type == array_type]
+
+        if array_type is not None:
+            return list(index.by_type.get(array_type, []))
 
-        layer = block.find_sources(lambda x: x.name == layer_name)[0]
-        sources = layer.find_sources(lambda x: x.type == 'neuron')
-        return sorted(sources, key=lambda x: int(x.name))
+        return index.arrays.values()
+
+    def get_weights(self, block_name):
+        """
+        Returns recorded synaptic weights of a block with a given name.
+
+        :param block_name:  name of the block with weights
+        :return:            weight matrix as DataArray object
+        """
+        return self.get_data_arrays(block_name, 'synapses')[0]
+
+    def get_final_weights(self, block_name):
+        """
+        Returns the last recorded snapshot of synaptic weights.
+
+        :param block_name:  name of the block with weights
+        :return:            2D numpy array (1D - source, 2D - target), or 3D
+                            (replica, source, target) for an ensemble
+        """
+        weights = self.get_weights(block_name)
+        if len(weights.data.shape) == 4:
+            return np.array(weights.data[:, :, :, -1])
+
+        return np.array(weights.data[:, :, -1])
 
     def dump_stimulus(self, block_name, positions, extents, values):
         """
@@ -76,6 +266,7 @@ class NixDumper(object):
             simple_array = block.create_data_array(*iargs)
             simple_array.data[:] = data
             simple_array.unit = unit
+            self._added(block_name, simple_array)
 
             return simple_array
 
@@ -114,9 +305,85 @@ class NixDumper(object):
         signal.append_range_dimension(times)
         signal.dimensions[0].unit = 'ms'
         signal.sources.append(neuron)
+        self._added(block_name, signal)
 
         return signal
 
+    def dump_analogsignals(self, block_name, name, node_ids, times, values,
+                           unit='mV'):
+        """
+        Saves signals of many neurons sampled at the same times (e.g. voltage
+        traces of a layer) as a single 2D matrix (neurons x samples). Rows
+        are labeled by NEST IDs. Regularly sampled times are stored as a
+        sampled dimension (interval and offset only), other times as a range
+        dimension. Samples of a neuron are contiguous, so a time window of
+        all signals is a single slice of the matrix, read as one contiguous
+        run of samples per neuron.
+
+        :param block_name:  where to create the signals
+        :param name:        name of the signals (e.g. 'v_input_layer')
+        :param node_ids:    NEST IDs of the neurons, one per row
+        :param times:       time domain shared by all neurons (floats)
+        :param values:      2D array of actual values (neurons x samples)
+        :param unit:        unit of the values
+        :return:            created signals as DataArray object
+        """
+        block = self.get_block_by_name(block_name)
+
+        times = np.asarray(times, dtype=float)
+        values = np.asarray(values, dtype=float).reshape(len(node_ids), -1)
+
+        iargs = [name, 'analogsignals', nix.DataType.Float, values.shape]
+        signals = block.create_data_array(*iargs)
+
+        signals.data[:] = values
+        signals.unit = unit
+        self._signal_dimensions(signals, node_ids, times)
+        self._added(block_name, signals)
+
+        return signals
+
+    @staticmethod
+    def _signal_dimensions(signals, node_ids, times):
+        neuron_d = signals.append_set_dimension()
+        neuron_d.labels = [str(x) for x in node_ids]
+
+        intervals = np.diff(times)
+        if len(times) > 1 and np.allclose(intervals, intervals[0]):
+            time_d = signals.append_sampled_dimension(float(intervals[0]))
+            time_d.offset = float(times[0])
+        else:
+            time_d = signals.append_range_dimension(times)
+        time_d.label = 'time'
+        time_d.unit = 'ms'
+
+    def get_analogsignals(self, block_name, name, t1=None, t2=None):
+        """
+        Reads signals saved with dump_analogsignals in a time window [t1, t2].
+
+        :param block_name:  name of the block with the signals
+        :param name:        name of the signals
+        :param t1:          start time, from the beginning if None
+        :param t2:          end time, to the end if None
+        :return:            times (1D numpy array), NEST IDs (list of int),
+                            values (2D numpy array, neurons x samples)
+        """
+        signals = self._get_data_array(block_name, name)
+        neuron_d, time_d = signals.dimensions[0], signals.dimensions[1]
+        samples = signals.data.shape[1]
+
+        if hasattr(time_d, 'sampling_interval'):
+            interval, start = time_d.sampling_interval, time_d.offset or 0.0
+            times = start + interval * np.arange(samples)
+        else:
+            times = np.array(time_d.ticks)
+
+        li = 0 if t1 is None else np.searchsorted(times, t1, 'left')
+        ri = samples if t2 is None else np.searchsorted(times, t2, 'right')
+
+        node_ids = [int(x) for x in neuron_d.labels]
+        return times[li:ri], node_ids, np.array(signals.data[:, li:ri])
+
     def dump_spiketrain(self, block_name, source_name, times):
         """
         Saves a spiketrain with spike events at times coming from neuron with ID
@@ -138,12 +405,138 @@ class NixDumper(object):
         spiketrain.unit = "ms"
         spiketrain.append_set_dimension()
         spiketrain.sources.append(neuron)
+        self._added(block_name, spiketrain)
 
         return spiketrain
 
+    def dump_spikes(self, block_name, times, senders, bin_width=1000.0):
+        """
+        Saves spike events of all neurons of a block as a spike table: a pair
+        of columns (times, senders) sorted by time, with a coarse time index
+        (the first row at or after every multiple of bin_width), and rows of
+        the table grouped by sender with CSR offsets, so that spikes in a
+        time window are a contiguous read, and spike times of a single
+        neuron are found without reading the whole table.
+
+        :param block_name:  where to create the spike table
+        :param times:       times of spike events (floats)
+        :param senders:     NEST IDs of neurons which fired them (ints)
+        :param bin_width:   time bin of the coarse time index (ms)
+        :return:            spike times as DataArray object
+        """
+        times = np.asarray(times, dtype=float)
+        senders = np.asarray(senders, dtype=np.int64)
+
+        # time ordered table, stable to keep the order of equal times
+        order = np.argsort(times, kind='mergesort')
+        times, senders = times[order], senders[order]
+
+        spike_times = self._dump_array(block_name, 'spike times', 'spike_times',
+                                       times, nix.DataType.Float)
+        spike_times.unit = 'ms'
+        spike_times.append_set_dimension()
+        self._dump_array(block_name, 'spike senders', 'spike_senders', senders)
+
+        self._dump_spike_indexes(block_name, times, senders, bin_width)
+        return spike_times
+
+    def _dump_spike_indexes(self, block_name, times, senders, bin_width):
+        # coarse time index and spike trains of a time ordered spike table
+        dump_array = lambda *args: self._dump_array(block_name, *args)
+
+        edges = np.arange(int(times[-1] // bin_width) + 2 if len(times) else 2)
+        index = dump_array('spike time index', 'spike_index',
+                           np.searchsorted(times, edges * bin_width))
+        time_d = index.append_sampled_dimension(bin_width)
+        time_d.unit = 'ms'
+
+        # rows of spike trains, ordered by sender and by time for each of
+        # them (half the size of times, unless the table is huge)
+        order = np.argsort(senders, kind='mergesort')
+        ids, counts = np.unique(senders, return_counts=True)
+        offsets = np.concatenate([[0], np.cumsum(counts)])
+
+        if len(times) < 2 ** 31:
+            dump_array('spike train rows', 'spike_train_rows',
+                       order.astype(np.int32), nix.DataType.Int32)
+        else:
+            dump_array('spike train rows', 'spike_train_rows', order)
+        dump_array('spike train senders', 'spike_train_senders', ids)
+        dump_array('spike train offsets', 'spike_train_offsets', offsets)
+
+    def _dump_array(self, block_name, name, array_type, data,
+                    data_type=nix.DataType.Int64):
+        block = self.get_block_by_name(block_name)
+
+        array = block.create_data_array(name, array_type, data_type,
+                                        (len(data),))
+        array.data[:] = data
+        self._added(block_name, array)
+        return array
+
+    def get_spikes(self, block_name, t1=None, t2=None):
+        """
+        Reads spike events of all neurons in a time window [t1, t2).
+
+        :param block_name:  name of the block with the spike table
+        :param t1:          start time, from the beginning if None
+        :param t2:          end time, to the end if None
+        :return:            times (1D numpy array), senders (1D numpy array)
+        """
+        spike_times = self._get_data_array(block_name, 'spike times')
+        spike_senders = self._get_data_array(block_name, 'spike senders')
+
+        start, stop = 0, spike_times.data.shape[0]
+        if t1 is not None or t2 is not None:
+            index = self._get_data_array(block_name, 'spike time index')
+            bin_width = index.dimensions[0].sampling_interval
+            edges = np.array(index.data[:])
+
+            bin_of = lambda t: min(max(int(t // bin_width), 0), len(edges) - 1)
+            if t1 is not None:
+                start = edges[bin_of(t1)]
+            if t2 is not None:
+                stop = edges[min(bin_of(t2) + 1, len(edges) - 1)]
+
+        times = np.array(spike_times.data[start:stop])
+        left = 0 if t1 is None else np.searchsorted(times, t1, 'left')
+        right = len(times) if t2 is None else np.searchsorted(times, t2, 'left')
+
+        senders = np.array(spike_senders.data[start + left:start + right])
+        return times[left:right], senders
+
+    def get_spiketrain(self, block_name, sender):
+        """
+        Reads all spike times of a single neuron.
+
+        :param block_name:  name of the block with the spike table
+        :param sender:      NEST ID of the neuron
+        :return:            spike times (1D numpy array)
+        """
+        ids = self._get_data_array(block_name, 'spike train senders')
+        offsets = self._get_data_array(block_name, 'spike train offsets')
+
+        ids = np.array(ids.data[:])
+        i = np.searchsorted(ids, int(sender))
+        if i == len(ids) or ids[i] != int(sender):
+            return np.array([])
+
+        start, stop = offsets.data[i:i + 2]
+        rows = self._get_data_array(block_name, 'spike train rows')
+        rows = np.array(rows.data[start:stop], dtype=np.int64)
+
+        # rows are increasing, times are read from the first to the last one
+        spike_times = self._get_data_array(block_name, 'spike times')
+        return np.array(spike_times.data[rows[0]:rows[-1] + 1])[rows - rows[0]]
+
+    def _get_data_array(self, block_name, name):
+        return self.index(block_name).arrays[name]
+
     def dump_weights(self, block_name, sources, targets, times, weights):
         """
-        Saves synaptic weight dynamics as 3D matrix.
+        Saves synaptic weight dynamics as 3D matrix. Weights of an ensemble
+        come with an extra leading replica axis (4D matrix); sources and
+        targets are then the ones of the first replica.
 
         :param block_name:  where to create weight matrix
         :param sources:     list of source neuron NEST IDs (int)
@@ -158,6 +551,17 @@ class NixDumper(object):
         matrix = block.create_data_array(*wargs)
 
         matrix.data[:] = weights
+        self._weight_dimensions(matrix, sources, targets, times)
+        self._added(block_name, matrix)
+
+        return matrix
+
+    @staticmethod
+    def _weight_dimensions(matrix, sources, targets, times):
+        shape = matrix.data.shape
+        if len(shape) == 4:
+            replica_d = matrix.append_set_dimension()
+            replica_d.labels = ['replica_%d' % i for i in range(shape[0])]
         source_d = matrix.append_range_dimension(sources)
         source_d.label = 'sources'
         target_d = matrix.append_range_dimension(targets)
@@ -166,7 +570,191 @@ class NixDumper(object):
         time_d.label = 'time'
         time_d.unit = 'ms'
 
-        return matrix
+    # Data appended chunk by chunk, e.g. once per simulation phase. Arrays
+    # are created from the first chunk and grow along time; dimensions and
+    # indexes are added by finish, when all chunks are there.
+
+    def append_spikes(self, block_name, times, senders):
+        """
+        Appends spike events to the spike table of a block (see dump_spikes).
+        Chunks should follow each other in time.
+
+        :param block_name:  where to create the spike table
+        :param times:       times of spike events (floats)
+        :param senders:     NEST IDs of neurons which fired them (ints)
+        """
+        times = np.asarray(times, dtype=float)
+        if len(times) == 0:
+            return
+
+        order = np.argsort(times, kind='mergesort')
+        senders = np.asarray(senders, dtype=np.int64)[order]
+
+        self._append(block_name, 'spike times', 'spike_times', times[order])
+        self._append(block_name, 'spike senders', 'spike_senders', senders,
+                     data_type=nix.DataType.Int64)
+
+    def append_analogsignals(self, block_name, name, node_ids, times, values):
+        """
+        Appends samples of signals of many neurons (see dump_analogsignals).
+
+        :param block_name:  where to create the signals
+        :param name:        name of the signals (e.g. 'v_input_layer')
+        :param node_ids:    NEST IDs of the neurons, one per row
+        :param times:       times of the samples (floats)
+        :param values:      2D array of actual values (neurons x samples)
+        """
+        _, time_chunks = self._signals.setdefault(name, (list(node_ids), []))
+
+        values = np.asarray(values, dtype=float).reshape(len(node_ids), -1)
+        if values.shape[1] == 0:
+            return
+
+        self._append(block_name, name, 'analogsignals', values, axis=1)
+        time_chunks.append(np.asarray(times, dtype=float))
+
+    def append_weights(self, block_name, sources, targets, time, snapshot):
+        """
+        Appends a snapshot of synaptic weights (see dump_weights).
+
+        :param block_name:  where to create weight matrix
+        :param sources:     list of source neuron NEST IDs (int)
+        :param targets:     list of target neuron NEST IDs (int)
+        :param time:        time of the snapshot
+        :param snapshot:    2D array (sources x targets), or 3D with a
+                            leading replica axis for an ensemble
+        """
+        if self._weight_axes is None:
+            self._weight_axes = (list(sources), list(targets), [])
+        self._weight_axes[2].append(time)
+
+        snapshot = np.asarray(snapshot, dtype=float)[..., np.newaxis]
+        self._append(block_name, 'weights', 'synapses', snapshot)
+
+    def finish(self, block_name, bin_width=1000.0):
+        """
+        Completes data appended to a block: adds dimensions, the spike time
+        index and spike trains (reading the spike table once).
+
+        :param block_name:  name of the block
+        :param bin_width:   time bin of the coarse spike time index (ms)
+        """
+        index = self.index(block_name)
+
+        if 'spike times' not in index.arrays:
+            self.dump_spikes(block_name, [], [], bin_width)
+        else:
+            spike_times = index.arrays['spike times']
+            spike_times.unit = 'ms'
+            spike_times.append_set_dimension()
+
+            times = np.array(spike_times.data[:])
+            senders = np.array(index.arrays['spike senders'].data[:])
+            self._dump_spike_indexes(block_name, times, senders, bin_width)
+
+        for name, (node_ids, time_chunks) in self._signals.items():
+            times = np.concatenate(time_chunks) if time_chunks else []
+            if name not in index.arrays:
+                values = np.zeros((len(node_ids), 0))
+                self.dump_analogsignals(block_name, name, node_ids, times,
+                                        values)
+                continue
+
+            signals = index.arrays[name]
+            signals.unit = 'mV'
+            self._signal_dimensions(signals, node_ids, times)
+
+        if self._weight_axes is not None:
+            sources, targets, times = self._weight_axes
+            self._weight_dimensions(index.arrays['weights'], sources, targets,
+                                    times)
+
+        self._signals = {}
+        self._weight_axes = None
+
+    def appended_state(self, block_name):
+        """
+        Returns what has been appended to a block so far: extents of data
+        arrays and axes kept until finish, so that appending can go on from
+        there in another run (see resume_appending).
+
+        :param block_name:  name of the block
+        :return:            dict of numpy arrays
+        """
+        index = self.index(block_name)
+
+        state = {}
+        for name, array in index.arrays.items():
+            state['extent/%s' % name] = np.array(array.data_extent)
+
+        for name, (node_ids, time_chunks) in self._signals.items():
+            times = np.concatenate(time_chunks) if time_chunks else []
+            state['signal ids/%s' % name] = np.array(node_ids)
+            state['signal times/%s' % name] = np.array(times, dtype=float)
+
+        if self._weight_axes is not None:
+            sources, targets, times = self._weight_axes
+            state['weight sources'] = np.array(sources)
+            state['weight targets'] = np.array(targets)
+            state['weight times'] = np.array(times, dtype=float)
+
+        return state
+
+    def resume_appending(self, block_name, state):
+        """
+        Continues appending to a block of a file opened for writing, from a
+        state returned by appended_state. Data appended after that state was
+        taken (e.g. by a run interrupted later) is cut off.
+
+        :param block_name:  name of the block
+        :param state:       dict of numpy arrays (see appended_state)
+        """
+        index = self.index(block_name)
+
+        # arrays grow along the last axis
+        for name, array in index.arrays.items():
+            extent = state.get('extent/%s' % name)
+            if extent is None:
+                extent = array.data_extent[:-1] + (0,)
+            array.data_extent = tuple(int(x) for x in extent)
+
+        self._signals = {}
+        for key, node_ids in state.items():
+            if key.startswith('signal ids/'):
+                name = key[len('signal ids/'):]
+                times = state['signal times/%s' % name]
+                self._signals[name] = (node_ids.tolist(), [times])
+
+        self._weight_axes = None
+        if 'weight times' in state:
+            self._weight_axes = (state['weight sources'].tolist(),
+                                 state['weight targets'].tolist(),
+                                 state['weight times'].tolist())
+
+    def _append(self, block_name, name, array_type, data, axis=-1,
+                data_type=nix.DataType.Float):
+        # creates a data array from the first chunk, extends it by the next
+        index = self.index(block_name)
+        if name not in index.arrays:
+            block = self.get_block_by_name(block_name)
+            array = block.create_data_array(name, array_type, data_type,
+                                            data.shape)
+            array.data[:] = data
+            self._added(block_name, array)
+            return array
+
+        array = index.arrays[name]
+        extent = list(array.data_extent)
+        axis = axis % len(extent)
+        start = extent[axis]
+
+        extent[axis] += data.shape[axis]
+        array.data_extent = tuple(extent)
+
+        window = [slice(None)] * len(extent)
+        window[axis] = slice(start, extent[axis])
+        array.data[tuple(window)] = data
+        return array
 
 
 def with_file_access(file_mode):
@@ -0,0 +1,148 @@
+import sys
+import time
+import resource
+from contextlib import contextmanager
+
+import simplejson as json
+
+
+def rss():
+    """
+    :return:    current resident set size of the process (MB)
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 1024.0 ** 2
+    except (IOError, IndexError, ValueError):
+        return peak_rss()
+
+
+def peak_rss():
+    """
+    :return:    peak resident set size of the process (MB)
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on Mac OS
+    return peak / 1024.0 ** (2 if sys.platform == 'darwin' else 1)
+
+
+class Instrumentation(object):
+    """
+    Collects wall clock times of simulation stages (network build, Simulate,
+    weight snapshots, dumping etc.), in total and per phase, together with
+    event counts and memory usage of every phase.
+
+    Example:
+
+    stats = Instrumentation()
+    with stats.stage('build'):
+        ...
+
+    stats.start_phase(time_passed)
+    with stats.stage('simulate'):
+        nest.Simulate(phase)
+    stats.end_phase(events=100)
+    """
+
+    def __init__(self, progress=None):
+        """
+        :param progress:    stream to print a progress line to after every
+                            phase (e.g. sys.stderr), None for no progress
+        """
+        self.progress = progress
+
+        self.stages = {}    # total time per stage (s)
+        self.phases = []    # dict of stage times and values per phase
+        self.values = {}    # values of the whole run, e.g. synapse count
+
+        self._phase = None
+        self._started = time.time()
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Measures time of a block of code, added to the stage with a given
+        name (and to the current phase, if any).
+        """
+        started = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - started
+            self.stages[name] = self.stages.get(name, 0.0) + elapsed
+            if self._phase is not None:
+                self._phase[name] = self._phase.get(name, 0.0) + elapsed
+
+    def start_phase(self, time_passed):
+        """
+        :param time_passed: simulation time at the start of the phase (ms)
+        """
+        self._phase = {'time': time_passed}
+
+    def end_phase(self, events=0, **values):
+        """
+        :param events:  number of events recorded during the phase, i.e. the
+                        size of NEST event buffers before they were drained
+        :param values:  other values of the phase
+        :return:        dict of the finished phase
+        """
+        phase = self._phase
+        phase.update(values)
+        phase['events'] = events
+        phase['rss'] = rss()
+
+        simulated = phase.get('simulate', 0.0)
+        phase['events_per_s'] = events / simulated if simulated > 0 else None
+
+        self.phases.append(phase)
+        self._phase = None
+
+        if self.progress is not None:
+            self.progress.write('\r' + self.progress_line(phase))
+            self.progress.flush()
+
+        return phase
+
+    def finish(self):
+        # ends the progress line
+        if self.progress is not None and self.phases:
+            self.progress.write('\n')
+            self.progress.flush()
+
+    def progress_line(self, phase):
+        per_s = phase['events_per_s']
+        return 'phase %d, %.0f ms: simulate %.2f s, %s events/s, RSS %.1f MB' % (
+            len(self.phases), phase['time'], phase.get('simulate', 0.0),
+            '%.0f' % per_s if per_s is not None else '-', phase['rss'])
+
+    @property
+    def as_dict(self):
+        """
+        Totals of the run: stage times, events, memory and given values, as
+        flat dict (e.g. for a metadata section).
+        """
+        events = sum(x['events'] for x in self.phases)
+        simulated = self.stages.get('simulate', 0.0)
+
+        properties = dict(self.values)
+        properties.update(('%s_time' % k, v) for k, v in self.stages.items())
+        properties.update({
+            'elapsed': time.time() - self._started,
+            'phases': len(self.phases),
+            'events': events,
+            'events_per_s': events / simulated if simulated > 0 else None,
+            'rss': rss(),
+            'peak_rss': peak_rss()
+        })
+        return properties
+
+    def save(self, path):
+        """
+        Saves totals and per phase records as JSON file.
+
+        :param path:    path of the file
+        """
+        with open(path, 'w') as f:
+            json.dump({'totals': self.as_dict, 'phases': self.phases}, f,
+                      indent=2, sort_keys=True)
@@ -1,7 +1,7 @@
-import nest
 import numpy as np
 import matplotlib.pyplot as plt
 
+from reduced.network.backend import nest
 from reduced.plot.dynamics import *
 
 
@@ -15,11 +15,11 @@ Example:
 
 """
 
-import nest
 import argparse
 import numpy as np
 import matplotlib.pyplot as plt
 
+from reduced.network.backend import nest
 from reduced.plot.dynamics import *
 
 
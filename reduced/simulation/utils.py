@@ -1,9 +1,11 @@
 import numpy as np
 import simplejson as json
 from reduced.setup import *
+from reduced.network.synapse import SynapseTable
 
 setup_classes = [ISGStraightSetup, NeuronSetup, SynapseHomSetup,
-                 SynapseHomNormSetup, ConnectionSetup]
+                 SynapseHomNormSetup, ConnectionSetup, RecordingSetup,
+                 KernelSetup, ConvergenceSetup]
 
 
 def from_file(path):
@@ -44,16 +46,13 @@ def weights_as_matrix(synapse_list):
     """
     Extracts a 2D array of weights from a list of given Synapse objects.
 
-    :param synapse_list:    list of Synapse objects
-    :return:                2D numpy array of weights
+    :param synapse_list:    list of Synapse objects or a SynapseTable
+    :return:                2D numpy array of weights (1D - source, 2D - target)
     """
-    sources = [x['source'] for x in synapse_list]
-    sources = sorted(set(sources), key=sources.index)
+    if not isinstance(synapse_list, SynapseTable):
+        synapse_list = SynapseTable.from_synapses(synapse_list)
 
-    source_filter = lambda x: x['source'] == source
-    get_weights = lambda synapses: [x['weight'] for x in synapses]
-
-    return np.array([get_weights(filter(source_filter, synapse_list)) for source in sources])
+    return synapse_list.as_matrix('weight')
 
 
 def find_nearest(array, t1, t2):
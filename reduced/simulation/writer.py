@@ -0,0 +1,134 @@
+import Queue
+import threading
+import numpy as np
+
+
+class BackgroundWriter(object):
+    """
+    Calls methods of a NixDumper in a separate thread, so that results are
+    written while the simulation goes on. Calls are queued in order; the
+    queue is bounded both by the number of calls and by the size of numpy
+    arrays passed with them, so that submitting blocks while the writer is
+    behind (backpressure) instead of piling up data in memory. A single call
+    larger than max_bytes is still queued, once the queue is empty.
+
+    The dumper must not be used directly while the writer runs, but through
+    call(), which waits until all queued calls are done. close() waits for
+    them as well and closes the dumper. Once a call has failed in the writer
+    thread, the rest of the queue is skipped and the error is raised by
+    every following submit, flush, call and close.
+    """
+
+    def __init__(self, dumper, maxsize=4, max_bytes=64 * 2 ** 20):
+        """
+        :param dumper:      NixDumper object
+        :param maxsize:     maximal number of queued calls (int)
+        :param max_bytes:   maximal size of arrays of queued calls (int),
+                            None for no limit
+        """
+        self._dumper = dumper
+        self._queue = Queue.Queue(maxsize)
+        self._max_bytes = max_bytes
+        self._queued_bytes = 0
+        self._dequeued = threading.Condition()
+        self._error = None
+
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, ex_type, ex_value, traceback):
+        self.close()
+        if ex_type:
+            return False
+
+    def submit(self, method, *args, **kwargs):
+        """
+        Queues a call of a dumper method, blocks while the queue is full.
+
+        :param method:  name of the NixDumper method (string)
+        """
+        self._raise_error()
+
+        size = _nbytes(args) + _nbytes(kwargs)
+        with self._dequeued:
+            while self._is_full(size):
+                self._dequeued.wait()
+            self._queued_bytes += size
+
+        self._queue.put((method, args, kwargs, size))
+
+    def flush(self):
+        """
+        Waits until all queued calls are done.
+        """
+        self._raise_error()
+        self._queue.join()
+        self._raise_error()
+
+    def call(self, method, *args, **kwargs):
+        """
+        Calls a dumper method in this thread once all queued calls are done,
+        e.g. to read what has been written so far.
+
+        :param method:  name of the NixDumper method (string)
+        :return:        what the method returns
+        """
+        self.flush()
+        return getattr(self._dumper, method)(*args, **kwargs)
+
+    def _is_full(self, size):
+        if self._max_bytes is None or not self._queued_bytes:
+            return False
+        return self._queued_bytes + size > self._max_bytes
+
+    def close(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+        self._raise_error()
+
+    def _raise_error(self):
+        # an error of the writer thread is raised by every call
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        while True:
+            call = self._queue.get()
+            if call is None:
+                self._queue.task_done()
+                break
+
+            # calls after an error are skipped, the queue is still drained
+            method, args, kwargs, size = call
+            try:
+                if self._error is None:
+                    getattr(self._dumper, method)(*args, **kwargs)
+            except Exception as e:
+                self._error = e
+            finally:
+                self._done(size)
+                self._queue.task_done()
+
+        self._dumper.close()
+
+    def _done(self, size):
+        with self._dequeued:
+            self._queued_bytes -= size
+            self._dequeued.notify_all()
+
+
+def _nbytes(value):
+    # size of numpy arrays in arguments of a call, also within containers
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_nbytes(x) for x in value.values())
+    if isinstance(value, (list, tuple)):
+        return sum(_nbytes(x) for x in value)
+    return 0
@@ -0,0 +1,182 @@
+import os
+import shutil
+import tempfile
+import unittest
+import threading
+import numpy as np
+
+import reduced.simulation.discrimination.simulate as simulation
+from reduced.network.backend import nest, use_backend
+from reduced.simulation.checkpoint import Checkpoint
+from reduced.simulation.dump import NixDumper
+from reduced.simulation.utils import from_file
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+PROFILE_PATH = os.path.join(os.path.dirname(__file__), '..', 'simulation',
+                            'discrimination', 'profiles',
+                            '01_4x4_orthogonal.json')
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.checkpoint = Checkpoint(os.path.join(self.workdir, 'sim.ckpt.npz'))
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def test_saved(self):
+        for i in range(3):
+            self.checkpoint.save({'time_passed': (i + 1) * 100.0},
+                                 {'V_m': np.full(3, i, dtype=float)})
+
+        # the last save replaces the earlier ones
+        values, arrays = Checkpoint(self.checkpoint.path).load()
+        self.assertEqual(values['time_passed'], 300.0)
+        self.assertEqual(arrays['V_m'].tolist(), [2.0, 2.0, 2.0])
+        self.assertEqual(os.listdir(self.workdir), ['sim.ckpt.npz'])
+
+        self.checkpoint.remove()
+        self.assertFalse(self.checkpoint.exists)
+        self.assertEqual(os.listdir(self.workdir), [])
+
+
+class TestResume(unittest.TestCase):
+
+    simulation_time = 1000
+    # a quarter of the stimulus cycle, so that runs resume mid-sequence
+    phase = 250
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        use_backend('numpy')
+
+        self.profile = from_file(PROFILE_PATH)
+        self.profile['KERNEL']['backend'] = 'numpy'
+        self.profile['STIMULI']['movie_path'] = \
+            os.path.abspath(os.path.join(DATA_PATH, '5x5gklearn0.idlmov'))
+
+    def tearDown(self):
+        if 'Simulate' in vars(nest):
+            del nest.Simulate
+        shutil.rmtree(self.workdir)
+
+    def run_simulation(self, name, **kwargs):
+        path = os.path.join(self.workdir, name)
+        simulation.simulate(self.simulation_time, self.phase, self.profile,
+                            path, seed=3, **kwargs)
+        return path
+
+    def interrupt(self, calls):
+        # the run crashes in a given call of Simulate
+        simulate, counter = nest.Simulate, [0]
+
+        def crashing(duration):
+            counter[0] += 1
+            if counter[0] == calls:
+                raise RuntimeError('interrupted')
+            return simulate(duration)
+
+        nest.Simulate = crashing
+
+    def interrupted(self, calls=2, every=1, **kwargs):
+        # a run interrupted in a given call of Simulate, and its checkpoint
+        threads = threading.active_count()
+        self.interrupt(calls)
+        with self.assertRaises(RuntimeError):
+            self.run_simulation('resumed.h5', checkpoint_every=every, **kwargs)
+        del nest.Simulate
+
+        # the output is closed, no writer thread is left behind
+        self.assertEqual(threading.active_count(), threads)
+
+        return Checkpoint(os.path.join(self.workdir, 'resumed.h5.ckpt.npz'))
+
+    def check_resumed(self, calls=2, every=1, **kwargs):
+        expected = self.run_simulation('expected.h5')
+
+        checkpoint = self.interrupted(calls, every, **kwargs)
+        values, _ = checkpoint.load()
+        self.assertEqual(values['time_passed'],
+                         (calls - 1) // every * every * self.phase)
+
+        resumed = self.run_simulation('resumed.h5', checkpoint_every=every,
+                                      resume=True, **kwargs)
+        self.assertFalse(checkpoint.exists)
+
+        with NixDumper(expected, NixDumper.mode['readonly']) as f, \
+                NixDumper(resumed, NixDumper.mode['readonly']) as g:
+            input_ids = [int(x.name) for x in
+                         f.get_neurons_for_layer('simulation', 'input_layer')]
+
+            times, senders = f.get_spikes('simulation')
+            resumed_times, resumed_senders = g.get_spikes('simulation')
+
+            # the stimulus goes on where it was interrupted
+            found = np.in1d(senders, input_ids)
+            resumed_found = np.in1d(resumed_senders, input_ids)
+            self.assertTrue(np.array_equal(senders[found],
+                                           resumed_senders[resumed_found]))
+            self.assertTrue(np.allclose(times[found],
+                                        resumed_times[resumed_found]))
+
+            # synaptic currents and traces are not restored, the map layer
+            # and weights are close only
+            self.assertLess(abs(np.sum(~found) - np.sum(~resumed_found)),
+                            0.01 * np.sum(~found))
+
+            weights = f.get_weights('simulation').data
+            resumed_weights = g.get_weights('simulation').data
+            self.assertEqual(weights.shape, resumed_weights.shape)
+            self.assertTrue(np.array_equal(weights[:, :, :2],
+                                           resumed_weights[:, :, :2]))
+            self.assertTrue(np.allclose(weights, resumed_weights,
+                                        atol=0.01 * np.abs(weights).max()))
+
+    def test_resumed(self):
+        self.check_resumed()
+
+    def test_resumed_async(self):
+        # data of the checkpoint goes straight to the writer
+        self.check_resumed(async_dump=True)
+
+    def test_written_after_checkpoint(self):
+        # the phase after the checkpoint is written, and simulated again
+        self.check_resumed(calls=4, every=2)
+
+    def test_written_after_checkpoint_async(self):
+        self.check_resumed(calls=4, every=2, async_dump=True)
+
+    def test_no_copies(self):
+        checkpoint = self.interrupted(calls=3)
+        values, arrays = checkpoint.load()
+
+        with NixDumper(os.path.join(self.workdir, 'resumed.h5'),
+                       NixDumper.mode['readonly']) as f:
+            recorded = f.get_block_by_name('simulation').data_arrays
+            recorded = dict((x.name, np.array(x.data[:])) for x in recorded)
+
+        # the checkpoint points into the results instead of holding a copy
+        self.assertEqual([x for x in os.listdir(self.workdir) if 'ckpt' in x],
+                         ['resumed.h5.ckpt.npz'])
+        self.assertEqual(int(arrays['output/extent/spike times']),
+                         len(recorded['spike times']))
+        for name, data in recorded.items():
+            copies = [k for k, x in arrays.items() if x.shape == data.shape and
+                      np.array_equal(x, data)]
+            self.assertEqual(copies, [], name)
+
+        # the state does not grow with the simulated time
+        self.assertLess(sum(x.nbytes for x in arrays.values()),
+                        sum(x.nbytes for x in recorded.values()) / 4)
+
+    def test_resumed_spooled(self):
+        # data of the checkpoint goes to the spool files of the new run
+        spool = os.path.join(self.workdir, 'spool')
+        os.mkdir(spool)
+        self.check_resumed(spool=spool)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+import numpy as np
+
+from reduced.setup import ConvergenceSetup, ISGStraightSetup
+from reduced.simulation.convergence import WeightChange, Discriminability
+from reduced.simulation.convergence import Convergence, Criterion
+
+
+def responses(period, neurons, first=0, stimuli=4, node_ids=(1, 2, 3, 4)):
+    """
+    Spikes of the map layer for every period from first to first + stimuli:
+    period i is answered by neurons[i % len(neurons)] only.
+    """
+    times, senders = [], []
+    for i in range(first, first + stimuli):
+        times.append(i * period + 1.0)
+        senders.append(node_ids[neurons[i % len(neurons)]])
+
+    events = {'times': np.array(times), 'senders': np.array(senders)}
+    return [(events, list(node_ids))]
+
+
+class Fixed(Criterion):
+
+    name = 'fixed'
+
+    def __init__(self, results):
+        super(Fixed, self).__init__()
+        self.results = list(results)
+
+    def update(self, time, weights, responses):
+        self.value = self.results.pop(0)
+        return self.value
+
+
+class TestWeightChange(unittest.TestCase):
+
+    def test_window(self):
+        criterion = WeightChange(0.01, window=2)
+        weights = np.ones((2, 2))
+
+        self.assertFalse(criterion.update(0, [weights], []))
+        self.assertIsNone(criterion.value)
+
+        # a single small change is not enough
+        self.assertFalse(criterion.update(1, [weights * 1.001], []))
+        self.assertTrue(criterion.update(2, [weights * 1.002], []))
+
+        # a big change restarts the window
+        self.assertFalse(criterion.update(3, [weights * 2], []))
+        self.assertAlmostEqual(criterion.value, 0.998 / 1.002, places=5)
+        self.assertFalse(criterion.update(4, [weights * 2], []))
+        self.assertTrue(criterion.update(5, [weights * 2], []))
+
+    def test_replicas(self):
+        criterion = WeightChange(0.01, window=1)
+        criterion.update(0, [np.ones((2, 2)), np.ones((2, 2))], [])
+
+        # a change in any replica counts
+        self.assertFalse(criterion.update(1, [np.ones((2, 2)),
+                                              2 * np.ones((2, 2))], []))
+
+
+class TestDiscriminability(unittest.TestCase):
+
+    def test_score(self):
+        criterion = Discriminability(0.5, period=100.0)
+
+        distinct = responses(100.0, [0, 1, 2, 3])[0]
+        self.assertAlmostEqual(criterion.score(*distinct), 1.0)
+
+        same = responses(100.0, [0])[0]
+        self.assertAlmostEqual(criterion.score(*same), 0.0)
+
+        # no response to some stimulus
+        self.assertEqual(criterion.score({}, [1, 2, 3, 4]), 0.0)
+
+    def test_whole_cycle(self):
+        criterion = Discriminability(0.5, period=100.0)
+
+        self.assertTrue(criterion.update(400.0, [], responses(100.0, [0, 1, 2, 3])))
+        self.assertAlmostEqual(criterion.value, 1.0)
+
+    def test_phases_shorter_than_cycle(self):
+        criterion = Discriminability(0.5, period=100.0)
+
+        # every phase of 200 ms shows two of four stimuli
+        for i in range(0, 8, 2):
+            met = criterion.update((i + 2) * 100.0, [],
+                                   responses(100.0, [0, 1, 2, 3], first=i,
+                                             stimuli=2))
+            self.assertEqual(met, i >= 2)
+
+        self.assertAlmostEqual(criterion.value, 1.0)
+
+    def test_old_spikes_dropped(self):
+        criterion = Discriminability(0.5, period=100.0)
+
+        criterion.update(400.0, [], responses(100.0, [0, 1, 2, 3]))
+        self.assertFalse(criterion.update(800.0, [], responses(100.0, [0], first=4)))
+
+
+class TestConvergence(unittest.TestCase):
+
+    def test_min_time(self):
+        convergence = Convergence([Fixed([True, True])], min_time=200)
+
+        self.assertFalse(convergence.check(100, [], []))
+        self.assertFalse(convergence.converged)
+        self.assertTrue(convergence.check(200, [], []))
+        self.assertEqual(convergence.stop_time, 200)
+
+    def test_modes(self):
+        results = [(True, True), (False, True)]
+
+        convergence = Convergence([Fixed(x) for x in results], mode='any')
+        self.assertTrue(convergence.check(100, [], []))
+
+        convergence = Convergence([Fixed(x) for x in results], mode='all')
+        self.assertFalse(convergence.check(100, [], []))
+        self.assertTrue(convergence.check(200, [], []))
+
+        self.assertEqual(convergence.as_dict['stop_time'], 200)
+        self.assertEqual(convergence.as_dict['fixed'], True)
+
+    def test_no_criteria(self):
+        convergence = Convergence([])
+        self.assertFalse(convergence.check(100, [], []))
+        self.assertIsNone(convergence.as_dict['criteria'])
+
+    def test_from_setup(self):
+        setup = ConvergenceSetup(weight_epsilon=0.01, discriminability=0.5,
+                                 mode='all', min_time=1000)
+        input_setup = ISGStraightSetup(stimuli_duration=100, i_s_i=50)
+
+        convergence = Convergence.from_setup(setup, input_setup)
+        self.assertEqual([c.name for c in convergence.criteria],
+                         ['weight_change', 'discriminability'])
+        self.assertEqual(convergence.criteria[1].period, 150)
+        self.assertEqual(convergence.criteria[1].cycle, 600)
+        self.assertEqual((convergence.mode, convergence.min_time), ('all', 1000))
+
+
+if __name__ == '__main__':
+    unittest.main()
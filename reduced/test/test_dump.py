@@ -0,0 +1,290 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from reduced.simulation.dump import NixDumper
+
+
+class Layer(object):
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+
+class DumperTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.workdir, 'test.h5')
+
+        self.dumper = NixDumper(self.path, NixDumper.mode['overwrite'])
+        self.dumper.create_block('simulation', 3000, Layer([1, 2, 3]),
+                                 Layer([4, 5]))
+
+    def tearDown(self):
+        self.dumper.close()
+        shutil.rmtree(self.workdir)
+
+    def reopened(self):
+        # the same file, read from scratch
+        self.dumper.close()
+        self.dumper = NixDumper(self.path, NixDumper.mode['readonly'])
+        return self.dumper
+
+
+class TestSpikes(DumperTestCase):
+
+    times = [2500.0, 0.5, 1000.0, 999.9, 1000.0, 2000.0, 1000.1]
+    senders = [1, 4, 2, 1, 5, 4, 1]
+
+    def test_all(self):
+        self.dumper.dump_spikes('simulation', self.times, self.senders)
+        times, senders = self.reopened().get_spikes('simulation')
+
+        self.assertEqual(times.tolist(), sorted(self.times))
+        # the order of equal times is kept
+        self.assertEqual(senders.tolist(), [4, 1, 2, 5, 1, 4, 1])
+
+    def test_window_edges(self):
+        self.dumper.dump_spikes('simulation', self.times, self.senders)
+        f = self.reopened()
+
+        times, senders = f.get_spikes('simulation', 1000.0, 2000.0)
+        self.assertEqual(times.tolist(), [1000.0, 1000.0, 1000.1])
+        self.assertEqual(senders.tolist(), [2, 5, 1])
+
+        # within a single bin of the time index
+        times, _ = f.get_spikes('simulation', 999.0, 1000.0)
+        self.assertEqual(times.tolist(), [999.9])
+
+        # open and out of range windows
+        self.assertEqual(f.get_spikes('simulation', 2000.0)[0].tolist(),
+                         [2000.0, 2500.0])
+        self.assertEqual(f.get_spikes('simulation', t2=999.9)[0].tolist(), [0.5])
+        self.assertEqual(len(f.get_spikes('simulation', -100.0, 10000.0)[0]), 7)
+        self.assertEqual(len(f.get_spikes('simulation', 5000.0, 6000.0)[0]), 0)
+
+    def test_spiketrains(self):
+        self.dumper.dump_spikes('simulation', self.times, self.senders)
+        f = self.reopened()
+
+        self.assertEqual(f.get_spiketrain('simulation', 1).tolist(),
+                         [999.9, 1000.1, 2500.0])
+        self.assertEqual(f.get_spiketrain('simulation', 5).tolist(), [1000.0])
+
+        # unknown senders, below, between and above the known ones
+        for sender in (0, 3, 6):
+            self.assertEqual(len(f.get_spiketrain('simulation', sender)), 0)
+
+        # spike trains are rows of the spike table, times are not copied
+        arrays = f.get_block_by_name('simulation').data_arrays
+        float_arrays = [x.name for x in arrays
+                        if np.asarray(x.data[:]).dtype.kind == 'f']
+        self.assertEqual(float_arrays, ['spike times'])
+
+    def test_empty(self):
+        self.dumper.dump_spikes('simulation', [], [])
+        f = self.reopened()
+
+        self.assertEqual(len(f.get_spikes('simulation')[0]), 0)
+        self.assertEqual(len(f.get_spikes('simulation', 0.0, 1000.0)[1]), 0)
+        self.assertEqual(len(f.get_spiketrain('simulation', 1)), 0)
+
+
+class TestAnalogSignals(DumperTestCase):
+
+    values = np.arange(15, dtype=float).reshape(3, 5)
+
+    def test_sampled(self):
+        times = [10.0, 20.0, 30.0, 40.0, 50.0]
+        self.dumper.dump_analogsignals('simulation', 'v_input_layer',
+                                       [1, 2, 3], times, self.values)
+        f = self.reopened()
+
+        signals = f.get_data_arrays('simulation', 'analogsignals')[0]
+        self.assertEqual(signals.dimensions[1].sampling_interval, 10.0)
+
+        times, ids, values = f.get_analogsignals('simulation', 'v_input_layer')
+        self.assertTrue(np.allclose(times, [10.0, 20.0, 30.0, 40.0, 50.0]))
+        self.assertEqual(ids, [1, 2, 3])
+        self.assertTrue(np.array_equal(values, self.values))
+
+        # both ends of the window are included
+        times, _, values = f.get_analogsignals('simulation', 'v_input_layer',
+                                               20.0, 40.0)
+        self.assertTrue(np.allclose(times, [20.0, 30.0, 40.0]))
+        self.assertTrue(np.array_equal(values, self.values[:, 1:4]))
+
+    def test_range(self):
+        # decimated traces: minimum and maximum of every bucket
+        times = [0.0, 3.0, 4.0, 7.0, 8.0]
+        self.dumper.dump_analogsignals('simulation', 'v_map_layer',
+                                       [4, 5, 6], times, self.values)
+        f = self.reopened()
+
+        signals = f.get_data_arrays('simulation', 'analogsignals')[0]
+        self.assertEqual(list(signals.dimensions[1].ticks), times)
+
+        times, ids, values = f.get_analogsignals('simulation', 'v_map_layer',
+                                                 3.5, 7.0)
+        self.assertEqual(times.tolist(), [4.0, 7.0])
+        self.assertEqual(ids, [4, 5, 6])
+        self.assertTrue(np.array_equal(values, self.values[:, 2:4]))
+
+    def test_appended(self):
+        # chunks of a regular and of a decimated signal, as drained
+        for li, ri in ((0, 2), (2, 5)):
+            times = np.arange(li, ri) * 10.0
+            self.dumper.append_analogsignals('simulation', 'v_input_layer',
+                                             [1, 2, 3], times,
+                                             self.values[:, li:ri])
+            self.dumper.append_analogsignals('simulation', 'v_map_layer',
+                                             [4, 5, 6], times ** 2,
+                                             self.values[:, li:ri])
+        self.dumper.finish('simulation')
+        f = self.reopened()
+
+        times, _, values = f.get_analogsignals('simulation', 'v_input_layer')
+        self.assertTrue(np.allclose(times, [0.0, 10.0, 20.0, 30.0, 40.0]))
+        self.assertTrue(np.array_equal(values, self.values))
+
+        times, _, values = f.get_analogsignals('simulation', 'v_map_layer',
+                                               50.0, 1000.0)
+        self.assertEqual(times.tolist(), [100.0, 400.0, 900.0])
+        self.assertTrue(np.array_equal(values, self.values[:, 1:4]))
+
+    def test_resumed(self):
+        # appending goes on from a state taken earlier, later data is cut off
+        def append(li, ri):
+            times = np.arange(li, ri) * 10.0
+            self.dumper.append_spikes('simulation', times + 1.0, [1] * (ri - li))
+            self.dumper.append_analogsignals('simulation', 'v_input_layer',
+                                             [1, 2, 3], times,
+                                             self.values[:, li:ri])
+            self.dumper.append_weights('simulation', [1, 2], [4], li * 10.0,
+                                       self.values[:2, li:li + 1])
+
+        append(0, 2)
+        state = self.dumper.appended_state('simulation')
+        append(2, 4)
+
+        self.dumper.close()
+        self.dumper = NixDumper(self.path, NixDumper.mode['readwrite'])
+        self.dumper.resume_appending('simulation', state)
+        append(2, 5)
+        self.dumper.finish('simulation')
+        f = self.reopened()
+
+        times, senders = f.get_spikes('simulation')
+        self.assertEqual(times.tolist(), [1.0, 11.0, 21.0, 31.0, 41.0])
+        times, _, values = f.get_analogsignals('simulation', 'v_input_layer')
+        self.assertTrue(np.allclose(times, [0.0, 10.0, 20.0, 30.0, 40.0]))
+        self.assertTrue(np.array_equal(values, self.values))
+
+        weights = f.get_weights('simulation')
+        self.assertEqual(list(weights.dimensions[2].ticks), [0.0, 20.0])
+        self.assertTrue(np.array_equal(weights.data[:, 0, :],
+                                       self.values[:2, [0, 2]]))
+
+    def test_empty_window(self):
+        self.dumper.dump_analogsignals('simulation', 'v_input_layer',
+                                       [1, 2, 3], [1.0, 2.0, 3.0, 4.0, 5.0],
+                                       self.values)
+        times, _, values = self.reopened().get_analogsignals(
+            'simulation', 'v_input_layer', 10.0, 20.0)
+
+        self.assertEqual(len(times), 0)
+        self.assertEqual(values.shape, (3, 0))
+
+
+class TestBlockIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.dumper = NixDumper(os.path.join(self.workdir, 'test.h5'),
+                                NixDumper.mode['overwrite'])
+
+    def tearDown(self):
+        self.dumper.close()
+        shutil.rmtree(self.workdir)
+
+    @staticmethod
+    def linear_neuron(block, name):
+        return block.find_sources(lambda x: x.name == str(name))[0]
+
+    @staticmethod
+    def linear_layer(block, name):
+        layer = block.find_sources(lambda x: x.name == name)[0]
+        sources = layer.find_sources(lambda x: x.type == 'neuron')
+        return sorted(sources, key=lambda x: int(x.name))
+
+    def test_single(self):
+        f = self.dumper
+        f.create_block('simulation', 1000, Layer([3, 1, 2]), Layer([5, 4]))
+        block = f.get_block_by_name('simulation')
+
+        for name in range(1, 6):
+            self.assertEqual(f.get_neuron_by_name('simulation', name).name,
+                             self.linear_neuron(block, name).name)
+
+        for name in ('input_layer', 'map_layer'):
+            neurons = f.get_neurons_for_layer('simulation', name)
+            self.assertEqual([x.name for x in neurons],
+                             [x.name for x in self.linear_layer(block, name)])
+
+        self.assertEqual([x.name for x in f.get_neurons_for_layer(
+            'simulation', 'input_layer')], ['1', '2', '3'])
+
+    def test_ensemble(self):
+        f = self.dumper
+        f.create_ensemble_block('simulation', 1000, [
+            (Layer([1, 2]), Layer([3])), (Layer([4, 5]), Layer([6]))])
+        block = f.get_block_by_name('simulation')
+
+        # layers of the first replica are found by name
+        for name in ('input_layer', 'map_layer'):
+            neurons = f.get_neurons_for_layer('simulation', name)
+            self.assertEqual([x.name for x in neurons],
+                             [x.name for x in self.linear_layer(block, name)])
+
+        self.assertEqual([x.name for x in f.get_neurons_for_layer(
+            'simulation', 'input_layer')], ['1', '2'])
+        self.assertEqual(f.index('simulation').sources['replica_1'].type,
+                         'replica')
+
+        # neurons of other replicas are found as well
+        self.assertEqual(f.get_neuron_by_name('simulation', 6).name,
+                         self.linear_neuron(block, 6).name)
+
+    def test_interleaved(self):
+        f = self.dumper
+        f.create_block('simulation', 1000, Layer([1, 2]), Layer([3]))
+        block = f.get_block_by_name('simulation')
+
+        # the index is built before any data array exists
+        self.assertEqual(f.get_data_arrays('simulation', 'analogsignal'), [])
+
+        f.dump_analogsignal('simulation', 1, [0.0, 1.0], [-70.0, -65.0])
+        f.dump_spikes('simulation', [1.0, 2.0], [1, 3])
+        f.dump_analogsignal('simulation', 3, [0.0, 1.0], [-70.0, -60.0])
+
+        linear = lambda filt: sorted(x.name for x in block.data_arrays
+                                     if filt(x))
+
+        arrays = f.get_data_arrays('simulation', 'analogsignal')
+        self.assertEqual(sorted(x.name for x in arrays),
+                         linear(lambda x: x.type == 'analogsignal'))
+
+        arrays = f.get_data_arrays('simulation', source_name=3)
+        self.assertEqual([x.name for x in arrays], ['3_analogsignal'])
+        self.assertEqual(f.get_data_arrays('simulation', source_name=2), [])
+
+        self.assertEqual(sorted(x.name for x in f.get_data_arrays('simulation')),
+                         linear(lambda x: True))
+        self.assertEqual(f.get_spikes('simulation')[1].tolist(), [1, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import unittest
+import numpy as np
+
+import reduced.engine as engine
+from reduced.network.backend import nest, use_backend
+from reduced.network.layer import InputLayer
+from reduced.network.monitors import SpikeDetector
+from reduced.setup import ISGStraightSetup, NeuronSetup
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+
+
+class TestEngine(unittest.TestCase):
+
+    def setUp(self):
+        engine.ResetKernel()
+
+    def test_psp_peak(self):
+        neurons = engine.Create('iaf_psc_alpha', 2)
+        dc = engine.Create('dc_generator', 1, {'amplitude': 3000.0, 'stop': 3.0})
+        engine.Connect(dc, neurons[:1])
+        engine.Connect(neurons[:1], neurons[1:], syn_spec={'weight': 100.0})
+
+        multimeter = engine.Create('multimeter', 1, {'record_from': ['V_m'],
+                                                     'interval': 0.1})
+        engine.Connect(multimeter, neurons[1:])
+        engine.Simulate(50.0)
+
+        # peak of an alpha PSP of 100 pA for default iaf_psc_alpha
+        events = engine.GetStatus(multimeter, 'events')[0]
+        self.assertAlmostEqual(events['V_m'].max() + 70.0, 1.3001, places=3)
+
+    def test_weights_roundtrip(self):
+        neurons = engine.Create('iaf_psc_exp', 3)
+        engine.Connect(neurons, neurons, 'all_to_all',
+                       {'weight': np.arange(9.0).reshape(3, 3)})
+
+        connections = engine.GetConnections(neurons[:1])
+        weights = engine.GetStatus(connections, 'weight')
+        self.assertEqual(weights, (0.0, 3.0, 6.0))
+
+        engine.SetStatus(connections, [{'weight': 1.0}] * 3)
+        self.assertEqual(engine.GetStatus(connections, 'weight'), (1.0,) * 3)
+
+
+class TestNumpyBackend(unittest.TestCase):
+
+    def setUp(self):
+        use_backend('numpy')
+        nest.ResetKernel()
+
+    def test_input_spiking(self):
+        input_setup = ISGStraightSetup(**{
+            'stimuli_duration': 50.0,
+            'i_s_i': 50.0,
+            'movie_path': os.path.join(DATA_PATH, '5x5gklearn0.idlmov')
+        })
+        neuron_setup = NeuronSetup(model='pixel_iaf_psc_exp')
+
+        input_layer = InputLayer(input_setup, neuron_setup, 5, 5)
+        detector = SpikeDetector(input_layer.nodes)
+        nest.Simulate(2000)
+
+        senders = detector.senders
+        spiking = [x for x in input_layer.nodes if np.sum(senders == x) > 2]
+
+        # the last column of the movie is never lit
+        self.assertEqual(len(spiking), 20)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+import reduced.simulation.discrimination.simulate as simulation
+from reduced.network.backend import use_backend
+from reduced.simulation.discrimination.analyse import replica_weights
+from reduced.simulation.dump import NixDumper
+from reduced.simulation.utils import from_file
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+PROFILE_PATH = os.path.join(os.path.dirname(__file__), '..', 'simulation',
+                            'discrimination', 'profiles',
+                            '01_4x4_orthogonal.json')
+
+
+class TestEnsemble(unittest.TestCase):
+
+    simulation_time = 500
+    phase = 250
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        use_backend('numpy')
+
+        self.profile = from_file(PROFILE_PATH)
+        self.profile['KERNEL']['backend'] = 'numpy'
+        self.profile['STIMULI']['movie_path'] = \
+            os.path.abspath(os.path.join(DATA_PATH, '5x5gklearn0.idlmov'))
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def run_simulation(self, name, replicas):
+        path = os.path.join(self.workdir, name)
+        simulation.simulate(self.simulation_time, self.phase, self.profile,
+                            path, seed=3, replicas=replicas)
+        return NixDumper(path, NixDumper.mode['readonly'])
+
+    def test_replicas(self):
+        with self.run_simulation('single.h5', 1) as f:
+            single = np.array(replica_weights(f.get_weights('simulation')))
+
+        with self.run_simulation('ensemble.h5', 2) as f:
+            block = f.get_block_by_name('simulation')
+            replicas = [x for x in block.sources if x.type == 'replica']
+            self.assertEqual([x.name for x in replicas],
+                             ['replica_0', 'replica_1'])
+
+            # separate populations, both of them recorded
+            ids = [set(int(x.name) for x in
+                       r.find_sources(lambda x: x.type == 'neuron'))
+                   for r in replicas]
+            self.assertEqual(len(ids[0]), len(ids[1]))
+            self.assertFalse(ids[0] & ids[1])
+
+            _, senders = f.get_spikes('simulation')
+            for replica_ids in ids:
+                self.assertTrue(np.in1d(senders, list(replica_ids)).any())
+
+            weights = f.get_weights('simulation')
+            self.assertEqual(weights.data.shape, (2,) + single.shape)
+            first, second = [np.array(replica_weights(weights, i))
+                             for i in range(2)]
+
+        # replicas are split along the leading axis, and the first one is
+        # drawn as a single network with the same seed
+        self.assertEqual(first.shape, single.shape)
+        self.assertTrue(np.array_equal(first[:, :, 0], single[:, :, 0]))
+
+        # initial weights of replicas are drawn independently
+        self.assertFalse(np.allclose(first[:, :, 0], second[:, :, 0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+
+import simplejson as json
+
+import reduced.simulation.instrumentation as instrumentation
+from reduced.simulation.instrumentation import Instrumentation
+
+
+class Clock(object):
+    """
+    A replacement of the time module, advanced by hand.
+    """
+
+    def __init__(self):
+        self.now = 100.0
+
+    def time(self):
+        return self.now
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+
+        self.clock = Clock()
+        self._time, instrumentation.time = instrumentation.time, self.clock
+
+    def tearDown(self):
+        instrumentation.time = self._time
+        shutil.rmtree(self.workdir)
+
+    def stage(self, stats, name, elapsed):
+        with stats.stage(name):
+            self.clock.now += elapsed
+
+    def simulated(self, progress=None):
+        stats = Instrumentation(progress)
+        self.stage(stats, 'build', 1.0)
+
+        for i in range(2):
+            stats.start_phase(i * 100.0)
+            self.stage(stats, 'simulate', 2.0)
+            self.stage(stats, 'dump', 0.5)
+            self.stage(stats, 'simulate', 2.0)
+            stats.end_phase(events=100 * (i + 1), weights=i)
+
+        stats.values['replicas'] = 2
+        return stats
+
+    def test_stages(self):
+        stats = self.simulated()
+
+        # totals include times outside of phases
+        self.assertEqual(stats.stages, {'build': 1.0, 'simulate': 8.0,
+                                        'dump': 1.0})
+
+        # stages repeated in a phase are added up
+        phase = stats.phases[1]
+        self.assertEqual(phase['time'], 100.0)
+        self.assertEqual(phase['simulate'], 4.0)
+        self.assertEqual(phase['dump'], 0.5)
+        self.assertNotIn('build', phase)
+        self.assertEqual(phase['events'], 200)
+        self.assertEqual(phase['events_per_s'], 50.0)
+        self.assertEqual(phase['weights'], 1)
+
+    def test_failed_stage(self):
+        # time is counted also if a stage raises
+        stats = Instrumentation()
+        with self.assertRaises(RuntimeError):
+            with stats.stage('simulate'):
+                self.clock.now += 3.0
+                raise RuntimeError()
+
+        self.assertEqual(stats.stages['simulate'], 3.0)
+
+    def test_no_events(self):
+        stats = Instrumentation()
+        stats.start_phase(0.0)
+        phase = stats.end_phase()
+
+        self.assertEqual(phase['events'], 0)
+        self.assertIsNone(phase['events_per_s'])
+        self.assertIsNone(stats.as_dict['events_per_s'])
+
+    def test_saved(self):
+        stats = self.simulated()
+        path = os.path.join(self.workdir, 'sim.h5.stats.json')
+        stats.save(path)
+
+        with open(path) as f:
+            saved = json.load(f)
+
+        self.assertEqual(sorted(saved.keys()), ['phases', 'totals'])
+        self.assertEqual(saved['phases'], stats.phases)
+
+        totals = saved['totals']
+        self.assertEqual(totals['replicas'], 2)
+        self.assertEqual(totals['phases'], 2)
+        self.assertEqual(totals['events'], 300)
+        self.assertEqual(totals['events_per_s'], 37.5)
+        self.assertEqual(totals['build_time'], 1.0)
+        self.assertEqual(totals['simulate_time'], 8.0)
+        self.assertEqual(totals['dump_time'], 1.0)
+        self.assertEqual(totals['elapsed'], 10.0)
+        self.assertGreater(totals['peak_rss'], 0)
+
+    def test_progress(self):
+        progress = StringIO()
+        stats = self.simulated(progress)
+        stats.finish()
+
+        lines = progress.getvalue().split('\r')
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[2].startswith(
+            'phase 2, 100 ms: simulate 4.00 s, 50 events/s'))
+        self.assertTrue(lines[2].endswith('\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,371 @@
+import unittest
+import numpy as np
+
+from reduced.network import connectivity
+from reduced.network.backend import nest, use_backend
+from reduced.network.layer import MapLayer
+from reduced.network.monitors import LayerVoltageMonitor, decimate_min_max
+from reduced.network.neuron import Neuron
+from reduced.network.registry import registry
+from reduced.network.sinks import RingBufferSink
+from reduced.network.synapse import SynapseTable, ConnectionStore
+from reduced.setup import NeuronSetup, RecordingSetup
+
+
+class TestIdentity(unittest.TestCase):
+
+    def setUp(self):
+        use_backend('stub')
+        nest.ResetKernel()
+
+    def test_neuron_views(self):
+        layer = MapLayer(NeuronSetup(model='iaf_psc_alpha'), 2, 2)
+        self.assertEqual(layer[0], Neuron.view(layer.nodes[0]))
+        self.assertNotEqual(layer[0], layer[1])
+        self.assertEqual(len(set([layer[0], layer[0], layer[1]])), 2)
+
+    def test_layers(self):
+        layer_a = MapLayer(NeuronSetup(model='iaf_psc_alpha'), 2, 2)
+        layer_b = MapLayer(NeuronSetup(model='iaf_psc_alpha'), 2, 2)
+
+        # layers are compared by identity
+        self.assertNotEqual(layer_a, layer_b)
+        self.assertEqual({layer_a: 1, layer_b: 2}[layer_a], 1)
+
+
+class TestRegistry(unittest.TestCase):
+
+    def setUp(self):
+        use_backend('stub')
+        nest.ResetKernel()
+
+    def test_cleared_on_reset(self):
+        MapLayer(NeuronSetup(model='iaf_psc_alpha'), 2, 2)
+        self.assertEqual(len(registry), 4)
+
+        version = registry.connections_version
+        nest.ResetKernel()
+        self.assertEqual(len(registry), 0)
+        self.assertTrue(registry.connections_version > version)
+
+
+class TestConnectionStoreCache(unittest.TestCase):
+
+    def setUp(self):
+        use_backend('numpy')
+        nest.ResetKernel()
+
+        self.a = MapLayer(NeuronSetup(model='iaf_psc_alpha'), 2, 2)
+        self.b = MapLayer(NeuronSetup(model='iaf_psc_alpha'), 2, 2)
+
+    def test_raw_connect(self):
+        self.assertEqual(len(self.a.connection_store), 0)
+
+        # connections made without the network objects
+        nest.Connect(self.a.nodes, self.b.nodes)
+        self.assertEqual(len(self.a.connection_store), 16)
+
+        nest.DivergentConnect([self.a.nodes[0]], self.a.nodes[1:])
+        self.assertEqual(len(self.a.connection_store), 19)
+
+    def test_connect_to(self):
+        self.assertEqual(len(self.a.connection_store), 0)
+
+        self.a.connect_to(self.b)
+        self.assertEqual(len(self.a.connection_store), 16)
+
+
+class TestConnectivity(unittest.TestCase):
+
+    def setUp(self):
+        np.random.seed(42)
+
+    @staticmethod
+    def pairs(sources, targets):
+        return sorted(zip(sources.tolist(), targets.tolist()))
+
+    def test_fixed_indegree(self):
+        sources, targets = connectivity.fixed_indegree(5, 7, 3)
+
+        self.assertEqual(np.bincount(targets).tolist(), [3] * 7)
+        for target in range(7):
+            chosen = sources[targets == target]
+            self.assertEqual(len(set(chosen)), 3)
+            self.assertTrue(chosen.min() >= 0 and chosen.max() < 5)
+
+        self.assertRaises(ValueError, connectivity.fixed_indegree, 2, 3, 3)
+
+    def test_fixed_outdegree(self):
+        sources, targets = connectivity.fixed_outdegree(7, 5, 5)
+
+        self.assertEqual(np.bincount(sources).tolist(), [5] * 7)
+        for source in range(7):
+            self.assertEqual(sorted(targets[sources == source]), range(5))
+
+        self.assertRaises(ValueError, connectivity.fixed_outdegree, 2, 3, 0)
+
+    def test_neighbourhood(self):
+        x_dim, y_dim = 3, 4
+        sources, targets = connectivity.neighbourhood(x_dim, y_dim, radius=1)
+
+        expected = []
+        for x in range(x_dim):
+            for y in range(y_dim):
+                for nx in range(max(x - 1, 0), min(x + 2, x_dim)):
+                    for ny in range(max(y - 1, 0), min(y + 2, y_dim)):
+                        if (nx, ny) != (x, y):
+                            expected.append((x * y_dim + y, nx * y_dim + ny))
+
+        self.assertEqual(self.pairs(sources, targets), sorted(expected))
+
+        # corners, borders and inner neurons
+        self.assertEqual(np.bincount(sources).tolist(),
+                         [3, 5, 5, 3, 5, 8, 8, 5, 3, 5, 5, 3])
+
+    def test_neighbourhood_mask(self):
+        # the upper neighbour only: (x, y) connects to (x - 1, y)
+        mask = np.zeros((3, 3), dtype=bool)
+        mask[0, 1] = True
+
+        sources, targets = connectivity.neighbourhood(3, 4, mask=mask)
+        self.assertEqual(self.pairs(sources, targets),
+                         [(i, i - 4) for i in range(4, 12)])
+
+        sources, targets = connectivity.neighbourhood(3, 4, mask=mask,
+                                                      periodic=True)
+        self.assertEqual(self.pairs(sources, targets),
+                         sorted((i, (i - 4) % 12) for i in range(12)))
+
+        self.assertRaises(ValueError, connectivity.neighbourhood, 3, 3,
+                          mask=np.ones((2, 3), dtype=bool))
+
+    def test_neighbourhood_periodic(self):
+        sources, targets = connectivity.neighbourhood(4, 4, periodic=True)
+        self.assertEqual(np.bincount(sources).tolist(), [8] * 16)
+
+        # offsets wrapping to the same neuron connect it once, never itself
+        sources, targets = connectivity.neighbourhood(2, 2, periodic=True)
+        self.assertEqual(np.bincount(sources).tolist(), [3] * 4)
+        self.assertFalse(np.any(sources == targets))
+        self.assertEqual(len(set(self.pairs(sources, targets))), 12)
+
+
+class TestLayerNeighbourhood(unittest.TestCase):
+
+    def setUp(self):
+        use_backend('stub')
+        nest.ResetKernel()
+
+        self.layer = MapLayer(NeuronSetup(model='iaf_psc_alpha'), 3, 4)
+
+    def test_index(self):
+        centres, neighbours = self.layer.neighbourhood_index(radius=1)
+        expected = connectivity.neighbourhood(3, 4, radius=1)
+
+        self.assertTrue(np.array_equal(centres, expected[0]))
+        self.assertTrue(np.array_equal(neighbours, expected[1]))
+
+        # computed once per set of parameters
+        self.assertTrue(self.layer.neighbourhood_index(radius=1)[0] is centres)
+        self.assertFalse(self.layer.neighbourhood_index(
+            radius=1, periodic=True)[0] is centres)
+
+    def test_neighbours(self):
+        ids, neighbours = self.layer.neighbours(radius=1)
+        grid = self.layer.grid
+
+        # neighbours of the neuron (1, 1)
+        self.assertEqual(sorted(neighbours[ids == grid[1, 1]]),
+                         sorted(np.delete(grid[0:3, 0:3].ravel(), 4)))
+
+    def test_connect(self):
+        self.layer.connect_to(self.layer, 'neighbourhood', 2.0, radius=1)
+
+        table = self.layer.synapse_table
+        pairs = zip(*self.layer.neighbours(radius=1))
+        self.assertEqual(sorted(zip(table['source'], table['target'])),
+                         sorted(pairs))
+        self.assertTrue(np.all(table['weight'] == 2.0))
+
+        other = MapLayer(NeuronSetup(model='iaf_psc_alpha'), 4, 3)
+        self.assertRaises(ValueError, self.layer.connect_to, other,
+                          'neighbourhood')
+
+
+class TestConnectionStore(unittest.TestCase):
+
+    def setUp(self):
+        use_backend('numpy')
+        nest.ResetKernel()
+
+        self.a = MapLayer(NeuronSetup(model='iaf_psc_alpha'), 2, 2)
+        self.b = MapLayer(NeuronSetup(model='iaf_psc_alpha'), 2, 3)
+
+        # distinct weights, (sources x targets)
+        self.weights = np.arange(24, dtype=float).reshape(4, 6) + 1.0
+        self.a.connect_to(self.b, 'all_to_all', self.weights)
+        self.store = self.a.connection_store
+
+    def test_table(self):
+        table = self.store.table
+        self.assertEqual(len(table), 24)
+
+        keys = zip(table['source'], table['target'])
+        self.assertEqual(keys, sorted(keys))
+        self.assertEqual(table.sources.tolist(), self.a.nodes)
+        self.assertEqual(table.targets.tolist(), self.b.nodes)
+
+        # sources are rows, targets are columns
+        self.assertTrue(np.array_equal(table.as_matrix(), self.weights))
+        self.assertTrue(np.array_equal(self.a.weights, self.weights))
+
+    def test_slices(self):
+        connection_pairs = lambda connections: \
+            sorted((int(x[0]), int(x[1])) for x in connections)
+        table_pairs = lambda table: \
+            sorted(zip(table['source'].tolist(), table['target'].tolist()))
+
+        for source in self.a.nodes:
+            self.assertEqual(
+                table_pairs(self.store.for_source(source)),
+                connection_pairs(nest.GetConnections(source=[source])))
+
+        for target in self.b.nodes:
+            expected = [x for x in nest.GetConnections(target=[target])
+                        if x[0] in self.a.nodes]
+            self.assertEqual(table_pairs(self.store.for_target(target)),
+                             connection_pairs(expected))
+
+        # unknown nodes have no rows
+        self.assertEqual(len(self.store.source_rows([self.b.nodes[0], 1000])), 0)
+        self.assertEqual(len(self.store.target_rows(self.a.nodes)), 0)
+
+    def test_as_matrix(self):
+        sources, targets = self.a.nodes, self.b.nodes
+
+        matrix = self.store.as_matrix(sources, targets)
+        self.assertTrue(np.array_equal(matrix, self.weights))
+
+        # in the order of given IDs, both sides sliced
+        matrix = self.store.as_matrix(sources[::-1], targets[1:3])
+        self.assertTrue(np.array_equal(matrix, self.weights[::-1, 1:3]))
+        matrix = self.store.as_matrix(sources[:1], targets[::-1])
+        self.assertTrue(np.array_equal(matrix, self.weights[:1, ::-1]))
+
+        # missing connections are zeros
+        matrix = self.store.as_matrix(sources + self.b.nodes[:1], targets[:2])
+        self.assertTrue(np.array_equal(matrix[-1], [0.0, 0.0]))
+
+        delays = self.store.as_matrix(sources, targets, field='delay')
+        self.assertTrue(np.all(delays == 1.0))
+
+    def test_assign(self):
+        weights = self.weights[::-1] * 10
+        self.a.set_weights(weights, self.b.nodes)
+
+        # the cached store sees new weights
+        self.assertTrue(np.array_equal(self.a.connection_store.as_matrix(),
+                                       weights))
+
+        self.assertRaises(ValueError, self.store.assign, np.zeros((2, 2)))
+
+    def test_refreshed_and_apply(self):
+        table = SynapseTable.for_sources(self.a.nodes)
+        table['weight'] = np.zeros(len(table))
+        table.apply()
+
+        store = ConnectionStore(table).refreshed()
+        self.assertTrue(np.all(store.as_matrix() == 0.0))
+        self.assertTrue(np.array_equal(self.store.refreshed().as_matrix(),
+                                       np.zeros((4, 6))))
+
+        self.assertRaises(KeyError, table.__setitem__, 'source', 0)
+
+    def test_unicode_fields(self):
+        # e.g. field names read from a JSON profile
+        table = SynapseTable.for_sources(self.a.nodes)
+        self.assertTrue(np.array_equal(table[u'weight'], table['weight']))
+
+        table['weight'] = np.ones(len(table))
+        table.apply(u'weight')
+        self.assertTrue(np.all(self.store.refreshed().as_matrix() == 1.0))
+
+
+class TestDecimation(unittest.TestCase):
+
+    def test_min_max(self):
+        times = np.arange(6) * 0.5
+        values = np.array([[3.0, 1.0, 2.0, 0.0, 5.0, 4.0],
+                           [1.0, 1.0, 1.0, 2.0, 2.0, 2.0]])
+
+        d_times, d_values = decimate_min_max(times, values, 3)
+        self.assertEqual(d_times.tolist(), [0.0, 1.0, 1.5, 2.5])
+        self.assertEqual(d_values.tolist(), [[1.0, 3.0, 0.0, 5.0],
+                                             [1.0, 1.0, 2.0, 2.0]])
+
+
+class TestVoltageDecimation(unittest.TestCase):
+
+    def setUp(self):
+        use_backend('numpy')
+        nest.ResetKernel()
+
+        setup = NeuronSetup(model='iaf_psc_alpha', para_dict={'I_e': 300.0})
+        layer = MapLayer(setup, 1, 2)
+
+        # decimated while draining, and all at once
+        self.drained = LayerVoltageMonitor(layer.nodes, RingBufferSink(), 1.0, 4)
+        self.whole = LayerVoltageMonitor(layer.nodes, None, 1.0, 4)
+
+    def assertSameTraces(self):
+        times, values = self.drained.read()
+        whole_times, whole_values = self.whole.read()
+
+        self.assertEqual(times.tolist(), whole_times.tolist())
+        self.assertTrue(np.allclose(values, whole_values))
+
+    def test_carry_over(self):
+        # chunks of 10 samples, 2 of every chunk are carried over
+        for _ in range(3):
+            nest.Simulate(10)
+            self.drained.drain()
+            self.assertSameTraces()
+
+        # 7 buckets drained, the rest of 2 samples is not
+        drained_times = np.unique(self.drained.sink.events['times'])
+        self.assertEqual(len(drained_times), 14)
+        self.assertEqual(len(self.drained.read()[0]), 16)
+
+    def test_not_drained(self):
+        # the carry-over and undrained samples come at the same rate
+        nest.Simulate(10)
+        self.drained.drain()
+        nest.Simulate(7)
+
+        self.assertSameTraces()
+        self.assertEqual(len(self.drained.read()[0]), 9)
+
+
+class TestRecordingSetup(unittest.TestCase):
+
+    def test_select(self):
+        nodes = range(11, 21)
+
+        # evenly spread, both ends included
+        setup = RecordingSetup(fraction=0.5)
+        self.assertEqual(setup.select(nodes), [11, 13, 15, 18, 20])
+
+        self.assertEqual(RecordingSetup().select(nodes), nodes)
+        self.assertEqual(RecordingSetup(fraction=0.01).select(nodes), [])
+        self.assertEqual(RecordingSetup(fraction=0.5).select([7]), [7])
+
+    def test_valid(self):
+        self.assertTrue(RecordingSetup(decimation=2).is_valid)
+        self.assertFalse(RecordingSetup(decimation=1).is_valid)
+        self.assertFalse(RecordingSetup(fraction=0.0).is_valid)
+        self.assertEqual(RecordingSetup(interval=0.5, decimation=4)
+                         .effective_interval, 1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
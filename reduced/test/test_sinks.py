@@ -0,0 +1,149 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+from reduced.network.backend import nest, use_backend
+from reduced.network.layer import MapLayer
+from reduced.network.monitors import SpikeDetector
+from reduced.network.sinks import FileSink, RingBufferSink, CallbackSink
+from reduced.setup import NeuronSetup
+
+
+def chunk(start, n):
+    return {'times': np.arange(start, start + n, dtype=float),
+            'senders': np.arange(n)}
+
+
+class TestFileSink(unittest.TestCase):
+
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.workdir, 'events.npy')
+
+    def tearDown(self):
+        shutil.rmtree(self.workdir)
+
+    def test_round_trip(self):
+        sink = FileSink(self.path)
+        self.assertEqual(sink.events, {})
+
+        sink.append(chunk(0, 3))
+        sink.append({})
+        sink.append(chunk(3, 2))
+
+        events = FileSink(self.path, sink.size).events
+        self.assertEqual(events['times'].tolist(), [0.0, 1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(events['senders'].tolist(), [0, 1, 2, 0, 1])
+
+    def test_snapshots(self):
+        # multidimensional values are kept as they are
+        sink = FileSink(self.path)
+        for i in range(2):
+            sink.append({'times': [i], 'weights': np.full((1, 2, 3), i, 'f4')})
+
+        weights = sink.events['weights']
+        self.assertEqual(weights.shape, (2, 2, 3))
+        self.assertEqual(weights.dtype, np.float32)
+        self.assertEqual(weights[:, 0, 0].tolist(), [0.0, 1.0])
+
+    def test_truncated(self):
+        # chunks appended after a given size are dropped
+        sink = FileSink(self.path)
+        sink.append(chunk(0, 3))
+        size = sink.size
+        sink.append(chunk(3, 2))
+
+        sink = FileSink(self.path, size)
+        self.assertEqual(sink.events['times'].tolist(), [0.0, 1.0, 2.0])
+
+        sink = FileSink(self.path)
+        self.assertEqual(sink.size, 0)
+        self.assertEqual(sink.events, {})
+
+
+class TestRingBufferSink(unittest.TestCase):
+
+    def test_capacity(self):
+        sink = RingBufferSink(2)
+        for i in range(3):
+            sink.append(chunk(10 * i, 2))
+
+        # the oldest chunk is evicted
+        self.assertEqual(len(sink), 2)
+        self.assertEqual(sink.events['times'].tolist(), [10.0, 11.0, 20.0, 21.0])
+
+    def test_unbounded(self):
+        sink = RingBufferSink()
+        self.assertEqual(sink.events, {})
+
+        for i in range(3):
+            sink.append(chunk(10 * i, 1))
+        self.assertEqual(sink.events['times'].tolist(), [0.0, 10.0, 20.0])
+
+    def test_copied(self):
+        # chunks are copied, the recorder may reuse its arrays
+        events = chunk(0, 2)
+        sink = RingBufferSink()
+        sink.append(events)
+        events['times'][:] = -1
+
+        self.assertEqual(sink.events['times'].tolist(), [0.0, 1.0])
+
+
+class TestCallbackSink(unittest.TestCase):
+
+    def test_dispatch(self):
+        received = []
+        sink = CallbackSink(received.append)
+
+        chunks = [chunk(0, 2), chunk(2, 1)]
+        for events in chunks:
+            sink.append(events)
+
+        # every chunk is passed on as it is, nothing is retained
+        self.assertEqual(len(received), 2)
+        self.assertTrue(all(x is y for x, y in zip(received, chunks)))
+        self.assertEqual(sink.events, {})
+
+
+class TestDrain(unittest.TestCase):
+
+    def setUp(self):
+        use_backend('numpy')
+        nest.ResetKernel()
+
+        setup = NeuronSetup(model='iaf_psc_alpha', para_dict={'I_e': 500.0})
+        layer = MapLayer(setup, 2, 2)
+
+        self.received = []
+        self.drained = SpikeDetector(layer.nodes,
+                                     CallbackSink(self.received.append))
+        self.whole = SpikeDetector(layer.nodes)
+
+    def test_drain(self):
+        for _ in range(3):
+            nest.Simulate(100)
+            self.drained.drain()
+
+            # the recorder is empty after every drain
+            self.assertEqual(
+                nest.GetStatus([self.drained.id], 'n_events')[0], 0)
+
+        # every event is handed over once
+        self.assertEqual(len(self.received), 3)
+        self.assertTrue(all(len(x['times']) for x in self.received))
+
+        times = np.concatenate([x['times'] for x in self.received])
+        senders = np.concatenate([x['senders'] for x in self.received])
+        self.assertEqual(times.tolist(), self.whole.times.tolist())
+        self.assertEqual(senders.tolist(), self.whole.senders.tolist())
+
+    def test_no_sink(self):
+        with self.assertRaises(ValueError):
+            self.whole.drain()
+
+
+if __name__ == '__main__':
+    unittest.main()
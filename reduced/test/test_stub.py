@@ -0,0 +1,95 @@
+import os
+import unittest
+import numpy as np
+
+import reduced.engine as engine
+import reduced.engine.stub as stub
+from reduced.network.backend import nest, use_backend
+from reduced.network.layer import InputLayer, MapLayer
+from reduced.network.monitors import SpikeDetector, LayerVoltageMonitor
+from reduced.network.monitors import WeightRecorder
+from reduced.setup import ISGStraightSetup, NeuronSetup
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data')
+
+
+class TestStub(unittest.TestCase):
+
+    def setUp(self):
+        use_backend('stub')
+        nest.ResetKernel()
+        stub.reset_calls()
+
+        input_setup = ISGStraightSetup(**{
+            'stimuli_duration': 50.0,
+            'i_s_i': 50.0,
+            'movie_path': os.path.join(DATA_PATH, '5x5gklearn0.idlmov')
+        })
+        neuron_setup = NeuronSetup(model='pixel_iaf_psc_exp')
+
+        self.input_layer = InputLayer(input_setup, neuron_setup, 5, 5)
+        self.map_layer = MapLayer(NeuronSetup(model='iaf_psc_alpha'), 5, 5)
+        self.input_layer.connect_to(self.map_layer)
+
+    def test_regular_firing(self):
+        detector = SpikeDetector(self.map_layer.nodes)
+        monitor = LayerVoltageMonitor(self.map_layer.nodes[:3], interval=1.0)
+        nest.Simulate(1000)
+
+        # 10 Hz for every neuron, ordered by time
+        senders = detector.senders
+        self.assertEqual(len(senders), 10 * len(self.map_layer))
+        self.assertTrue(np.all(np.diff(detector.times) >= 0))
+        times, values = monitor.read()
+        self.assertEqual(values.shape, (3, 1000))
+
+    def test_bookkeeping(self):
+        recorder = WeightRecorder(self.input_layer, self.map_layer.nodes, 2)
+        recorder.record(0)
+        nest.Simulate(100)
+        recorder.record(100)
+
+        # weights are kept, but never change
+        self.assertEqual(recorder.weights.shape, (25, 25, 2))
+        self.assertTrue(np.all(recorder.weights[:, :, 0] ==
+                               recorder.weights[:, :, 1]))
+        self.assertEqual(stub.calls['Simulate'], 1)
+
+
+class TestKernels(unittest.TestCase):
+
+    def setUp(self):
+        engine.ResetKernel()
+        stub.ResetKernel()
+
+    def test_separate(self):
+        # the stub has its own kernel, the engine goes on with its one
+        kernel = engine._kernel
+        engine.Create('iaf_psc_alpha', 2)
+        stub.ConvergentConnect(stub.Create('iaf_psc_alpha', 3),
+                               stub.Create('iaf_psc_alpha'))
+
+        self.assertIs(engine._kernel, kernel)
+        self.assertEqual(engine._kernel.size, 2)
+        self.assertEqual(len(engine.GetConnections()), 0)
+        self.assertEqual(len(stub.GetConnections()), 3)
+
+        stub.ResetKernel()
+        self.assertEqual(engine._kernel.size, 2)
+
+    def test_not_swapped(self):
+        # the kernel of the engine stays in place while the stub simulates
+        # (e.g. for another thread using the engine)
+        kernels = []
+        stub._kernel.simulate = lambda t: kernels.append(engine._kernel)
+        try:
+            stub.Simulate(10)
+        finally:
+            del stub._kernel.simulate
+
+        self.assertEqual(len(kernels), 1)
+        self.assertIsNot(kernels[0], stub._kernel)
+
+
+if __name__ == '__main__':
+    unittest.main()
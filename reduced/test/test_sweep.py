@@ -0,0 +1,84 @@
+import unittest
+
+from reduced.simulation.discrimination.sweep import parse_range, expand
+from reduced.simulation.discrimination.sweep import set_by_path
+
+
+def profile():
+    return {'SYNAPSE': {'alpha': 0.1, 'tau': {'plus': 10.0}},
+            'MAP_LAYER': {'x_dim': 2, 'y_dim': 2}}
+
+
+class TestParseRange(unittest.TestCase):
+
+    def test_single(self):
+        self.assertEqual(parse_range('SYNAPSE.alpha=0.05,0.1'),
+                         (('SYNAPSE.alpha',), [0.05, 0.1]))
+
+    def test_joined(self):
+        paths, values = parse_range('MAP_LAYER.x_dim+MAP_LAYER.y_dim=4,8')
+        self.assertEqual(paths, ('MAP_LAYER.x_dim', 'MAP_LAYER.y_dim'))
+        self.assertEqual(values, [4, 8])
+
+    def test_json_values(self):
+        # values are JSON, strings are quoted
+        paths, values = parse_range('KERNEL.backend="numpy",true,null')
+        self.assertEqual(values, ['numpy', True, None])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_range('SYNAPSE.alpha')
+
+
+class TestSetByPath(unittest.TestCase):
+
+    def test_nested(self):
+        p = profile()
+        set_by_path(p, 'SYNAPSE.tau.plus', 20.0)
+        set_by_path(p, 'SYNAPSE.alpha', 0.2)
+
+        self.assertEqual(p['SYNAPSE'], {'alpha': 0.2, 'tau': {'plus': 20.0}})
+        self.assertEqual(p['MAP_LAYER'], profile()['MAP_LAYER'])
+
+    def test_missing(self):
+        # a missing parameter is added, a missing section is an error
+        p = profile()
+        set_by_path(p, 'SYNAPSE.beta', 1.0)
+        self.assertEqual(p['SYNAPSE']['beta'], 1.0)
+
+        with self.assertRaises(KeyError):
+            set_by_path(p, 'INPUT_LAYER.x_dim', 4)
+        self.assertNotIn('INPUT_LAYER', p)
+
+
+class TestExpand(unittest.TestCase):
+
+    def test_product(self):
+        base = profile()
+        ranges = [parse_range('SYNAPSE.alpha=0.05,0.1,0.2'),
+                  parse_range('MAP_LAYER.x_dim+MAP_LAYER.y_dim=4,8')]
+        runs = expand(base, ranges)
+
+        # the last range varies fastest
+        self.assertEqual(len(runs), 6)
+        self.assertEqual([(x['SYNAPSE.alpha'], x['MAP_LAYER.x_dim'])
+                          for x, _ in runs],
+                         [(0.05, 4), (0.05, 8), (0.1, 4), (0.1, 8),
+                          (0.2, 4), (0.2, 8)])
+
+        for params, p in runs:
+            self.assertEqual(p['SYNAPSE']['alpha'], params['SYNAPSE.alpha'])
+            self.assertEqual(p['MAP_LAYER']['x_dim'], params['MAP_LAYER.y_dim'])
+            self.assertEqual(p['MAP_LAYER']['y_dim'], params['MAP_LAYER.y_dim'])
+
+        # variants are copies, the base profile is not changed
+        self.assertEqual(base, profile())
+        runs[0][1]['SYNAPSE']['tau']['plus'] = 0.0
+        self.assertEqual(runs[1][1]['SYNAPSE']['tau']['plus'], 10.0)
+
+    def test_no_ranges(self):
+        self.assertEqual(expand(profile(), []), [({}, profile())])
+
+
+if __name__ == '__main__':
+    unittest.main()
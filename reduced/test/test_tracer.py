@@ -0,0 +1,36 @@
+import unittest
+from StringIO import StringIO
+
+from reduced.network.backend import nest, use_backend
+from reduced.network.tracer import Tracer
+
+
+class TestTracer(unittest.TestCase):
+
+    def setUp(self):
+        use_backend('numpy')
+        nest.ResetKernel()
+        nest.trace(Tracer())
+
+    def tearDown(self):
+        nest.trace(None)
+
+    def test_counts(self):
+        neurons = nest.Create('iaf_psc_exp', 4)
+        nest.Connect(neurons, neurons)
+        connections = nest.GetConnections(neurons)
+        nest.GetStatus(connections, 'weight')
+
+        stats = dict((f, x) for f, _, x in nest.tracer.stats)
+        self.assertEqual(stats['Create'].elements, 4)
+        self.assertEqual(stats['GetConnections'].elements, 16)
+        self.assertEqual(stats['GetStatus'].calls, 1)
+
+        report = StringIO()
+        nest.tracer.report(2, report)
+        self.assertIn('test_tracer.py', report.getvalue())
+        self.assertEqual(len(report.getvalue().splitlines()), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import time
+import unittest
+import numpy as np
+
+from reduced.simulation.writer import BackgroundWriter
+
+
+class SlowDumper(object):
+
+    def __init__(self):
+        self.written = []
+        self.closed = False
+
+    def append(self, value):
+        time.sleep(0.01)
+        self.written.append(value)
+
+    def queued(self, writer):
+        # bytes queued while a call is written
+        self.written.append(writer._queued_bytes)
+
+    def fail(self):
+        raise IOError("disk full")
+
+    def close(self):
+        self.closed = True
+
+
+class TestBackgroundWriter(unittest.TestCase):
+
+    def test_flush_on_close(self):
+        dumper = SlowDumper()
+        with BackgroundWriter(dumper, maxsize=2) as writer:
+            for i in range(10):
+                writer.submit('append', i)
+
+        self.assertEqual(dumper.written, range(10))
+        self.assertTrue(dumper.closed)
+
+    def test_bytes(self):
+        dumper = SlowDumper()
+        chunk = np.zeros(1000)
+
+        with BackgroundWriter(dumper, maxsize=100,
+                              max_bytes=2 * chunk.nbytes) as writer:
+            for i in range(10):
+                writer.submit('append', {'values': chunk})
+                writer.submit('queued', writer)
+
+        # at most two chunks wait, the one being written included
+        queued = dumper.written[1::2]
+        self.assertTrue(max(queued) <= 2 * chunk.nbytes)
+
+        # a chunk larger than the limit is written as well
+        with BackgroundWriter(dumper, max_bytes=10) as writer:
+            writer.submit('append', chunk)
+        self.assertTrue(dumper.written[-1] is chunk)
+
+    def test_error(self):
+        dumper = SlowDumper()
+        writer = BackgroundWriter(dumper)
+        writer.submit('fail')
+        writer.submit('append', 1)
+
+        self.assertRaises(IOError, writer.close)
+        self.assertEqual(dumper.written, [])
+        self.assertTrue(dumper.closed)
+
+        # the error is not forgotten once raised
+        self.assertRaises(IOError, writer.submit, 'append', 2)
+        self.assertRaises(IOError, writer.flush)
+        self.assertRaises(IOError, writer.close)
+
+    def test_call(self):
+        dumper = SlowDumper()
+        with BackgroundWriter(dumper) as writer:
+            for i in range(3):
+                writer.submit('append', i)
+
+            # queued calls are done first
+            self.assertEqual(writer.call('queued', writer), None)
+            self.assertEqual(dumper.written, [0, 1, 2, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()